@@ -1,86 +1,45 @@
 import streamlit as st
-import segno
-import base64
-import io
-
-st.set_page_config(page_title="Project Aqua Shield — QR Generator", layout="wide")
+import artifact_store
+import aquashield_render as render
+import lite_mode
+from aquashield_filters import QR_LINK_TARGETS
 
 st.title("🔷 Project Aqua Shield — QR Card Generator")
 st.write("Generates QR codes pointing to filter instructions or downloadable resources.")
 
 # -------------------------------------------------------------------
-# QR LIST — REPLACE URLS WITH YOUR FINAL LINKS WHEN READY
-# -------------------------------------------------------------------
-
-qr_targets = {
-    "Basic Gravity Micro-Bio Sand + Charcoal Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/basic_gravity_filter.md",
-    "Ceramic Emergency Clay Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/ceramic_filter.md",
-    "Cloth-Only Emergency Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/cloth_filter.md",
-    "Family Bucket Filter (Sand + Charcoal)": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/family_bucket_filter.md",
-    "Solar Disinfection (SODIS)": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/sodis.md",
-    "Crisis-Zone 3-Tier Water Safety Method": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/crisis_zone_filter_set.md",
-    "All Files / Downloads Index": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation"
-}
-
-# -------------------------------------------------------------------
-# QR CODE FUNCTION
-# -------------------------------------------------------------------
-
-def generate_qr(url: str):
-    """Create QR using Segno."""
-    return segno.make(url, micro=False, error="M")
-
-# -------------------------------------------------------------------
-# QR RENDERING LOOP
+# QR RENDERING LOOP (links: QR_LINK_TARGETS in aquashield_filters.py)
 # -------------------------------------------------------------------
 
 st.subheader("QR Codes")
+lite = lite_mode.is_lite()  # small thumbnails, no inline SVG source
 
-for name, url in qr_targets.items():
+for name, url in QR_LINK_TARGETS.items():
     st.markdown(f"### {name}")
 
-    # Create QR
-    qr = generate_qr(url)
-
-    # --- PNG buffer ---
-    png_buffer = io.BytesIO()
-    qr.save(png_buffer, kind="png", scale=10, border=2)
-    png_buffer.seek(0)
-
-    # Base64 PNG for display
-    png_base64 = base64.b64encode(png_buffer.getvalue()).decode()
-    png_data_url = f"data:image/png;base64,{png_base64}"
+    # PNG and SVG are rendered once per process and shared by every session
+    png = render.segno_qr_artifact(url, "png", scale=10)
+    # lite mode: 2 px modules (a few KB), shown at their natural size
+    thumb = render.segno_qr_artifact(url, "png", scale=2) if lite else png
+    svg = render.segno_qr_artifact(url, "svg", scale=4)
 
     # Display QR image visually
-    st.image(png_data_url, width=240)
-
-    # --- SVG buffer ---
-    svg_buffer = io.BytesIO()
-    qr.save(svg_buffer, kind="svg", scale=4, border=2)
-    svg_buffer.seek(0)
-    svg_text = svg_buffer.getvalue()
+    st.image(artifact_store.cached_bytes(*thumb), width="content" if lite else 240, output_format="PNG")
 
     # Download buttons
     c1, c2 = st.columns(2)
 
     with c1:
-        st.download_button(
-            label="⬇ Download PNG",
-            data=png_buffer.getvalue(),
-            file_name=f"{name.replace(' ', '_').lower()}.png",
-            mime="image/png"
-        )
+        artifact_store.download_button("⬇ Download PNG", *png,
+                                       file_name=f"{name.replace(' ', '_').lower()}.png", mime="image/png")
 
     with c2:
-        st.download_button(
-            label="⬇ Download SVG",
-            data=svg_text,
-            file_name=f"{name.replace(' ', '_').lower()}.svg",
-            mime="image/svg+xml"
-        )
+        artifact_store.download_button("⬇ Download SVG", *svg,
+                                       file_name=f"{name.replace(' ', '_').lower()}.svg", mime="image/svg+xml")
 
     # Optional: view SVG text
-    with st.expander("View SVG Code"):
-        st.code(svg_text.decode(), language="xml")
+    if not lite:
+        with st.expander("View SVG Code"):
+            st.code(artifact_store.cached_bytes(*svg).decode(), language="xml")
 
     st.markdown("---")
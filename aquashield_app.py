@@ -0,0 +1,46 @@
+# aquashield_app.py
+# Single entry point for every AquaShield tool. The filter library, the
+# multilingual and printed-card views, the three QR card pages and the
+# performance dashboard run as pages of one Streamlit process, so they share
+# one aquashield_render import, one artifact store and one warm-up: fonts, QR
+# matrices and PDFs are loaded or rendered once per process instead of once per
+# app, and a deployment is one container. Every view reports its transferred
+# weight in the sidebar; ?lite=1 switches to the low-bandwidth view (lite_mode.py).
+#
+#   python warmup.py serve     # production: warm-up starts with the process
+#   streamlit run aquashield_app.py
+import streamlit as st
+
+import lite_mode
+import warmup
+
+st.set_page_config(page_title="Project AquaShield", page_icon="🌍", layout="wide")
+weight = lite_mode.start_meter()
+
+# Pre-render downloads in the background once per process; a no-op when
+# `warmup.py serve` already started it at process start
+warmup.start()
+warm = warmup.status()
+if not warm["ready"]:
+    st.sidebar.caption(f"Preparing downloads in the background… {warm['done']}/{warm['total']}")
+lite = lite_mode.lite_toggle()
+weight_slot = st.sidebar.empty()
+
+PAGES = {
+    "Filters": [
+        st.Page("filters_svg_generator.py", title="Filter library (A–H)", icon="📚", url_path="library", default=True),
+        st.Page("aquashield_multilang_app.py", title="Multilingual (EN/ES)", icon="🌍", url_path="multilingual"),
+        st.Page("aquashield_print_cards.py", title="Printed cards", icon="🖨️", url_path="cards"),
+    ],
+    "QR codes": [
+        st.Page("Qr_link_generator.py", title="Link QR codes", icon="🔗", url_path="qr-links"),
+        st.Page("generate_aquashield_qr_svgs.py", title="Offline QR codes", icon="🔷", url_path="qr-offline"),
+        st.Page("text_qr_library.py", title="Offline QR text library", icon="📝", url_path="qr-texts"),
+    ],
+    "Data": [
+        st.Page("pages/performance_dashboard.py", title="Performance dashboard", icon="📈", url_path="performance"),
+    ],
+}
+
+st.navigation(PAGES).run()
+lite_mode.report(weight, weight_slot, lite)
@@ -0,0 +1,212 @@
+# aquashield_filters.py
+# Canonical filter list shared by the apps and tools (ASCII hyphen keys), with
+# their guides, links, schematics and QR card texts.
+
+FILTER_KEYS = [
+    "Filter A - Basic Bottle Microfilter",
+    "Filter B - Bottle-Neck Cartridge Filter",
+    "Filter C - Gravity Bucket Filter",
+    "Filter D - Family Bucket Filter",
+    "Filter E - Clay-Sawdust Ceramic Filter",
+    "Filter F - Cloth Emergency Filter",
+    "Filter G - SODIS Solar Disinfection",
+    "Filter H - Crisis-Zone 3-Tier Method",
+]
+
+def filter_letter(key: str) -> str:
+    """'Filter C - Gravity Bucket Filter' -> 'C'."""
+    return key.split(" ")[1]
+
+def file_stem(key: str) -> str:
+    """Base name used for downloads: spaces become underscores."""
+    return key.replace(" ", "_")
+
+# Markdown guides in documentation/ per filter letter and language.
+# Filter B has no Spanish guide yet; lookups fall back to English.
+FILTER_DOCS = {
+    "A": {"en": "english/basic_gravity_filter.md", "es": "Spanish/bottle_filter_es.md"},
+    "B": {"en": "english/filters/bottle_neck_microfiber_cartridge.md"},
+    "C": {"en": "english/filters/family_bucket_filter.md", "es": "Spanish/bucket_filter_es.md"},
+    "D": {"en": "english/filters/family_bucket_filter.md", "es": "Spanish/bucket_filter_es.md"},
+    "E": {"en": "english/filters/ceramic_filter.md", "es": "Spanish/ceramic_filter_es.md"},
+    "F": {"en": "english/filters/cloth_filter.md", "es": "Spanish/cloth_filter_es.md"},
+    "G": {"en": "english/filters/sodis.md", "es": "Spanish/sodis_es.md"},
+    "H": {"en": "english/crisis_zone_filter_set.md", "es": "Spanish/crisis_tiered_es.md"},
+}
+
+def filter_doc(key: str, lang: str = "en"):
+    """Relative path (under documentation/) of the guide for a filter, or None."""
+    docs = FILTER_DOCS.get(filter_letter(key), {})
+    return docs.get(lang.split("_")[0]) or docs.get("en")
+
+# Online instructions linked from the printed cards' online QR codes.
+# G and H are placeholders until their pages are published.
+FILTER_URLS = {
+    "Filter A - Basic Bottle Microfilter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/basic_gravity_filter.md",
+    "Filter B - Bottle-Neck Cartridge Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/ceramic_filter.md",
+    "Filter C - Gravity Bucket Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/cloth_filter.md",
+    "Filter D - Family Bucket Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/family_bucket_filter.md",
+    "Filter E - Clay-Sawdust Ceramic Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/sodis.md",
+    "Filter F - Cloth Emergency Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/crisis_zone_filter_set.md",
+    "Filter G - SODIS Solar Disinfection": "https://example.org/AquaShield/filter-G",
+    "Filter H - Crisis-Zone 3-Tier Method": "https://example.org/AquaShield/filter-H",
+}
+
+# Line-art schematics per filter (ASCII-safe), shown and bundled by the apps.
+FILTER_SVGS = {
+    "Filter A - Basic Bottle Microfilter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="420" height="760" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="20">Filter A - Basic Bottle Microfilter</text>
+ <rect x="150" y="60" width="120" height="500" fill="none" stroke="black" stroke-width="2"/>
+ <line x1="150" y1="140" x2="270" y2="140" stroke="black"/>
+ <line x1="150" y1="220" x2="270" y2="220" stroke="black"/>
+ <line x1="150" y1="300" x2="270" y2="300" stroke="black"/>
+ <text x="30" y="120">Layer: Charcoal</text>
+ <text x="30" y="200">Layer: Sand</text>
+ <text x="30" y="280">Layer: Gravel</text>
+ <text x="30" y="360">Cloth tied over bottle neck</text>
+</svg>''',
+
+    "Filter B - Bottle-Neck Cartridge Filter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="420" height="760" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="20">Filter B - Bottle-Neck Cartridge Filter</text>
+ <rect x="160" y="100" width="100" height="420" fill="none" stroke="black" stroke-width="2"/>
+ <text x="40" y="140">Microfiber / Cloth</text>
+ <line x1="160" y1="180" x2="260" y2="180" stroke="black"/>
+ <text x="40" y="220">Optional Sand</text>
+ <line x1="160" y1="260" x2="260" y2="260" stroke="black"/>
+ <text x="40" y="300">Charcoal Layer</text>
+ <line x1="160" y1="340" x2="260" y2="340" stroke="black"/>
+ <text x="40" y="380">Outlet plug</text>
+</svg>''',
+
+    "Filter C - Gravity Bucket Filter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="480" height="640" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="20">Filter C - Gravity Bucket Filter</text>
+ <rect x="120" y="60" width="240" height="420" stroke="black" fill="none" stroke-width="2"/>
+ <text x="40" y="120">Top: Cloth / Diffuser</text>
+ <line x1="120" y1="140" x2="360" y2="140" stroke="black"/>
+ <text x="40" y="190">Coarse Gravel</text>
+ <line x1="120" y1="220" x2="360" y2="220" stroke="black"/>
+ <text x="40" y="260">Medium Gravel</text>
+ <line x1="120" y1="300" x2="360" y2="300" stroke="black"/>
+ <text x="40" y="340">Charcoal Layer</text>
+ <line x1="120" y1="380" x2="360" y2="380" stroke="black"/>
+ <text x="40" y="420">Sand (deep)</text>
+</svg>''',
+
+    "Filter D - Family Bucket Filter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="480" height="680" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="20">Filter D - Family Bucket Filter</text>
+ <rect x="100" y="70" width="260" height="480" stroke="black" fill="none" stroke-width="2"/>
+ <text x="120" y="120">Top cloth</text>
+ <line x1="100" y1="150" x2="360" y2="150" stroke="black"/>
+ <text x="120" y="190">Coarse gravel</text>
+ <line x1="100" y1="230" x2="360" y2="230" stroke="black"/>
+ <text x="120" y="270">Fine gravel</text>
+ <line x1="100" y1="310" x2="360" y2="310" stroke="black"/>
+ <text x="120" y="350">Charcoal</text>
+ <line x1="100" y1="390" x2="360" y2="390" stroke="black"/>
+ <text x="120" y="430">Deep sand</text>
+ <line x1="100" y1="470" x2="360" y2="470" stroke="black"/>
+ <text x="120" y="520">Bottom cloth & spigot</text>
+</svg>''',
+
+    "Filter E - Clay-Sawdust Ceramic Filter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="420" height="520" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="18">Filter E - Clay-Sawdust Ceramic Filter</text>
+ <ellipse cx="210" cy="140" rx="140" ry="40" fill="none" stroke="black"/>
+ <rect x="70" y="140" width="280" height="200" fill="none" stroke="black"/>
+ <ellipse cx="210" cy="340" rx="140" ry="30" fill="none" stroke="black"/>
+ <text x="30" y="180">Porous ceramic pot (locally fired)</text>
+ <text x="30" y="200">Optional colloidal silver coating (if available)</text>
+ <text x="30" y="240">Charcoal pad at bottom (optional)</text>
+</svg>''',
+
+    "Filter F - Cloth Emergency Filter": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="420" height="420" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="18">Filter F - Cloth Emergency Filter</text>
+ <rect x="60" y="70" width="300" height="260" fill="none" stroke="black"/>
+ <text x="80" y="120">Fold cloth 4-8 layers</text>
+ <text x="80" y="160">Secure over clean container</text>
+ <text x="80" y="200">Pour slowly; repeat if turbid</text>
+</svg>''',
+
+    "Filter G - SODIS Solar Disinfection": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="480" height="300" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="18">Filter G - SODIS Solar Disinfection</text>
+ <rect x="40" y="60" width="160" height="120" fill="none" stroke="black"/><text x="50" y="140">Clear PET bottle</text>
+ <rect x="260" y="60" width="160" height="120" fill="none" stroke="black"/><text x="270" y="140">Sunny surface (metal/rock)</text>
+ <text x="50" y="200">Expose full sun 6 hours (clear) or 2 days partial</text>
+</svg>''',
+
+    "Filter H - Crisis-Zone 3-Tier Method": r'''<?xml version="1.0" encoding="UTF-8"?>
+<svg width="520" height="420" xmlns="http://www.w3.org/2000/svg">
+ <text x="20" y="30" font-size="18">Filter H - Crisis-Zone 3-Tier Method</text>
+ <rect x="40" y="60" width="420" height="300" fill="none" stroke="black"/>
+ <text x="60" y="110">Tier 1: Settling + Cloth</text>
+ <text x="60" y="150">Tier 2: Charcoal + Sand microfilter</text>
+ <text x="60" y="190">Tier 3: Disinfection (SODIS/boil/chlorine)</text>
+</svg>'''
+}
+
+# Targets of the link QR cards (Qr_link_generator.py).
+QR_LINK_TARGETS = {
+    "Basic Gravity Micro-Bio Sand + Charcoal Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/basic_gravity_filter.md",
+    "Ceramic Emergency Clay Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/ceramic_filter.md",
+    "Cloth-Only Emergency Filter": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/cloth_filter.md",
+    "Family Bucket Filter (Sand + Charcoal)": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/family_bucket_filter.md",
+    "Solar Disinfection (SODIS)": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/filters/sodis.md",
+    "Crisis-Zone 3-Tier Water Safety Method": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation/english/crisis_zone_filter_set.md",
+    "All Files / Downloads Index": "https://github.com/mamaofthree579-ship-it/Project-Aqua-Shield-/tree/main/documentation"
+}
+
+# Self-contained EN/ES texts for the offline QR cards (no internet needed to read them).
+OFFLINE_QR_PAYLOADS = {
+    "Basic Gravity Micro-Bio Sand + Charcoal Filter": """AQUA SHIELD v1.0
+BASIC GRAVITY SAND + CHARCOAL FILTER
+EN: Cloth on bottle mouth → gravel → sand → charcoal. Discard first 1L. Pour slowly. Always disinfect after filtering: boil 1 min OR SODIS 6 hrs sun OR 1 drop bleach per cup (if unscented).
+ES: Tela en la boca → grava → arena → carbón. Desechar 1L inicial. Verter despacio. Desinfectar: hervir 1 min, o SODIS 6 h sol, o 1 gota de cloro por taza.
+""",
+
+    "Ceramic Clay–Sawdust Emergency Filter": """AQUA SHIELD v1.0
+CERAMIC CLAY FILTER
+EN: Mix clay + sawdust 3:1. Shape bowl. Dry 2–3 days. Fire until hard (kiln or barrel). Optional: coat inside with silver. Pour water in top; collect clean water below.
+ES: Mezclar arcilla + aserrín 3:1. Formar cuenco. Secar 2–3 días. Cocer. Opcional: plata coloidal. Verter agua arriba; recoger agua limpia abajo.
+""",
+
+    "Cloth-Only Emergency Filter": """AQUA SHIELD v1.0
+CLOTH EMERGENCY FILTER
+EN: Fold clean cloth 4–8 layers. Pour water slowly. Repeat 2–3×. Must disinfect afterward.
+ES: Doblar tela limpia 4–8 capas. Verter agua. Repetir 2–3×. Debe desinfectarse después.
+""",
+
+    "Family Bucket Filter (Sand + Charcoal)": """AQUA SHIELD v1.0
+BUCKET FILTER
+EN: Bucket → cloth → coarse gravel → small gravel → charcoal (5–8 cm) → sand (15–25 cm) → cloth bottom. First 2L discard. Then filter. Disinfect afterward.
+ES: Cubeta → tela → grava gruesa → grava fina → carbón 5–8 cm → arena 15–25 cm → tela abajo. Desechar 2L inicial. Luego filtrar. Desinfectar después.
+""",
+
+    "Solar Disinfection (SODIS)": """AQUA SHIELD v1.0
+SOLAR DISINFECTION (SODIS)
+EN: Use clear PET bottle. Filter water until clear. Fill 3/4; shake 20 sec. Fill full. Leave in sun 6 hrs (full sun) or 2 days (cloudy).
+ES: Botella PET clara. Filtrar hasta clara. Llenar 3/4; agitar 20 seg. Llenar. Sol 6 h (sol pleno) o 2 días (nublado).
+""",
+
+    "Crisis-Zone 3-Tier Method": """AQUA SHIELD v1.0
+CRISIS-ZONE 3-TIER WATER SAFETY
+EN: Tier1 settle 6–12h → cloth filter. Tier2 sand+charcoal filter if possible. Tier3 disinfect (boil, SODIS, or bleach). Avoid water smelling like fuel.
+ES: Nivel1 decantar 6–12h → filtrar tela. Nivel2 arena+carbón si posible. Nivel3 desinfectar. Evitar agua con olor a combustible.
+""",
+
+    "Full Guidebook Summary": """AQUA SHIELD v1.0
+SUMMARY
+EN: Multi-layer safety: settle → filter → disinfect. Do not rely on filtering alone for sewage-contaminated water.
+ES: Seguridad por capas: decantar → filtrar → desinfectar. No confiar solo en filtrado para agua con aguas residuales.
+""",
+
+    "All Filters Index (Offline Text)": """AQUA SHIELD v1.0
+INDEX
+EN+ES: Includes instructions for: bottle filter, ceramic filter, cloth filter, bucket filter, SODIS, crisis 3-tier method, guidebook summary.
+"""
+}
@@ -0,0 +1,337 @@
+# aquashield_render.py
+# Renderers shared by the app pages, the warm-up and the tools: A5 PDFs, schematic
+# and QR PNGs, segno QR cards (PNG/SVG), printed cards and PDF bundles. Every page
+# of aquashield_app.py imports this one module, so fonts and QR matrices are
+# loaded once per process. The *_artifact() helpers at the bottom
+# give the (parts, builder) pair the apps hand to artifact_store, so every
+# caller -- a download button or the warm-up thread -- hits the same entry.
+import functools
+import io
+import os
+import tempfile
+import zipfile
+
+import artifact_store
+import image_pipeline
+import markdown_pdf
+import reproducible
+import search_index
+import text_layout
+from fpdf import FPDF
+from PIL import Image, ImageDraw, ImageFont
+import qrcode
+import segno
+
+# Bump when a renderer's output changes so stored artifacts are rebuilt
+RENDER_VERSION = 4
+FONT_FILE = "DejaVuSans.ttf"
+PDF_LINE_HEIGHT = 6
+# Card text column width in em; the card PNG and card PDF size their fonts to it
+CARD_TEXT_EM = 32.0
+CARD_SIZE = (1240, 1748)  # A5 at 150 dpi
+CARD_PDF_MARGIN = 10      # mm around the card image in the card PDF
+
+# -------------------------
+# PDF
+# -------------------------
+def sanitize_for_pdf(text: str) -> str:
+    """Replace problematic punctuation and ensure text is latin-1 encodable for FPDF."""
+    replacements = {
+        "—": "-",
+        "–": "-",
+        "‘": "'",
+        "’": "'",
+        "“": '"',
+        "”": '"',
+        "…": "...",
+        "•": "-",  # bullet
+    }
+    for bad, good in replacements.items():
+        text = text.replace(bad, good)
+    # final fallback: encode to latin-1 replacing anything not representable
+    return text.encode("latin-1", errors="replace").decode("latin-1")
+
+def _pdf_text_width(pdf) -> float:
+    """Usable line width at the current font, matching what cell() leaves for text."""
+    return pdf.w - pdf.l_margin - pdf.r_margin - 2 * pdf.c_margin
+
+def build_a5_pdf_bytes(pdf_text: str):
+    """Create A5 PDF bytes (FPDF) from text and return BytesIO."""
+    pdf = FPDF(format='A5')
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=12)
+    pdf.set_font("Arial", size=11)
+    metrics = text_layout.pdf_metrics("Arial", "", sanitize_for_pdf)
+    lines = text_layout.wrap_text(pdf_text, _pdf_text_width(pdf) / pdf.font_size, metrics)
+    text_layout.pdf_lines(pdf, lines, metrics, PDF_LINE_HEIGHT, encode=sanitize_for_pdf)
+    return io.BytesIO(reproducible.pdf_bytes(pdf))
+
+def card_text_lines(text: str):
+    """Line breaks shared by the card PNG and the card PDF (fit both fonts)."""
+    metrics = text_layout.combined_metrics(text_layout.pil_metrics(FONT_FILE),
+                                           text_layout.pdf_metrics("Arial", "", sanitize_for_pdf))
+    return text_layout.wrap_text(text, CARD_TEXT_EM, metrics)
+
+def build_a5_pdf_with_image_and_text(text: str, png_bytes: bytes):
+    """A5 PDF with a full-width image followed by the card text (same breaks as the card PNG)."""
+    img_w, img_h = Image.open(io.BytesIO(png_bytes)).size
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+        tmp.write(png_bytes)
+        tmp.flush()
+        img_path = tmp.name
+    try:
+        pdf = FPDF(format='A5')
+        pdf.add_page()
+        margin = CARD_PDF_MARGIN
+        page_w = pdf.w - 2*margin
+        pdf.image(img_path, x=margin, y=margin, w=page_w)
+        pdf.set_left_margin(margin)
+        pdf.set_right_margin(margin)
+        # text starts below the image (on the next page when the image fills this one)
+        pdf.set_xy(margin, margin + page_w * img_h / img_w + 5)
+        size_pt = int((page_w - 2 * pdf.c_margin) / CARD_TEXT_EM * pdf.k * 10) / 10
+        pdf.set_font("Arial", size=size_pt)
+        metrics = text_layout.pdf_metrics("Arial", "", sanitize_for_pdf)
+        text_layout.pdf_lines(pdf, card_text_lines(text), metrics, PDF_LINE_HEIGHT, encode=sanitize_for_pdf)
+        return io.BytesIO(reproducible.pdf_bytes(pdf))
+    finally:
+        try:
+            os.remove(img_path)
+        except OSError:
+            pass
+
+# -------------------------
+# PNG: schematics, QR codes, printed cards (Pillow)
+# -------------------------
+@functools.lru_cache(maxsize=None)
+def load_font(size: int):
+    """DejaVu Sans at `size` px (Pillow's built-in font if unavailable), loaded once per process."""
+    try:
+        return ImageFont.truetype(FONT_FILE, size)
+    except OSError:
+        return ImageFont.load_default()
+
+def _label(draw, xy, text: str, font, max_width: float):
+    """Draw `text` wrapped to `max_width` px; returns the y below it."""
+    metrics = text_layout.pil_metrics(FONT_FILE)
+    lines = text_layout.wrap_text(text, max_width / font.size, metrics)
+    return text_layout.draw_lines(draw, lines, xy, font, metrics, max_width, round(font.size * 1.25))
+
+def create_schematic_png(filter_key: str, size=(1200, 900)):
+    w, h = size
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    font_h = load_font(20)
+    font_b = load_font(14)
+
+    _label(draw, (20, 12), filter_key, font_h, w - 40)
+
+    if "Basic Bottle" in filter_key:
+        left = w//2 - 140; top = 80; right = w//2 + 140; bottom = h - 160
+        draw.rectangle([left, top, right, bottom], outline="black", width=3)
+        layer_h = (bottom - top) / 4
+        labels = ["Charcoal", "Fine sand", "Small gravel", "Cloth plug"]
+        for i, lab in enumerate(labels):
+            y = int(top + (i+1)*layer_h)
+            draw.line([left, y, right, y], fill="black", width=2)
+            _label(draw, (40, int(y - layer_h/2)), f"Layer: {lab}", font_b, left - 48)
+
+    elif "Bottle-Neck" in filter_key:
+        cx = w//2
+        draw.rectangle([cx-60, 120, cx+60, h-120], outline="black", width=3)
+        parts = ["Microfiber", "Optional sand", "Charcoal", "Outlet plug"]
+        segment = (h-240)/len(parts)
+        for idx, p in enumerate(parts):
+            y = 120 + int((idx+1)*segment)
+            draw.line([cx-60, y, cx+60, y], fill="black", width=2)
+            _label(draw, (40, y - int(segment/2)), p, font_b, cx - 60 - 48)
+
+    elif "Gravity Bucket" in filter_key or "Family Bucket" in filter_key:
+        left = 120; right = w - 120; top = 80; bottom = h - 160
+        draw.rectangle([left, top, right, bottom], outline="black", width=3)
+        layers = ["Cloth/diffuser", "Coarse gravel", "Small gravel", "Charcoal", "Deep sand"]
+        step = (bottom - top) / (len(layers) + 1)
+        for i, lab in enumerate(layers):
+            y = int(top + (i+1)*step)
+            draw.line([left, y, right, y], fill="black", width=2)
+            _label(draw, (40, y - int(step/2)), lab, font_b, left - 48)
+
+    elif "Clay-Sawdust" in filter_key:
+        cx = w//2
+        draw.ellipse([cx-200, 120, cx+200, 220], outline="black", width=3)
+        draw.rectangle([cx-180, 220, cx+180, 420], outline="black", width=3)
+        draw.ellipse([cx-160, 420, cx+160, 460], outline="black", width=3)
+        _label(draw, (40, 240), "Porous ceramic pot (locally fired)", font_b, cx - 180 - 48)
+
+    elif "Cloth Emergency" in filter_key:
+        draw.rectangle([80, 120, w-80, h-180], outline="black", width=3)
+        y = _label(draw, (100, 160), "Fold cloth 4-8 layers", font_b, w - 200)
+        _label(draw, (100, y + 12), "Secure over container; pour slowly", font_b, w - 200)
+
+    elif "SODIS" in filter_key:
+        draw.rectangle([60, 100, 220, 260], outline="black", width=2)
+        _label(draw, (70, 230), "Clear PET bottle", font_b, 140)
+        draw.rectangle([320, 100, 480, 260], outline="black", width=2)
+        _label(draw, (330, 230), "Sunny surface", font_b, 140)
+        _label(draw, (60, 300), "Expose 6 hours (clear) or 2 days (partial)", font_b, w - 100)
+
+    elif "Crisis-Zone" in filter_key:
+        y = 140
+        for tier in ("Tier 1: Settling + Cloth", "Tier 2: Charcoal + Sand microfilter",
+                     "Tier 3: Disinfection (SODIS/boil/chlorine)"):
+            y = _label(draw, (60, y), tier, font_b, w - 100) + 22
+    else:
+        _label(draw, (40, 120), "Schematic not available", font_b, w - 80)
+
+    out = io.BytesIO(); img.save(out, format="PNG"); out.seek(0)
+    return out.getvalue()
+
+def create_qr_png_from_text(payload: str, box_size=4, border=2):
+    q = qrcode.QRCode(box_size=box_size, border=border)
+    q.add_data(payload)
+    q.make(fit=True)
+    img = q.make_image(fill_color="black", back_color="white").convert("RGB")
+    out = io.BytesIO(); img.save(out, format="PNG"); out.seek(0)
+    return out.getvalue()
+
+def create_qr_thumbnail(payload: str, box_size=2, border=2):
+    """1-bit QR PNG at 2 px per module: a few KB, still scannable from a screen."""
+    q = qrcode.QRCode(box_size=box_size, border=border)
+    q.add_data(payload)
+    q.make(fit=True)
+    img = q.make_image(fill_color="black", back_color="white").convert("1")
+    out = io.BytesIO(); img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+@functools.lru_cache(maxsize=256)
+def generate_qr(payload: str):
+    """Segno QR (error level M) for a link or an offline text, encoded once per process."""
+    return segno.make(payload, micro=False, error="M")
+
+def segno_qr_bytes(payload: str, kind: str = "png", scale: int = 10, border: int = 2) -> bytes:
+    """PNG or SVG of generate_qr(payload), as the QR card pages serve them."""
+    out = io.BytesIO()
+    generate_qr(payload).save(out, kind=kind, scale=scale, border=border)
+    return out.getvalue()
+
+def card_qr_box(include_schematic=True, size=CARD_SIZE):
+    """(x, y, side) of the offline QR code on a card PNG; side is 0 when there's no room."""
+    w, h = size
+    top = 40
+    if include_schematic:
+        schem = Image.new("1", (1200, 900))
+        schem.thumbnail((w - 80, h // 2))
+        top += schem.height + 30
+    side = min(w // 3, h - top - 40)
+    return w - side - 40, h - side - 40, side
+
+def compose_card_image(filter_key: str, text: str, include_schematic=True, qr_payload=None, size=CARD_SIZE):
+    """Printable card PNG (A5 at 150 dpi): schematic on top, short text, offline QR bottom-right."""
+    w, h = size
+    card = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(card)
+    top = 40
+    if include_schematic:
+        schem = Image.open(io.BytesIO(create_schematic_png(filter_key, size=(1200, 900))))
+        schem.thumbnail((w - 80, h // 2))
+        card.paste(schem, ((w - schem.width) // 2, top))
+        top += schem.height + 30
+    qr_side = 0
+    if qr_payload:
+        qr_x, qr_y, qr_side = card_qr_box(include_schematic, size)
+        qr_img = Image.open(io.BytesIO(create_qr_png_from_text(qr_payload, box_size=6, border=2)))
+        qr_img = qr_img.resize((qr_side, qr_side), Image.NEAREST)
+        card.paste(qr_img, (qr_x, qr_y))
+    # text column left of the QR code; the font is sized so CARD_TEXT_EM fits it
+    column = (w - qr_side - 80 if qr_side else w - 40) - 40
+    font_b = load_font(int(column / CARD_TEXT_EM))
+    text_layout.draw_lines(draw, card_text_lines(text), (40, top), font_b, None, column, round(font_b.size * 1.36))
+    out = io.BytesIO(); card.save(out, format="PNG"); out.seek(0)
+    return out.getvalue()
+
+# -------------------------
+# Bundles
+# -------------------------
+def build_pdfs_zip(pdf_bytesio_dict: dict):
+    """ZIP of {file name: BytesIO} PDFs plus the offline search index, members sorted by name."""
+    mem = io.BytesIO()
+    with zipfile.ZipFile(mem, "w", zipfile.ZIP_DEFLATED) as z:
+        for fname in sorted(pdf_bytesio_dict):
+            reproducible.zip_writestr(z, fname, pdf_bytesio_dict[fname].getvalue())
+        search_index.add_to_zip(z)
+    mem.seek(0)
+    return mem
+
+# -------------------------
+# Artifacts: (parts, builder) pairs for artifact_store
+# -------------------------
+def a5_pdf_artifact(text: str):
+    return ("a5_pdf", RENDER_VERSION, text), lambda: build_a5_pdf_bytes(text)
+
+def schematic_png_artifact(filter_key: str, size=(900, 600)):
+    return ("schematic_png", RENDER_VERSION, filter_key, *size), lambda: create_schematic_png(filter_key, size=size)
+
+def qr_png_artifact(payload: str, box_size=4, border=2):
+    return (("qr_png", RENDER_VERSION, payload, box_size, border),
+            lambda: create_qr_png_from_text(payload, box_size=box_size, border=border))
+
+def qr_thumb_artifact(payload: str):
+    return ("qr_thumb", RENDER_VERSION, payload), lambda: create_qr_thumbnail(payload)
+
+def segno_qr_artifact(payload: str, kind: str = "png", scale: int = 10, border: int = 2):
+    return (("segno_qr", RENDER_VERSION, payload, kind, scale, border),
+            lambda: segno_qr_bytes(payload, kind, scale=scale, border=border))
+
+def card_png_artifact(filter_key: str, text: str):
+    """Printed card whose offline QR carries the same short text."""
+    return (("card_png", RENDER_VERSION, filter_key, text),
+            lambda: compose_card_image(filter_key, text, include_schematic=True, qr_payload=text))
+
+def card_pdf_artifact(filter_key: str, text: str, png_bytes: bytes):
+    return (("card_pdf", RENDER_VERSION, filter_key, text),
+            lambda: build_a5_pdf_with_image_and_text(text, png_bytes))
+
+def printed_card_artifact(filter_key: str, text: str):
+    """Card PDF parts plus a builder that renders (or reuses) the card PNG first."""
+    def build():
+        png = artifact_store.cached_bytes(*card_png_artifact(filter_key, text))
+        return card_pdf_artifact(filter_key, text, png)[1]()
+    return ("card_pdf", RENDER_VERSION, filter_key, text), build
+
+def visuals_zip_artifact(size: str = "screen"):
+    sources = [(p, os.stat(p).st_mtime_ns) for p in image_pipeline.source_images()]
+    return ("visuals_zip", RENDER_VERSION, size, *sources), lambda: image_pipeline.build_visuals_zip(size)
+
+def guide_pdf_artifact(filter_key: str, lang: str = "en"):
+    """Formatted Markdown guide for a filter, or None when there is no guide."""
+    path = markdown_pdf.filter_guide_path(filter_key, lang)
+    if path is None:
+        return None
+    return ("guide_pdf", path, os.stat(path).st_mtime_ns, markdown_pdf.RENDER_VERSION), lambda: markdown_pdf.render_markdown_file(path)
+
+def artifact_from_parts(parts):
+    """(parts, builder) rebuilt from an artifact's parts, or None for kinds that aren't
+    rebuildable -- how a render worker turns a queued job back into a render."""
+    kind, args = parts[0], list(parts[1:])
+    if kind in ("a5_pdf", "schematic_png", "qr_png", "qr_thumb", "segno_qr", "card_png", "card_pdf", "visuals_zip") and args[0] != RENDER_VERSION:
+        raise ValueError(f"{kind} was queued for renderer version {args[0]}, this is {RENDER_VERSION}")
+    if kind == "a5_pdf":
+        return a5_pdf_artifact(args[1])
+    if kind == "schematic_png":
+        return schematic_png_artifact(args[1], size=(args[2], args[3]))
+    if kind == "qr_png":
+        return qr_png_artifact(args[1], box_size=args[2], border=args[3])
+    if kind == "qr_thumb":
+        return qr_thumb_artifact(args[1])
+    if kind == "segno_qr":
+        return segno_qr_artifact(args[1], args[2], scale=args[3], border=args[4])
+    if kind == "card_png":
+        return card_png_artifact(args[1], args[2])
+    if kind == "card_pdf":
+        return printed_card_artifact(args[1], args[2])
+    if kind == "guide_pdf":
+        path = args[0]
+        return ("guide_pdf", path, os.stat(path).st_mtime_ns, markdown_pdf.RENDER_VERSION), lambda: markdown_pdf.render_markdown_file(path)
+    if kind == "visuals_zip":
+        return visuals_zip_artifact(args[1])
+    return None
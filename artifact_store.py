@@ -0,0 +1,363 @@
+# artifact_store.py
+# Process-wide, content-addressed store for generated downloads (PDFs, PNGs,
+# SVGs, ZIPs). Every artifact is built once per process, kept once in a bounded
+# in-memory LRU and spilled to .aquashield_cache/artifacts/<sha256>; download
+# buttons hand Streamlit a callable that fetches the bytes by hash only when
+# the user clicks, so nothing is built or held per session on reruns. The
+# key -> sha256 index is kept on disk too (artifacts/keys/), so artifacts
+# rendered by another process (warmup.py) are found without rebuilding.
+# Concurrent requests for the same key are coalesced: one thread builds, the
+# rest wait for its result (or its exception) for up to BUILD_TIMEOUT seconds.
+# A delegate (render_worker.attach) can take builds out of process: it wraps
+# builders so the bytes come from a render worker writing to the same store.
+# The disk tier is garbage-collected: files not used for AQUASHIELD_STORE_MAX_AGE_DAYS
+# go, and then the least recently used until it fits AQUASHIELD_STORE_MAX_MB. A GC
+# runs at most every GC_INTERVAL seconds after a new artifact is written; an
+# artifact collected under another process is simply rebuilt on its next use.
+#
+#   python artifact_store.py gc        # collect now and print what was removed
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+ARTIFACT_DIR = os.path.join(CACHE_DIR, "artifacts")
+MEMORY_LIMIT = int(os.environ.get("AQUASHIELD_ARTIFACT_MEMORY_MB", "64")) * 1024 * 1024
+BUILD_TIMEOUT = float(os.environ.get("AQUASHIELD_BUILD_TIMEOUT", "120"))
+DISK_LIMIT = int(os.environ.get("AQUASHIELD_STORE_MAX_MB", "1024")) * 1024 * 1024
+MAX_AGE = float(os.environ.get("AQUASHIELD_STORE_MAX_AGE_DAYS", "30")) * 86400
+GC_INTERVAL = 600
+TMP_MAX_AGE = 3600  # leftovers of writers that died mid-write
+
+def artifact_key(*parts) -> str:
+    """Stable key for the inputs an artifact is built from, e.g. ('short_pdf', text)."""
+    h = hashlib.sha256()
+    for p in parts:
+        b = p if isinstance(p, bytes) else str(p).encode("utf-8")
+        h.update(len(b).to_bytes(8, "little") + b)
+    return h.hexdigest()
+
+def _as_bytes(data) -> bytes:
+    if isinstance(data, io.BytesIO):
+        return data.getvalue()
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return bytes(data)
+
+class _Flight:
+    """One in-progress build that other requests for the same key wait on."""
+    __slots__ = ("done", "digest", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.digest = None
+        self.error = None
+
+class ArtifactStore:
+    def __init__(self, directory: str = ARTIFACT_DIR, memory_limit: int = MEMORY_LIMIT,
+                 build_timeout: float = BUILD_TIMEOUT, disk_limit: int = DISK_LIMIT,
+                 max_age: float = MAX_AGE):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.build_timeout = build_timeout
+        self.disk_limit = disk_limit
+        self.max_age = max_age
+        self._next_gc = 0.0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # digest -> bytes (LRU)
+        self._memory_bytes = 0
+        self._keys = {}                # artifact key -> digest
+        self._inflight = {}            # artifact key -> _Flight
+        self.builds = self.hits = self.disk_reads = self.coalesced = self.collected = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.directory, "keys", key[:2], key)
+
+    def _write_file(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _remember(self, digest: str, data: bytes):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        if len(data) > self.memory_limit:
+            return
+        self._memory[digest] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _touch(self, path: str):
+        """Mark a disk file as used, so GC keeps it."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def put(self, data) -> str:
+        """Store bytes; returns their sha256. Identical content is stored once."""
+        data = _as_bytes(data)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        written = not os.path.exists(path)
+        if written:
+            self._write_file(path, data)
+        else:
+            self._touch(path)
+        with self._lock:
+            self._remember(digest, data)
+        if written:
+            self.maybe_gc()
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                self.hits += 1
+                return data
+        with open(self._path(digest), "rb") as f:
+            data = f.read()
+        self._touch(self._path(digest))
+        with self._lock:
+            self.disk_reads += 1
+            self._remember(digest, data)
+        return data
+
+    def lookup(self, key: str):
+        """Digest already stored for `key` (this process or on disk), or None."""
+        digest = self._keys.get(key)
+        if digest is None:
+            try:
+                with open(self._key_path(key), encoding="ascii") as f:
+                    digest = f.read().strip()
+            except OSError:
+                return None
+            self._touch(self._key_path(key))
+        if digest in self._memory or os.path.exists(self._path(digest)):
+            self._keys[key] = digest
+            return digest
+        return None
+
+    def delete(self, digest: str):
+        """Remove an artifact from memory and disk (e.g. an expired export); missing is fine."""
+        with self._lock:
+            data = self._memory.pop(digest, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+            for key in [k for k, d in self._keys.items() if d == digest]:
+                del self._keys[key]
+        self._remove(self._path(digest))
+
+    def forget(self, key: str):
+        """Drop this process's key -> digest entry (after GC removed the file)."""
+        self._keys.pop(key, None)
+
+    def digest_for(self, key: str, builder, timeout: float = None) -> str:
+        """Digest of the artifact for `key`, building it with `builder()` on first use.
+
+        While a build for `key` is running, other callers wait for it instead of
+        building again; they get its exception if it fails, or TimeoutError after
+        `timeout` seconds (default: build_timeout) while it keeps running.
+        """
+        digest = self.lookup(key)
+        if digest is not None:
+            return digest
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            wait = self.build_timeout if timeout is None else timeout
+            if not flight.done.wait(wait):
+                raise TimeoutError(f"artifact {key[:12]} still building after {wait:g}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.digest
+        try:
+            # a previous leader may have finished between lookup() and registering
+            digest = self.lookup(key)
+            if digest is None:
+                digest = self.put(builder())
+                self._write_file(self._key_path(key), digest.encode("ascii"))
+                self._keys[key] = digest
+                with self._lock:
+                    self.builds += 1
+            flight.digest = digest
+            return digest
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # failed builds are not cached: the next request after this one retries
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def get_or_build(self, key: str, builder) -> bytes:
+        """Bytes for `key`; rebuilt once if GC removed the file after the lookup."""
+        try:
+            return self.get(self.digest_for(key, builder))
+        except FileNotFoundError:
+            self.forget(key)
+            return self.get(self.digest_for(key, builder))
+
+    # -------------------------
+    # Disk GC
+    # -------------------------
+    def maybe_gc(self):
+        """Start a background gc() if the last one is more than GC_INTERVAL seconds ago."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_gc:
+                return
+            self._next_gc = now + GC_INTERVAL
+        threading.Thread(target=self.gc, name="aquashield-store-gc", daemon=True).start()
+
+    def gc(self) -> dict:
+        """Remove artifacts unused for max_age, then the least recently used over disk_limit.
+
+        Artifacts this process holds in memory or is building are kept; key files
+        whose artifact is gone are removed with it.
+        """
+        now = time.time()
+        with self._lock:
+            keep = set(self._memory)
+        files, tmp_removed = [], 0
+        try:
+            shards = [d for d in os.listdir(self.directory) if len(d) == 2]
+        except OSError:
+            shards = []
+        for shard in shards:
+            folder = os.path.join(self.directory, shard)
+            for entry in os.scandir(folder):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - st.st_mtime > TMP_MAX_AGE:
+                        tmp_removed += self._remove(entry.path)
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path, entry.name))
+        files.sort()
+        total = sum(size for _, size, _, _ in files)
+        removed = freed = 0
+        for mtime, size, path, digest in files:
+            if total <= self.disk_limit and now - mtime <= self.max_age:
+                break
+            if digest in keep or not self._remove(path):
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        keys_removed = self._gc_keys() if removed else 0
+        with self._lock:
+            self.collected += removed
+        return {"removed": removed, "freed_bytes": freed, "kept_bytes": total,
+                "keys_removed": keys_removed, "tmp_removed": tmp_removed}
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _gc_keys(self) -> int:
+        """Remove key files that point at an artifact no longer on disk."""
+        removed = 0
+        keys_dir = os.path.join(self.directory, "keys")
+        for folder, _, names in os.walk(keys_dir):
+            for name in names:
+                path = os.path.join(folder, name)
+                try:
+                    with open(path, encoding="ascii") as f:
+                        digest = f.read().strip()
+                except OSError:
+                    continue
+                if not name.endswith(".tmp") and not os.path.exists(self._path(digest)):
+                    removed += self._remove(path)
+                    self.forget(name)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"artifacts_in_memory": len(self._memory), "memory_bytes": self._memory_bytes,
+                    "keys": len(self._keys), "builds": self.builds, "hits": self.hits,
+                    "disk_reads": self.disk_reads, "coalesced": self.coalesced,
+                    "building": len(self._inflight), "collected": self.collected}
+
+STORE = ArtifactStore()
+
+# Optional: object with builder(parts, fallback) -> builder and prefetch(parts_list)
+_delegate = None
+
+def set_delegate(delegate):
+    """Route builds through `delegate` (None: build in this process)."""
+    global _delegate
+    _delegate = delegate
+
+def digest_for_parts(parts, builder) -> str:
+    """STORE.digest_for() by parts, rendered by the delegate when one is attached."""
+    if _delegate is not None:
+        builder = _delegate.builder(parts, builder)
+    return STORE.digest_for(artifact_key(*parts), builder)
+
+def prefetch(parts_list):
+    """Hint that these artifacts are needed soon, so a delegate can queue them all at once."""
+    if _delegate is not None:
+        _delegate.prefetch(parts_list)
+
+def cached_bytes(parts, builder) -> bytes:
+    """Shared bytes for an artifact (built once per process); for st.image and the like."""
+    try:
+        return STORE.get(digest_for_parts(parts, builder))
+    except FileNotFoundError:
+        # collected from disk since this process last used it: build it again
+        STORE.forget(artifact_key(*parts))
+        return STORE.get(digest_for_parts(parts, builder))
+
+def download_button(label: str, parts, builder, file_name: str, mime: str, container=None, **kwargs):
+    """st.download_button whose payload comes from the shared store.
+
+    `parts` identify the content (kind + inputs); `builder()` returns bytes,
+    str or BytesIO and only runs when no session has built this artifact yet.
+    The button gets a callable, so Streamlit fetches the bytes on click only.
+    """
+    import streamlit as st
+    target = container or st
+    return target.download_button(label, data=lambda: cached_bytes(parts, builder),
+                                  file_name=file_name, mime=mime, **kwargs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artifact store maintenance.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_gc = sub.add_parser("gc", help="remove unused artifacts now")
+    p_gc.add_argument("--max-mb", type=int, help=f"disk cap (default {DISK_LIMIT >> 20})")
+    p_gc.add_argument("--max-age-days", type=float, help=f"unused-for limit (default {MAX_AGE / 86400:g})")
+    args = parser.parse_args()
+
+    if args.max_mb is not None:
+        STORE.disk_limit = args.max_mb * 1024 * 1024
+    if args.max_age_days is not None:
+        STORE.max_age = args.max_age_days * 86400
+    print(json.dumps(STORE.gc()))
@@ -0,0 +1,38 @@
+# downsample.py
+# Shape-preserving downsampling for charts: Largest-Triangle-Three-Buckets
+# (Steinarsson, 2013). Keeps peaks and dips that plain striding or averaging
+# would flatten, so long series can be sent to the browser as a few hundred points.
+import numpy as np
+
+def lttb(x, y, n_out: int):
+    """Indices of the points LTTB keeps (always includes first and last).
+
+    x must be sorted ascending; NaN values in y should be removed beforehand.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+    # bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def downsample(x, y, n_out: int):
+    """(x, y) reduced to at most n_out points with LTTB."""
+    idx = lttb(x, y, n_out)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
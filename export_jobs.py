@@ -0,0 +1,375 @@
+# export_jobs.py
+# Background export jobs for the apps' bulk downloads (PDF bundles, printed-card
+# batches, every language at once). Submitting an export returns a job ID at
+# once; a small thread pool renders it item by item through the shared artifact
+# store (so a resubmitted or interrupted export only renders what's missing),
+# zips the result into the store and records its digest. Pages keep the job IDs
+# in the URL (?jobs=...), poll progress with a fragment, can cancel, and the
+# finished ZIP stays downloadable by job ID for RETENTION seconds -- also after
+# a browser refresh, or from another process sharing the cache directory. A
+# finished job is only reused while its sources (the item artifact keys) are
+# unchanged; purging an expired job also deletes its ZIP from the store.
+#
+# Job state lives in memory and in .aquashield_cache/exports/<id>.json.
+#
+#   python export_jobs.py run all_languages        # render one export now
+#   python export_jobs.py list                     # jobs on disk
+#   python export_jobs.py purge                    # drop expired jobs
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import artifact_store
+import aquashield_render as render
+import i18n_catalog
+from aquashield_filters import FILTER_KEYS, file_stem
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+JOBS_DIR = os.path.join(CACHE_DIR, "exports")
+WORKERS = int(os.environ.get("AQUASHIELD_EXPORT_WORKERS", "2"))
+RETENTION = float(os.environ.get("AQUASHIELD_EXPORT_RETENTION_H", "24")) * 3600
+POLL_INTERVAL = 1.0  # seconds between progress refreshes in the UI
+ACTIVE = ("queued", "running")
+
+class Cancelled(Exception):
+    pass
+
+# -------------------------
+# What each export contains
+# -------------------------
+def _pdf_items(kind: str, locale: str, name: str = "{stem}_{kind}.pdf"):
+    missing = "ui.short_unavailable" if kind in ("short", "card") else "ui.full_unavailable"
+    for k in FILTER_KEYS:
+        text = i18n_catalog.filter_text(k, kind, locale, i18n_catalog.t(missing, locale))
+        label = "SHORT" if kind == "card" else kind.upper()
+        yield (name.format(stem=file_stem(k), kind=label, locale=locale.upper()), *render.a5_pdf_artifact(text))
+
+def _card_items(locale: str, name: str = "{stem}_CARD_{locale}.pdf"):
+    for k in FILTER_KEYS:
+        text = i18n_catalog.filter_text(k, "card", locale)
+        yield (name.format(stem=file_stem(k), locale=locale.upper()), *render.printed_card_artifact(k, text))
+
+def _all_languages_items():
+    for loc in i18n_catalog.available_locales():
+        yield from _pdf_items("short", loc, f"{loc}/{{stem}}_{{kind}}.pdf")
+        yield from _pdf_items("full", loc, f"{loc}/{{stem}}_{{kind}}.pdf")
+        yield from _card_items(loc, f"{loc}/cards/{{stem}}_CARD.pdf")
+
+# export name -> (label, download file name, items(**params))
+# items are (path in the ZIP, artifact parts, builder)
+EXPORTS = {
+    "pdfs": ("{kind} PDFs ({locale})", "AquaShield_{kind}_PDFs_{locale}.zip",
+             lambda kind, locale: _pdf_items(kind, locale)),
+    "card_pdfs": ("card + full PDFs ({locale})", "AquaShield_All_PDFs_{locale}.zip",
+                  lambda locale: [*_pdf_items("card", locale, "{stem}_{kind}_{locale}.pdf"),
+                                  *_pdf_items("full", locale, "{stem}_{kind}_{locale}.pdf")]),
+    "printed_cards": ("printed cards ({locale})", "AquaShield_Printed_Cards_{locale}.zip",
+                      lambda locale: _card_items(locale)),
+    "all_languages": ("all languages", "AquaShield_All_Languages.zip",
+                      lambda: _all_languages_items()),
+}
+
+def export_label(export: str, params: dict) -> str:
+    return EXPORTS[export][0].format(**params)
+
+def sources_fingerprint(export: str, params: dict) -> str:
+    """Key over every item's path and artifact key: changes when any text or renderer does."""
+    return artifact_store.artifact_key(*(f"{name}\0{artifact_store.artifact_key(*parts)}"
+                                         for name, parts, _ in EXPORTS[export][2](**params)))
+
+def export_file_name(export: str, params: dict) -> str:
+    return EXPORTS[export][1].format(**{k: str(v).upper() if k == "locale" else str(v).capitalize()
+                                        for k, v in params.items()})
+
+# -------------------------
+# Jobs
+# -------------------------
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+class Job:
+    def __init__(self, export: str, params: dict, job_id: str = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.export = export
+        self.params = dict(params)
+        self.file_name = export_file_name(export, params)
+        self.state = "queued"
+        self.done = self.total = 0
+        self.created = time.time()
+        self.started = self.finished = None
+        self.digest = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    def to_dict(self) -> dict:
+        d = {k: getattr(self, k) for k in ("id", "export", "params", "file_name", "state", "done", "total",
+                                            "created", "started", "finished", "digest", "error")}
+        d["pid"] = os.getpid()
+        d["eta_s"] = None
+        if self.state == "running" and self.done and self.started:
+            d["eta_s"] = round((time.time() - self.started) / self.done * (self.total - self.done), 1)
+        return d
+
+    def save(self):
+        try:
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            tmp = f"{_job_path(self.id)}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp, _job_path(self.id))
+        except OSError:
+            pass  # progress still shows from memory
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        """Render every item (reusing stored ones), then store the ZIP."""
+        if self._cancel.is_set():
+            self._finish("cancelled")
+            return
+        self.state, self.started = "running", time.time()
+        try:
+            items = list(EXPORTS[self.export][2](**self.params))
+            self.total = len(items) + 1
+            self.save()
+            artifact_store.prefetch([parts for _, parts, _ in items])
+            digests = []
+            for name, parts, builder in items:
+                if self._cancel.is_set():
+                    raise Cancelled()
+                digests.append((name, artifact_store.digest_for_parts(parts, builder)))
+                self.done += 1
+                self.save()
+            key = artifact_store.artifact_key("export", self.export, *sorted(self.params.items()), *digests)
+            self.digest = artifact_store.STORE.digest_for(key, lambda: _zip(digests))
+            self.done = self.total
+            self._finish("done")
+        except Cancelled:
+            self._finish("cancelled")
+        except Exception as e:
+            self.error = str(e)
+            self._finish("failed")
+
+    def _finish(self, state: str):
+        self.state, self.finished = state, time.time()
+        self.save()
+
+def _zip(digests) -> bytes:
+    """The export ZIP (plus the offline search index) from stored item digests."""
+    return render.build_pdfs_zip({name: io.BytesIO(artifact_store.STORE.get(d)) for name, d in digests}).getvalue()
+
+class JobManager:
+    def __init__(self, workers: int = WORKERS, retention: float = RETENTION):
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aquashield-export")
+        self._lock = threading.Lock()
+        self._jobs = {}    # id -> Job
+        self._active = {}  # (export, params, sources fingerprint) -> id of a queued/running/done job
+
+    def submit(self, export: str, params: dict = None) -> str:
+        """Queue an export (or return the job already producing it); returns the job ID."""
+        params = params or {}
+        if export not in EXPORTS:
+            raise KeyError(f"unknown export {export!r}")
+        self.purge()
+        signature = (export, tuple(sorted(params.items())), sources_fingerprint(export, params))
+        with self._lock:
+            existing = self._jobs.get(self._active.get(signature))
+            if existing and existing.state in ACTIVE + ("done",):
+                return existing.id
+            job = Job(export, params)
+            self._jobs[job.id] = job
+            self._active[signature] = job.id
+        job.save()
+        self._pool.submit(job.run)
+        return job.id
+
+    def status(self, job_id: str):
+        """Job status dict from this process or the jobs directory; None if unknown or expired."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            with open(_job_path(job_id), encoding="utf-8") as f:
+                s = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if s["state"] in ACTIVE and not _alive(s["pid"]):
+            # the process running it exited; resubmitting reuses the items it rendered
+            s["state"], s["eta_s"] = "interrupted", None
+        if s["finished"] and time.time() - s["finished"] > self.retention:
+            return None
+        return s
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.state not in ACTIVE:
+            return False
+        job.cancel()
+        return True
+
+    def result(self, job_id: str) -> bytes:
+        s = self.status(job_id)
+        if not s or s["state"] != "done":
+            raise KeyError(f"no finished export {job_id}")
+        return artifact_store.STORE.get(s["digest"])
+
+    def purge(self) -> int:
+        """Forget jobs that finished more than `retention` seconds ago, and their ZIPs; returns how many.
+
+        A ZIP is kept while a live job still points at it (an identical export
+        submitted again gets the same digest).
+        """
+        cutoff = time.time() - self.retention
+        removed = 0
+        expired, kept = set(), set()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished and job.finished < cutoff:
+                    del self._jobs[job_id]
+                    expired.add(job.digest)
+                else:
+                    kept.add(job.digest)
+        try:
+            names = os.listdir(JOBS_DIR)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(JOBS_DIR, name), encoding="utf-8") as f:
+                    s = json.load(f)
+                if (s.get("finished") or s["created"]) < cutoff and (s["state"] not in ACTIVE or not _alive(s["pid"])):
+                    os.remove(os.path.join(JOBS_DIR, name))
+                    expired.add(s.get("digest"))
+                    removed += 1
+                else:
+                    kept.add(s.get("digest"))
+            except (OSError, ValueError, KeyError):
+                pass
+        for digest in expired - kept - {None}:
+            artifact_store.STORE.delete(digest)
+        return removed
+
+def _alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        pass
+    return True
+
+MANAGER = JobManager()
+
+# -------------------------
+# Streamlit panel
+# -------------------------
+def _url_jobs(st) -> list:
+    return [j for j in st.query_params.get("jobs", "").split(",") if j]
+
+def _set_url_jobs(st, ids):
+    if ids:
+        st.query_params["jobs"] = ",".join(ids)
+    elif "jobs" in st.query_params:
+        del st.query_params["jobs"]
+
+def export_panel(export: str, params: dict = None, container=None):
+    """Prepare / progress / cancel / download controls for one export.
+
+    The job ID is kept in the page URL, so a refresh picks the job up again.
+    While it runs only this panel reruns (every POLL_INTERVAL seconds).
+    """
+    import streamlit as st
+    params = params or {}
+    label = export_label(export, params)
+    ui_key = f"export_{export}_" + "_".join(f"{v}" for _, v in sorted(params.items()))
+
+    def find_job():
+        for job_id in _url_jobs(st):
+            s = MANAGER.status(job_id)
+            if s and s["export"] == export and s["params"] == params:
+                return s
+        return None
+
+    def panel():
+        s = find_job()
+        if s is None or s["state"] in ("cancelled", "failed", "interrupted"):
+            if s is not None:
+                st.caption(f"Export {s['state']}" + (f": {s['error']}" if s.get("error") else ""))
+            if st.button(f"Prepare {label} (ZIP)", key=f"{ui_key}_go"):
+                job_id = MANAGER.submit(export, params)
+                ids = [j for j in _url_jobs(st) if j != (s or {}).get("id")]
+                _set_url_jobs(st, ids + [job_id])
+                st.rerun()
+            return
+        if s["state"] in ACTIVE:
+            eta = f" · about {s['eta_s']:.0f}s left" if s["eta_s"] is not None else ""
+            st.progress(s["done"] / s["total"] if s["total"] else 0.0,
+                        text=f"Preparing {label}: {s['done']}/{s['total'] or '…'}{eta}")
+            if st.button("Cancel", key=f"{ui_key}_cancel"):
+                MANAGER.cancel(s["id"])
+                st.rerun()
+            return
+        job_id = s["id"]
+        st.download_button(f"⬇ Download {label} (ZIP)", data=lambda: MANAGER.result(job_id),
+                           file_name=s["file_name"], mime="application/zip", key=f"{ui_key}_dl")
+        if st.button("Dismiss", key=f"{ui_key}_dismiss"):
+            _set_url_jobs(st, [j for j in _url_jobs(st) if j != job_id])
+            st.rerun()
+
+    s = find_job()
+    polling = s is not None and s["state"] in ACTIVE
+    target = container or st.container()
+    with target:
+        if polling:
+            @st.fragment(run_every=POLL_INTERVAL)
+            def poll():
+                if (find_job() or {}).get("state") not in ACTIVE:
+                    st.rerun()  # finished: redraw once without polling
+                panel()
+            poll()
+        else:
+            panel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or inspect AquaShield background exports.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="render one export in this process and print where it went")
+    p_run.add_argument("export", choices=sorted(EXPORTS))
+    p_run.add_argument("params", nargs="*", metavar="NAME=VALUE", help="e.g. kind=short locale=es")
+    sub.add_parser("list", help="jobs recorded in the jobs directory")
+    sub.add_parser("purge", help="remove jobs older than the retention window")
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        params = dict(p.split("=", 1) for p in args.params)
+        job_id = MANAGER.submit(args.export, params)
+        while True:
+            s = MANAGER.status(job_id)
+            print(f"\r{s['state']:<9} {s['done']}/{s['total']}", end="", file=sys.stderr)
+            if s["state"] not in ACTIVE:
+                break
+            time.sleep(0.2)
+        print(file=sys.stderr)
+        if s["state"] != "done":
+            print(f"{job_id}: {s['state']} {s.get('error') or ''}")
+            sys.exit(1)
+        print(f"{job_id}: {s['file_name']} {len(MANAGER.result(job_id))} bytes in "
+              f"{s['finished'] - s['started']:.1f}s (sha256 {s['digest'][:12]})")
+    elif args.cmd == "list":
+        for name in sorted(os.listdir(JOBS_DIR)) if os.path.isdir(JOBS_DIR) else []:
+            s = MANAGER.status(name[:-5]) if name.endswith(".json") else None
+            if s:
+                print(f"{s['id']}  {s['state']:<11} {s['done']:>3}/{s['total']:<3} {s['file_name']}")
+    else:
+        print(f"removed {MANAGER.purge()} expired jobs")
@@ -0,0 +1,408 @@
+# field_aggregates.py
+# Streaming, out-of-core aggregation of field test CSVs (same schema as
+# performance_data.py). Rows are read in bounded chunks and folded into running
+# statistics per filter / region / month: count, mean, variance (Welford/Chan
+# merge), min/max and a relative-error quantile sketch (DDSketch style).
+# State is persisted as JSON together with a byte offset per source file, so
+# appended uploads are folded in without rereading old rows and the dashboard
+# can start from the saved state without touching the CSVs. Folding happens in
+# `update` (CLI) or the background updater warmup.start() launches at process
+# start (start_updater()); the dashboard only reads the saved state.
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import performance_data
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+STATE_PATH = os.path.join(CACHE_DIR, "aggregates", "state.json")
+STATE_VERSION = 1
+
+CHUNK_ROWS = 100_000
+UPDATE_INTERVAL = float(os.environ.get("AQUASHIELD_AGGREGATES_INTERVAL", "300"))  # seconds between folds
+DIMENSIONS = ("filter", "region", "month")
+METRICS = ("lrv", "turbidity_in_ntu", "turbidity_out_ntu", "flow_lph")
+
+# Sketch: 2% relative accuracy, at most MAX_BUCKETS buckets per sign
+SKETCH_ALPHA = 0.02
+SKETCH_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+SKETCH_LOG_GAMMA = math.log(SKETCH_GAMMA)
+MAX_BUCKETS = 512
+# Appended files are recognised by the last bytes before the saved offset; a
+# rewrite of older rows with identical tail bytes needs `update --rebuild`.
+TAIL_CHECK_BYTES = 4096
+
+# -------------------------
+# Quantile sketch
+# -------------------------
+# Stored as {"zero": n, "pos": [first_index, [counts...]], "neg": [first_index, [counts...]]}.
+# Bucket i holds values in (gamma^(i-1), gamma^i]; dense count lists keep the JSON small.
+def empty_sketch() -> dict:
+    return {"zero": 0, "pos": [0, []], "neg": [0, []]}
+
+def _bucket_indices(values):
+    return np.ceil(np.log(values) / SKETCH_LOG_GAMMA).astype(np.int64)
+
+def _add_dense(dense, indices, counts):
+    """Add counts at bucket indices to a [first_index, counts] pair (in place)."""
+    if len(indices) == 0:
+        return
+    first, buckets = dense
+    lo, hi = int(indices.min()), int(indices.max())
+    if not buckets:
+        first = lo
+    new_first = min(first, lo)
+    new_last = max(first + len(buckets) - 1, hi)
+    merged = [0] * (new_last - new_first + 1)
+    merged[first - new_first:first - new_first + len(buckets)] = buckets
+    for i, c in zip(indices.tolist(), counts.tolist()):
+        merged[i - new_first] += c
+    if len(merged) > MAX_BUCKETS:
+        # collapse the lowest buckets: keeps relative accuracy for the upper quantiles
+        extra = len(merged) - MAX_BUCKETS
+        merged = [sum(merged[:extra + 1])] + merged[extra + 1:]
+        new_first += extra
+    dense[0], dense[1] = new_first, merged
+
+def sketch_add(sketch: dict, values):
+    values = values[~np.isnan(values)]
+    sketch["zero"] += int(np.count_nonzero(values == 0))
+    for sign, part in (("pos", values[values > 0]), ("neg", -values[values < 0])):
+        if len(part):
+            idx, counts = np.unique(_bucket_indices(part), return_counts=True)
+            _add_dense(sketch[sign], idx, counts)
+
+def sketch_merge(into: dict, other: dict):
+    into["zero"] += other["zero"]
+    for sign in ("pos", "neg"):
+        first, buckets = other[sign]
+        if buckets:
+            _add_dense(into[sign], np.arange(first, first + len(buckets)), np.array(buckets))
+
+def sketch_quantile(sketch: dict, q: float):
+    """Approximate q-quantile (0..1), within SKETCH_ALPHA relative error."""
+    neg_first, neg = sketch["neg"]
+    pos_first, pos = sketch["pos"]
+    total = sketch["zero"] + sum(neg) + sum(pos)
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    value = lambda i: 2 * SKETCH_GAMMA ** i / (SKETCH_GAMMA + 1)
+    for j in range(len(neg) - 1, -1, -1):  # most negative first
+        seen += neg[j]
+        if seen > rank:
+            return -value(neg_first + j)
+    seen += sketch["zero"]
+    if seen > rank:
+        return 0.0
+    for j, c in enumerate(pos):
+        seen += c
+        if seen > rank:
+            return value(pos_first + j)
+    return value(pos_first + len(pos) - 1)
+
+# -------------------------
+# Running moments
+# -------------------------
+def empty_stat() -> dict:
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None, "sketch": empty_sketch()}
+
+def stat_merge(a: dict, n: int, mean: float, m2: float, lo: float, hi: float):
+    """Chan et al. parallel merge of (n, mean, M2) into a running stat."""
+    if n == 0:
+        return
+    total = a["n"] + n
+    delta = mean - a["mean"]
+    a["mean"] += delta * n / total
+    a["m2"] += m2 + delta * delta * a["n"] * n / total
+    a["n"] = total
+    a["min"] = lo if a["min"] is None else min(a["min"], lo)
+    a["max"] = hi if a["max"] is None else max(a["max"], hi)
+
+def stat_combine(a: dict, b: dict):
+    stat_merge(a, b["n"], b["mean"], b["m2"], b["min"], b["max"])
+    sketch_merge(a["sketch"], b["sketch"])
+
+def summarize(stat: dict, quantiles=(0.05, 0.5, 0.95)) -> dict:
+    n = stat["n"]
+    out = {"n": n, "mean": stat["mean"] if n else None,
+           "std": math.sqrt(stat["m2"] / (n - 1)) if n > 1 else None,
+           "min": stat["min"], "max": stat["max"]}
+    for q in quantiles:
+        out[f"p{round(q * 100)}"] = sketch_quantile(stat["sketch"], q)
+    return out
+
+# -------------------------
+# State
+# -------------------------
+def empty_state() -> dict:
+    return {"version": STATE_VERSION, "sources": {}, "groups": {}}
+
+def load_state(path: str = STATE_PATH) -> dict:
+    if not os.path.exists(path):
+        return empty_state()
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else empty_state()
+
+def save_state(state: dict, path: str = STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(state, separators=(",", ":")))  # dumps uses the C encoder, dump does not
+    os.replace(tmp, path)
+
+def group_key(filter_name: str, region: str, month: str) -> str:
+    return f"{filter_name}|{region}|{month}"
+
+def split_key(key: str) -> dict:
+    return dict(zip(DIMENSIONS, key.split("|")))
+
+# -------------------------
+# Folding chunks in
+# -------------------------
+def chunk_metrics(cols: dict) -> dict:
+    """Metric arrays for one validated chunk (see performance_data.validate_chunk)."""
+    return {
+        "lrv": performance_data.log_reduction(cols["ecoli_in_cfu_100ml"], cols["ecoli_out_cfu_100ml"]),
+        "turbidity_in_ntu": cols["turbidity_in_ntu"],
+        "turbidity_out_ntu": cols["turbidity_out_ntu"],
+        "flow_lph": cols["flow_lph"],
+    }
+
+def fold_chunk(state: dict, cols: dict):
+    """Fold one chunk into the per-group running stats, vectorized per group."""
+    if len(cols["filter"]) == 0:
+        return
+    months = np.datetime_as_string(cols["date"].astype("datetime64[D]").astype("datetime64[M]"))
+    codes, names = [], []
+    for values in (cols["filter"], cols["region"], months):
+        c, u = pd.factorize(values)
+        codes.append(c)
+        names.append(u)
+    combo = (codes[0] * len(names[1]) + codes[1]) * len(names[2]) + codes[2]
+    uniq, inv = np.unique(combo, return_inverse=True)
+    g = len(uniq)
+    keys = []
+    for u in uniq.tolist():
+        u, m = divmod(u, len(names[2]))
+        f, r = divmod(u, len(names[1]))
+        keys.append(group_key(names[0][f], names[1][r], names[2][m]))
+    groups = state["groups"]
+    for metric, x in chunk_metrics(cols).items():
+        ok = ~np.isnan(x)
+        xi, xv = inv[ok], x[ok]
+        n = np.bincount(xi, minlength=g)
+        s = np.bincount(xi, weights=xv, minlength=g)
+        mean = s / np.maximum(n, 1)
+        m2 = np.bincount(xi, weights=(xv - mean[xi]) ** 2, minlength=g)
+        lo = np.full(g, np.inf)
+        hi = np.full(g, -np.inf)
+        np.minimum.at(lo, xi, xv)
+        np.maximum.at(hi, xi, xv)
+        order = np.argsort(xi, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(n)))
+        sorted_x = xv[order]
+        for j in np.flatnonzero(n):
+            stat = groups.setdefault(keys[j], {}).setdefault(metric, empty_stat())
+            stat_merge(stat, int(n[j]), float(mean[j]), float(m2[j]), float(lo[j]), float(hi[j]))
+            sketch_add(stat["sketch"], sorted_x[bounds[j]:bounds[j + 1]])
+
+class _Bounded:
+    """File wrapper that stops reading at `limit` (the last complete line)."""
+
+    def __init__(self, f, limit: int):
+        self.f, self.left = f, limit
+
+    def read(self, n: int = -1) -> bytes:
+        if self.left <= 0:
+            return b""
+        n = self.left if n is None or n < 0 else min(n, self.left)
+        data = self.f.read(n)
+        self.left -= len(data)
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.f.readline(self.left) if self.left > 0 else b""
+            if not line:
+                return
+            self.left -= len(line)
+            yield line
+
+def _tail_sha(path: str, end: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(max(0, end - TAIL_CHECK_BYTES))
+        return hashlib.sha256(f.read(end - max(0, end - TAIL_CHECK_BYTES))).hexdigest()
+
+def _last_newline(path: str) -> int:
+    """Offset just past the last newline: a partially written last row is left for next time."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            i = block.rfind(b"\n")
+            if i >= 0:
+                return pos - step + i + 1
+            pos -= step
+    return 0
+
+def fold_file(state: dict, path: str, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Fold rows of `path` past its recorded offset into `state`.
+
+    Returns {"rows", "errors", "reset"}; reset=True means the already folded
+    part of the file changed, so the caller has to rebuild from scratch.
+    """
+    rel = os.path.relpath(path, BASE_DIR)
+    src = state["sources"].get(rel)
+    end = _last_newline(path)
+    if src is not None:
+        if end < src["offset"] or _tail_sha(path, src["offset"]) != src["tail_sha256"]:
+            return {"rows": 0, "errors": [], "reset": True}
+        if end == src["offset"]:
+            return {"rows": 0, "errors": [], "reset": False}
+    header = pd.read_csv(path, nrows=0).columns.str.strip().str.lower()
+    missing = [n for n, (_, required, _) in performance_data.SCHEMA.items() if required and n not in header]
+    if missing:
+        return {"rows": 0, "errors": [f"{rel}: missing required column(s): {', '.join(missing)}"], "reset": False}
+    with open(path, "rb") as f:
+        header_end = len(f.readline())
+    offset = src["offset"] if src else header_end
+    line = src["lines"] + 1 if src else 2
+    rows, errors = 0, []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        reader = pd.read_csv(_Bounded(f, end - offset), names=list(header), header=None, dtype=str,
+                             keep_default_na=False, chunksize=chunk_rows, skipinitialspace=True)
+        for df in reader:
+            cols, errs = performance_data.validate_chunk(df, path, line)
+            fold_chunk(state, cols)
+            errors += errs
+            rows += len(cols["filter"])
+            line += len(df)
+    state["sources"][rel] = {
+        "offset": end, "lines": line - 1, "tail_sha256": _tail_sha(path, end),
+        "rows": (src["rows"] if src else 0) + rows,
+    }
+    return {"rows": rows, "errors": errors, "reset": False}
+
+def update(paths=None, state_path: str = STATE_PATH, rebuild: bool = False, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Fold new data from `paths` (default: every CSV under data/) and persist the state."""
+    paths = performance_data.source_csvs() if paths is None else [os.path.abspath(p) for p in paths]
+    state = empty_state() if rebuild else load_state(state_path)
+    report = {"rows_added": 0, "errors": [], "rebuilt": rebuild}
+    before = json.dumps(state["sources"], sort_keys=True)
+    for path in paths:
+        res = fold_file(state, path, chunk_rows)
+        if res["reset"]:
+            # sketches and moments cannot un-count rows: start over from every source
+            # folded so far plus `paths` (not just `paths`, or the others would be lost)
+            known = [os.path.normpath(os.path.join(BASE_DIR, rel)) for rel in state["sources"]]
+            report = {"rows_added": 0, "errors": [], "rebuilt": True}
+            missing = [p for p in known if not os.path.exists(p)]
+            report["errors"] += [f"{os.path.relpath(p, BASE_DIR)}: no longer exists, dropped on rebuild" for p in missing]
+            state = empty_state()
+            for p in list(dict.fromkeys(paths + [p for p in known if p not in missing])):
+                res = fold_file(state, p, chunk_rows)
+                report["rows_added"] += res["rows"]
+                report["errors"] += res["errors"]
+            break
+        report["rows_added"] += res["rows"]
+        report["errors"] += res["errors"]
+        if res["rows"]:
+            save_state(state, state_path)  # checkpoint per file
+    if report["rebuilt"] or json.dumps(state["sources"], sort_keys=True) != before:
+        save_state(state, state_path)
+    report["groups"] = len(state["groups"])
+    return report
+
+_updater_lock = threading.Lock()
+_updater = None
+FIRST_FOLD = threading.Event()  # set once the background updater has folded once
+
+def start_updater(interval: float = UPDATE_INTERVAL, state_path: str = STATE_PATH):
+    """Fold new rows in a daemon thread now and every `interval` seconds (0: once); once per process."""
+    global _updater
+    with _updater_lock:
+        if _updater is not None:
+            return _updater
+
+        def loop():
+            while True:
+                try:
+                    update(state_path=state_path)
+                except Exception as e:
+                    # a bad file must not stop later folds; the CLI shows the details
+                    print(f"field_aggregates: update failed: {e}", file=sys.stderr)
+                FIRST_FOLD.set()
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+        _updater = threading.Thread(target=loop, name="aquashield-aggregates", daemon=True)
+        _updater.start()
+    return _updater
+
+def folding() -> bool:
+    """True while this process's updater is still on its first fold."""
+    return _updater is not None and not FIRST_FOLD.is_set()
+
+# -------------------------
+# Queries
+# -------------------------
+def rollup(state: dict, metric: str, by=("filter",), **where) -> dict:
+    """Merge group stats over the dimensions not in `by`; where filters by exact value (e.g. region='Kenya')."""
+    out = {}
+    for key, metrics in state["groups"].items():
+        dims = split_key(key)
+        if any(v is not None and dims[d] != v for d, v in where.items()):
+            continue
+        if metric not in metrics:
+            continue
+        target = out.setdefault(tuple(dims[d] for d in by), empty_stat())
+        stat_combine(target, metrics[metric])
+    return {k: summarize(v) for k, v in sorted(out.items())}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming aggregates for field test CSVs.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_up = sub.add_parser("update", help="fold new rows (default: every CSV under data/)")
+    p_up.add_argument("paths", nargs="*")
+    p_up.add_argument("--rebuild", action="store_true")
+    p_up.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p_show = sub.add_parser("show", help="print rolled-up statistics from the saved state")
+    p_show.add_argument("--metric", default="lrv", choices=METRICS)
+    p_show.add_argument("--by", default="filter", help="comma-separated subset of filter,region,month")
+    for d in DIMENSIONS:
+        p_show.add_argument(f"--{d}")
+    args = parser.parse_args()
+
+    if args.cmd == "update":
+        t0 = time.perf_counter()
+        rep = update(args.paths or None, rebuild=args.rebuild, chunk_rows=args.chunk_rows)
+        for e in rep["errors"][:50]:
+            print(e, file=sys.stderr)
+        print(f"+{rep['rows_added']} rows, {rep['groups']} groups{' (rebuilt)' if rep['rebuilt'] else ''} "
+              f"({time.perf_counter() - t0:.2f}s)")
+    else:
+        t0 = time.perf_counter()
+        by = tuple(args.by.split(","))
+        result = rollup(load_state(), args.metric, by=by, **{d: getattr(args, d) for d in DIMENSIONS})
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"
+        print(f"{'/'.join(by):<28}{'n':>9}{'mean':>9}{'std':>9}{'p5':>9}{'p50':>9}{'p95':>9}")
+        for k, s in result.items():
+            print(f"{'/'.join(k):<28}{s['n']:>9}{fmt(s['mean']):>9}{fmt(s['std']):>9}"
+                  f"{fmt(s['p5']):>9}{fmt(s['p50']):>9}{fmt(s['p95']):>9}")
+        print(f"({time.perf_counter() - t0:.3f}s)", file=sys.stderr)
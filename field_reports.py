@@ -0,0 +1,480 @@
+# field_reports.py
+# Local ingestion service for volunteer field reports (water tests and filter
+# status). SQLite in WAL mode; a single writer thread commits submissions in
+# batches, submission_id makes retried uploads idempotent, and indexes serve
+# per-filter and per-site queries. Stdlib only: http.server + sqlite3.
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from aquashield_filters import FILTER_KEYS, filter_letter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("AQUASHIELD_REPORTS_DB", os.path.join(BASE_DIR, "data", "field_reports.sqlite3"))
+
+FILTER_LETTERS = [filter_letter(k) for k in FILTER_KEYS]
+# Observations from documentation/english/decision_chart.md (Step 1 and Step 4)
+SMELL_FLAGS = ("cloudy", "fuel_solvent", "chemical_smell", "metal_taste", "unusual_color", "oil_film")
+STATUSES = ("ok", "slow_flow", "needs_maintenance", "damaged", "not_in_use")
+
+BATCH_MAX = 500
+# Group commit: the writer takes whatever queued up while the previous batch was
+# committing. BATCH_WAIT > 0 additionally lingers to fill batches (fewer fsyncs, more latency).
+BATCH_WAIT = 0.0
+MAX_BODY = 1 << 20
+# Longest accepted free-text fields (characters); notes are cut, the others rejected
+TEXT_LIMITS = {"submission_id": 64, "site_id": 64, "region": 100, "reporter": 100, "notes": 2000}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    submission_id TEXT NOT NULL UNIQUE,
+    received_at TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    filter TEXT NOT NULL,
+    site_id TEXT NOT NULL,
+    region TEXT,
+    lat REAL,
+    lon REAL,
+    turbidity_ntu REAL,
+    flags INTEGER NOT NULL DEFAULT 0,
+    status TEXT,
+    reporter TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS reports_filter_time ON reports(filter, observed_at);
+CREATE INDEX IF NOT EXISTS reports_site_time ON reports(site_id, observed_at);
+"""
+COLUMNS = ("submission_id", "received_at", "observed_at", "filter", "site_id", "region",
+           "lat", "lon", "turbidity_ntu", "flags", "status", "reporter", "notes")
+
+def connect(path: str = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: every commit is fsynced, so an answered submission survives power loss;
+        # batching keeps that to one fsync per batch
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(SCHEMA_SQL)
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+# -------------------------
+# Validation
+# -------------------------
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def _iso(value) -> str:
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+def flags_to_int(flags) -> int:
+    bits = 0
+    for f in flags or ():
+        if f not in SMELL_FLAGS:
+            raise ValueError(f"unknown flag '{f}' (expected one of {', '.join(SMELL_FLAGS)})")
+        bits |= 1 << SMELL_FLAGS.index(f)
+    return bits
+
+def flags_from_int(bits: int):
+    return [f for i, f in enumerate(SMELL_FLAGS) if bits & (1 << i)]
+
+def _text(obj: dict, key: str, required: bool = False, cut: bool = False):
+    """A free-text field as a stripped string (numbers are accepted as text), or None."""
+    v = obj.get(key)
+    if v is None or v == "":
+        v = None
+    elif isinstance(v, str) or (isinstance(v, (int, float)) and not isinstance(v, bool)):
+        v = str(v).strip() or None
+    else:
+        raise ValueError(f"{key} must be a string")
+    limit = TEXT_LIMITS[key]
+    if v is None and required:
+        raise ValueError(f"{key} is required (max {limit} chars)")
+    if v is not None and len(v) > limit:
+        if not cut:
+            raise ValueError(f"{key} is too long (max {limit} chars)")
+        v = v[:limit]
+    return v
+
+def validate_report(obj: dict) -> tuple:
+    """Report JSON -> row tuple in COLUMNS order; raises ValueError with a readable message.
+
+    Every value that reaches SQLite is checked here, so one malformed report can
+    only fail its own request (400), never the batch it would be written with.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("report must be a JSON object")
+    sid = _text(obj, "submission_id", required=True)
+    f = obj.get("filter")
+    f = f.strip() if isinstance(f, str) else ""
+    letter = filter_letter(f) if f.lower().startswith("filter ") else f.upper()
+    if letter not in FILTER_LETTERS:
+        raise ValueError(f"filter must be one of {', '.join(FILTER_LETTERS)}")
+    site = _text(obj, "site_id", required=True)
+    try:
+        observed = _iso(obj["observed_at"]) if obj.get("observed_at") else _now()
+    except ValueError:
+        raise ValueError("observed_at must be an ISO 8601 date/time") from None
+    num = {}
+    for key, lo, hi in (("lat", -90, 90), ("lon", -180, 180), ("turbidity_ntu", 0, 100000)):
+        v = obj.get(key)
+        if v is None or v == "":
+            num[key] = None
+            continue
+        try:
+            if isinstance(v, bool):
+                raise TypeError
+            v = float(v)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{key} must be a number") from None
+        if not lo <= v <= hi:
+            raise ValueError(f"{key} out of range [{lo}, {hi}]")
+        num[key] = v
+    status = obj.get("status")
+    if status is not None and not (isinstance(status, str) and status in STATUSES):
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    flags = obj.get("flags")
+    if flags is not None and not (isinstance(flags, list) and all(isinstance(x, str) for x in flags)):
+        raise ValueError("flags must be a list of strings")
+    return (sid, _now(), observed, letter, site, _text(obj, "region"), num["lat"], num["lon"],
+            num["turbidity_ntu"], flags_to_int(flags), status, _text(obj, "reporter"),
+            _text(obj, "notes", cut=True))
+
+# -------------------------
+# Batched writer
+# -------------------------
+class RejectedError(ValueError):
+    """SQLite refused a submission's rows (bad data, not a server problem)."""
+
+class _Pending:
+    __slots__ = ("rows", "results", "done", "error")
+
+    def __init__(self, rows):
+        self.rows, self.results, self.done, self.error = rows, None, threading.Event(), None
+
+class ReportWriter:
+    """Single writer thread: submissions from all request threads share one transaction per batch."""
+
+    def __init__(self, path: str = DB_PATH, batch_max: int = BATCH_MAX, batch_wait: float = BATCH_WAIT):
+        self.conn = connect(path)
+        self.batch_max, self.batch_wait = batch_max, batch_wait
+        self.queue = queue.Queue()
+        self.batches = self.rows_written = self.duplicates = 0
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, timeout: float = 30.0):
+        """Queue validated rows and wait until their batch is committed.
+
+        Returns ['accepted' | 'duplicate'] per row.
+        """
+        p = _Pending(rows)
+        self.queue.put(p)
+        if not p.done.wait(timeout):
+            raise TimeoutError("write queue is backed up")
+        if p.error:
+            raise p.error
+        return p.results
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+        self.conn.close()
+
+    def _run(self):
+        sql = f"INSERT OR IGNORE INTO reports ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch, count = [item], len(item.rows)
+            deadline = time.monotonic() + self.batch_wait
+            stop = False
+            while count < self.batch_max:
+                try:
+                    wait = deadline - time.monotonic()
+                    nxt = self.queue.get(timeout=wait) if wait > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+                count += len(nxt.rows)
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for p in batch:
+                    # a savepoint per submission: a row SQLite rejects fails only its own request
+                    self.conn.execute("SAVEPOINT submission")
+                    try:
+                        results = []
+                        for row in p.rows:
+                            cur = self.conn.execute(sql, row)
+                            results.append("accepted" if cur.rowcount == 1 else "duplicate")
+                        p.results = results
+                    except (sqlite3.DatabaseError, sqlite3.InterfaceError, OverflowError) as e:
+                        if isinstance(e, sqlite3.OperationalError):
+                            raise  # disk full, locked, ...: the whole batch fails
+                        self.conn.execute("ROLLBACK TO submission")
+                        p.error = RejectedError(str(e))
+                    self.conn.execute("RELEASE submission")
+                self.conn.execute("COMMIT")
+                self.batches += 1
+                for p in batch:
+                    if p.error is None:
+                        self.rows_written += p.results.count("accepted")
+                        self.duplicates += p.results.count("duplicate")
+            except sqlite3.Error as e:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                for p in batch:
+                    p.error = e
+            for p in batch:
+                p.done.set()
+            if stop:
+                return
+
+# -------------------------
+# Queries
+# -------------------------
+def _row_dict(row) -> dict:
+    d = dict(row)
+    d.pop("id", None)
+    d["flags"] = flags_from_int(d["flags"])
+    return d
+
+def query_reports(conn, filter_name: str = None, site_id: str = None, since: str = None,
+                  until: str = None, limit: int = 100) -> list:
+    """Newest first; filter / site lookups use the (filter|site_id, observed_at) indexes."""
+    where, args = [], []
+    if filter_name:
+        where.append("filter = ?")
+        args.append(filter_name.upper())
+    if site_id:
+        where.append("site_id = ?")
+        args.append(site_id)
+    if since:
+        where.append("observed_at >= ?")
+        args.append(_iso(since))
+    if until:
+        where.append("observed_at <= ?")
+        args.append(_iso(until))
+    sql = "SELECT * FROM reports" + (f" WHERE {' AND '.join(where)}" if where else "")
+    sql += " ORDER BY observed_at DESC LIMIT ?"
+    # SQLite reads a negative LIMIT as "no limit"
+    return [_row_dict(r) for r in conn.execute(sql, args + [max(1, min(int(limit), 1000))])]
+
+def report_stats(conn, by: str = "filter", since: str = None) -> list:
+    if by not in ("filter", "site_id", "region", "status"):
+        raise ValueError("by must be filter, site_id, region or status")
+    flag_cols = ", ".join(f"SUM(flags & {1 << i} != 0) AS {f}" for i, f in enumerate(SMELL_FLAGS))
+    sql = (f"SELECT {by} AS key, COUNT(*) AS reports, AVG(turbidity_ntu) AS turbidity_mean, "
+           f"MAX(observed_at) AS last_report, {flag_cols} FROM reports")
+    args = []
+    if since:
+        sql += " WHERE observed_at >= ?"
+        args.append(_iso(since))
+    sql += f" GROUP BY {by} ORDER BY reports DESC"
+    return [dict(r) for r in conn.execute(sql, args)]
+
+# -------------------------
+# HTTP API
+# -------------------------
+# POST /reports        one report object or a list (offline devices upload in bulk)
+# GET  /reports?filter=D&site=S&since=2025-01-01&limit=100
+# GET  /stats?by=filter|site_id|region|status&since=...
+# GET  /health
+class ReportHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for bulk uploaders
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    server_version = "AquaShieldReports/1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reader(self):
+        local = self.server.local
+        if not hasattr(local, "conn"):
+            local.conn = connect(self.server.db_path, readonly=True)
+        return local.conn
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/reports":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return self._send(400, {"error": "invalid Content-Length"})
+        if length <= 0 or length > MAX_BODY:
+            return self._send(413 if length > MAX_BODY else 400, {"error": "body required (max 1 MiB)"})
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON"})
+        items = payload if isinstance(payload, list) else [payload]
+        rows, errors = [], []
+        for i, obj in enumerate(items):
+            try:
+                rows.append(validate_report(obj))
+            except ValueError as e:
+                errors.append({"index": i, "error": str(e)})
+        if errors:
+            # all-or-nothing per request so clients can simply retry the same batch
+            return self._send(400, {"errors": errors})
+        try:
+            results = self.server.writer.submit(rows)
+        except RejectedError as e:
+            return self._send(400, {"error": f"report rejected: {e}"})
+        except (TimeoutError, sqlite3.Error) as e:
+            return self._send(503, {"error": str(e)})
+        self._send(201 if "accepted" in results else 200, {
+            "accepted": results.count("accepted"), "duplicates": results.count("duplicate"),
+            "results": [{"submission_id": r[0], "status": s} for r, s in zip(rows, results)],
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/reports":
+                return self._send(200, query_reports(self._reader(), q.get("filter"), q.get("site"),
+                                                     q.get("since"), q.get("until"), int(q.get("limit", 100))))
+            if url.path == "/stats":
+                return self._send(200, report_stats(self._reader(), q.get("by", "filter"), q.get("since")))
+            if url.path == "/health":
+                w = self.server.writer
+                return self._send(200, {"ok": True, "batches": w.batches, "rows_written": w.rows_written,
+                                        "duplicates": w.duplicates, "queued": w.queue.qsize()})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        self._send(404, {"error": "not found"})
+
+class ReportServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, db_path: str = DB_PATH, verbose: bool = False):
+        super().__init__(address, ReportHandler)
+        self.db_path = db_path
+        self.verbose = verbose
+        self.writer = ReportWriter(db_path)
+        self.local = threading.local()
+
+    def server_close(self):
+        super().server_close()
+        self.writer.close()
+
+# -------------------------
+# Load test
+# -------------------------
+def synthetic_report(rng: random.Random, sites: int = 500) -> dict:
+    return {
+        "submission_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "filter": rng.choice(FILTER_LETTERS), "site_id": f"SITE{rng.randrange(sites):04d}",
+        "region": rng.choice(["Kenya", "Haiti", "Bangladesh", "Peru"]),
+        "observed_at": _now(), "turbidity_ntu": round(rng.lognormvariate(1.5, 0.8), 2),
+        "flags": [f for f in SMELL_FLAGS if rng.random() < 0.03],
+        "status": rng.choice(STATUSES), "reporter": f"vol{rng.randrange(200)}",
+    }
+
+def load_test(host: str, port: int, submissions: int, clients: int = 16, retry_share: float = 0.05) -> dict:
+    """Each client posts single reports over a keep-alive connection; some are re-sent as retries."""
+    per_client = submissions // clients
+    latencies, lock = [], threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        mine, sent = [], []
+        for _ in range(per_client):
+            report = rng.choice(sent) if sent and rng.random() < retry_share else synthetic_report(rng)
+            body = json.dumps(report).encode("utf-8")  # bytes: sent in one packet with the headers
+            t0 = time.perf_counter()
+            conn.request("POST", "/reports", body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            mine.append(time.perf_counter() - t0)
+            if resp.status >= 400:
+                raise RuntimeError(f"HTTP {resp.status}")
+            sent.append(report)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: round(1000 * latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+    return {"submissions": len(latencies), "seconds": round(elapsed, 2),
+            "per_minute": round(60 * len(latencies) / elapsed), "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Field report ingestion API (SQLite WAL, batched writes).")
+    parser.add_argument("--db", help=f"default: {DB_PATH}; with --load-test a temporary database")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8026)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    parser.add_argument("--load-test", type=int, metavar="N", help="serve on a free port and post N synthetic reports")
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.db is None:
+        if args.load_test:
+            # synthetic rows never go into the real report database unless --db says so
+            tmp_dir = tempfile.TemporaryDirectory(prefix="aquashield_reports_")
+            args.db = os.path.join(tmp_dir.name, "load_test.sqlite3")
+        else:
+            args.db = DB_PATH
+    server = ReportServer((args.host, 0 if args.load_test else args.port), args.db, args.verbose)
+    if args.load_test:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        result = load_test(args.host, server.server_address[1], args.load_test, args.clients)
+        w = server.writer
+        result.update({"batches": w.batches, "rows_written": w.rows_written, "duplicates": w.duplicates})
+        server.shutdown()
+        server.server_close()
+        if tmp_dir:
+            tmp_dir.cleanup()
+        print(json.dumps(result))
+    else:
+        print(f"Field report API on http://{args.host}:{server.server_address[1]} (db: {args.db})", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
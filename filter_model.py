@@ -0,0 +1,277 @@
+# filter_model.py
+# Flow and turbidity model for the layered filters, for comparing design
+# variants before a field trial. Each filter is a stack of porous layers (grain
+# size, depth, porosity) in a container of known cross-section, with a head of
+# water above the media and a free outlet below:
+#   flow      -- Kozeny-Carman permeability per layer, layers in series, Darcy's law;
+#   turbidity -- clean-bed deep-bed filtration (Yao single-collector efficiency
+#                with Happel's correction: diffusion + interception + settling),
+#                log removal summed over the layers for a few particle sizes.
+# It is a clean-bed estimate -- no schmutzdecke, clogging or biological removal --
+# so use it to rank variants and see what matters, and performance_data.py
+# (same column names) for what filters actually do.
+#
+# Everything is computed on numpy arrays, one row per variant; sweeps over grain
+# size, depth and head height of a filter's main layer are split into chunks
+# and evaluated across all cores.
+#
+#   python filter_model.py nominal                    # every modelled filter as documented
+#   python filter_model.py sweep --points 20          # 8000 variants per filter + sensitivity tables
+#   python filter_model.py sweep --filters C D --csv sweep.csv --workers 4
+import argparse
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aquashield_filters import FILTER_KEYS, filter_letter
+
+# -------------------------
+# Water, particles, media
+# -------------------------
+G = 9.81                 # m/s2
+RHO_WATER = 998.0        # kg/m3 at 20 C
+MU_WATER = 1.0e-3        # Pa.s at 20 C
+KT = 1.381e-23 * 293.15  # J
+KC_CONSTANT = 180.0      # Kozeny-Carman, spheres
+ALPHA = 0.1              # attachment efficiency, clean unfavourable media
+TURBIDITY_IN_NTU = 50.0
+TARGET_NTU = 5.0         # WHO: below 5 NTU, ideally below 1, before disinfection
+# Turbidity as equal shares of silt/clay particle sizes (m); removal is averaged over them
+TURBIDITY_PARTICLES = (0.5e-6, 1e-6, 2e-6, 5e-6, 10e-6)
+PARTICLE_DENSITY = 2650.0
+BACTERIA = (1e-6, 1070.0)  # diameter, density: the "lrv" column
+MAX_LRV = 6.0            # per particle size; more than any test could confirm
+CHUNK_ROWS = 50_000  # most variants per task, which bounds a worker's arrays
+
+# grain_mm: effective grain (or pore-former) size; depth_cm along the flow
+Layer = namedtuple("Layer", "name grain_mm depth_cm porosity")
+# area_cm2: cross-section the water passes through; head_cm: water above the media;
+# main: index of the layer the sweep varies; ranges: sweep bounds (grain mm, depth cm, head cm);
+# target_lph: flow the design should at least give a household
+Stack = namedtuple("Stack", "layers area_cm2 head_cm main ranges target_lph")
+
+BOTTLE_AREA = 57.0  # 1.5 L bottle, ~8.5 cm inside
+BUCKET_AREA = 616.0  # 20 L bucket, ~28 cm inside
+# Layer depths follow the guides (cups of media in a bottle, 5-8 cm charcoal and
+# 15-25 cm sand in a bucket); cloth and diffusers add little resistance and are left out.
+STACKS = {
+    "A": Stack([Layer("Charcoal", 1.5, 2.0, 0.50), Layer("Fine sand", 0.25, 4.0, 0.40),
+                Layer("Small gravel", 4.0, 2.0, 0.40)],
+               BOTTLE_AREA, 10.0, 1, {"grain": (0.1, 1.0), "depth": (2.0, 12.0), "head": (2.0, 20.0)}, 1.0),
+    "B": Stack([Layer("Microfiber", 0.03, 1.5, 0.85), Layer("Fine sand", 0.25, 3.0, 0.40),
+                Layer("Charcoal", 1.5, 4.0, 0.50)],
+               5.0, 15.0, 1, {"grain": (0.1, 1.0), "depth": (1.0, 8.0), "head": (5.0, 30.0)}, 0.5),
+    "C": Stack([Layer("Coarse gravel", 10.0, 5.0, 0.40), Layer("Small gravel", 4.0, 5.0, 0.40),
+                Layer("Charcoal", 1.5, 6.5, 0.50), Layer("Deep sand", 0.2, 20.0, 0.40)],
+               BUCKET_AREA, 10.0, 3, {"grain": (0.1, 1.0), "depth": (10.0, 40.0), "head": (2.0, 30.0)}, 10.0),
+    "D": Stack([Layer("Coarse gravel", 10.0, 5.0, 0.40), Layer("Small gravel", 4.0, 5.0, 0.40),
+                Layer("Charcoal", 1.5, 8.0, 0.50), Layer("Deep sand", 0.2, 25.0, 0.40)],
+               BUCKET_AREA, 15.0, 3, {"grain": (0.1, 1.0), "depth": (10.0, 40.0), "head": (2.0, 30.0)}, 20.0),
+    # the fired wall: sawdust burns out to micron-scale pores; area is the wetted wall
+    "E": Stack([Layer("Ceramic wall", 0.008, 1.0, 0.40)],
+               600.0, 15.0, 0, {"grain": (0.003, 0.02), "depth": (0.6, 2.5), "head": (5.0, 25.0)}, 1.0),
+    # tier 2 of the crisis set: sand and charcoal in any bottle
+    "H": Stack([Layer("Charcoal", 1.5, 3.0, 0.50), Layer("Sand", 0.3, 5.0, 0.40)],
+               BOTTLE_AREA, 10.0, 1, {"grain": (0.1, 1.0), "depth": (2.0, 12.0), "head": (2.0, 20.0)}, 1.0),
+}
+PARAMETERS = ("grain", "depth", "head")
+# Cloth (F) and SODIS (G) are not porous stacks
+
+def letter_for(filter_key: str) -> str:
+    """STACKS letter for a filter key or a bare letter ('C', 'c'); KeyError when not modelled."""
+    letter = filter_letter(filter_key) if " " in filter_key.strip() else filter_key.strip().upper()
+    if letter not in STACKS:
+        raise KeyError(f"filter not modelled: {filter_key!r}")
+    return letter
+
+def stack_for(filter_key: str) -> Stack:
+    """The modelled stack for a filter key (or its letter); KeyError when not modelled."""
+    return STACKS[letter_for(filter_key)]
+
+def modelled_filters():
+    return [k for k in FILTER_KEYS if filter_letter(k) in STACKS]
+
+# -------------------------
+# Physics (vectorized: every argument may be an array of variants)
+# -------------------------
+def permeability(grain_m, porosity):
+    """Kozeny-Carman permeability (m2)."""
+    return grain_m ** 2 * porosity ** 3 / (KC_CONSTANT * (1 - porosity) ** 2)
+
+def collector_efficiency(grain_m, porosity, velocity, particle_m, particle_density):
+    """Single-collector contact efficiency (Yao, Happel As), capped at 1."""
+    gamma = (1 - porosity) ** (1 / 3)
+    a_s = 2 * (1 - gamma ** 5) / (2 - 3 * gamma + 3 * gamma ** 5 - 2 * gamma ** 6)
+    diffusivity = KT / (3 * math.pi * MU_WATER * particle_m)
+    peclet = velocity * grain_m / diffusivity
+    eta_d = 4 * a_s ** (1 / 3) * peclet ** (-2 / 3)
+    eta_i = 1.5 * a_s * (particle_m / grain_m) ** 2
+    eta_g = (particle_density - RHO_WATER) * G * particle_m ** 2 / (18 * MU_WATER * velocity)
+    return np.minimum(eta_d + eta_i + eta_g, 1.0)
+
+def layer_lrv(grain_m, porosity, depth_m, velocity, particle_m, particle_density):
+    """log10 removal of one layer: ln(C/C0) = -1.5 (1-e) alpha eta L / d."""
+    eta = collector_efficiency(grain_m, porosity, velocity, particle_m, particle_density)
+    return 1.5 * (1 - porosity) * ALPHA * eta * depth_m / grain_m / math.log(10)
+
+def evaluate(stack: Stack, grain_mm=None, depth_cm=None, head_cm=None, turbidity_in: float = TURBIDITY_IN_NTU) -> dict:
+    """Model outputs for variants of `stack`; grain/depth of the main layer and head default to the design.
+
+    Arguments broadcast together; returns a dict of equally shaped arrays.
+    """
+    main = stack.layers[stack.main]
+    grain_mm = np.asarray(main.grain_mm if grain_mm is None else grain_mm, dtype=float)
+    depth_cm = np.asarray(main.depth_cm if depth_cm is None else depth_cm, dtype=float)
+    head_cm = np.asarray(stack.head_cm if head_cm is None else head_cm, dtype=float)
+    grain_mm, depth_cm, head_cm = np.broadcast_arrays(grain_mm, depth_cm, head_cm)
+    layers = [(grain_mm / 1000, depth_cm / 100, layer.porosity) if i == stack.main
+              else (np.full(grain_mm.shape, layer.grain_mm / 1000), np.full(grain_mm.shape, layer.depth_cm / 100),
+                    layer.porosity)
+              for i, layer in enumerate(stack.layers)]
+
+    # Darcy through layers in series; free outlet, so the media depth adds to the head
+    media_m = sum(depth for _, depth, _ in layers)
+    resistance = sum(depth / permeability(grain, porosity) for grain, depth, porosity in layers)
+    velocity = RHO_WATER * G * (head_cm / 100 + media_m) / (MU_WATER * resistance)  # superficial, m/s
+    flow_lph = velocity * stack.area_cm2 * 1e-4 * 3.6e6
+
+    def stack_lrv(particle_m, particle_density):
+        return np.minimum(sum(layer_lrv(grain, porosity, depth, velocity, particle_m, particle_density)
+                              for grain, depth, porosity in layers), MAX_LRV)
+
+    remaining = sum(10.0 ** -stack_lrv(p, PARTICLE_DENSITY) for p in TURBIDITY_PARTICLES) / len(TURBIDITY_PARTICLES)
+    lrv_bacteria = stack_lrv(*BACTERIA)
+    return {"grain_mm": grain_mm, "depth_cm": depth_cm, "head_cm": head_cm,
+            "velocity_m_h": velocity * 3600, "flow_lph": flow_lph,
+            "turbidity_reduction_pct": 100 * (1 - remaining), "turbidity_out_ntu": turbidity_in * remaining,
+            "lrv": lrv_bacteria}
+
+# -------------------------
+# Sweeps
+# -------------------------
+def sweep_grid(stack: Stack, points: int = 20):
+    """Grain (log-spaced), depth and head values spanning stack.ranges, as three flat arrays."""
+    lo, hi = stack.ranges["grain"]
+    axes = [np.geomspace(lo, hi, points), np.linspace(*stack.ranges["depth"], points),
+            np.linspace(*stack.ranges["head"], points)]
+    return [a.ravel() for a in np.meshgrid(*axes, indexing="ij")]
+
+def _evaluate_chunk(job):
+    letter, grain, depth, head = job
+    return letter, evaluate(STACKS[letter], grain, depth, head)
+
+def sweep(filter_keys=None, points: int = 20, workers: int = None) -> pd.DataFrame:
+    """Every grid variant of each filter (points**3 per filter), chunks spread over `workers` processes.
+
+    `filter_keys` may be filter keys or letters. The variants are cut into about
+    one chunk per worker (at most CHUNK_ROWS each), so every worker gets work.
+    """
+    letters = [letter_for(key) for key in filter_keys or modelled_filters()]
+    grids = [(letter, sweep_grid(STACKS[letter], points)) for letter in letters]
+    workers = workers or os.cpu_count() or 1
+    total = sum(len(grid[0]) for _, grid in grids)
+    chunk = min(CHUNK_ROWS, max(1, -(-total // workers)))
+    jobs = []
+    for letter, (grain, depth, head) in grids:
+        for start in range(0, len(grain), chunk):
+            end = start + chunk
+            jobs.append((letter, grain[start:end], depth[start:end], head[start:end]))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_evaluate_chunk, jobs))
+    else:
+        results = [_evaluate_chunk(job) for job in jobs]
+    names = {filter_letter(k): k for k in FILTER_KEYS}
+    frames = [pd.DataFrame(out).assign(filter=names[letter]) for letter, out in results]
+    df = pd.concat(frames, ignore_index=True)
+    return df[["filter"] + [c for c in df.columns if c != "filter"]]
+
+def sensitivity(filter_key: str, sweep_df: pd.DataFrame = None, step: float = 0.05) -> pd.DataFrame:
+    """Per parameter of one filter: outputs at the low and high end of its range (others at the
+    design value) and elasticities at the design point (d ln flow / d ln p, d LRV / d ln p)."""
+    stack = stack_for(filter_key)
+    main = stack.layers[stack.main]
+    design = {"grain": main.grain_mm, "depth": main.depth_cm, "head": stack.head_cm}
+    rows = []
+    for p in PARAMETERS:
+        lo, hi = stack.ranges[p]
+        values = np.array([lo, hi, design[p] * (1 - step), design[p] * (1 + step)])
+        args = {f"{q}_{unit}": (values if q == p else design[q])
+                for q, unit in (("grain", "mm"), ("depth", "cm"), ("head", "cm"))}
+        out = evaluate(stack, **args)
+        dlog = math.log((1 + step) / (1 - step))
+        rows.append({
+            "parameter": p, "low": lo, "high": hi,
+            "flow_low": out["flow_lph"][0], "flow_high": out["flow_lph"][1],
+            "turbidity_low": out["turbidity_reduction_pct"][0], "turbidity_high": out["turbidity_reduction_pct"][1],
+            "flow_elasticity": math.log(out["flow_lph"][3] / out["flow_lph"][2]) / dlog,
+            "lrv_per_ln": (out["lrv"][3] - out["lrv"][2]) / dlog,
+        })
+    table = pd.DataFrame(rows)
+    if sweep_df is not None:
+        # share of the sweep that keeps the filter useful: enough flow and clear enough water
+        # the sweep's filter column holds full keys; filter_key may be a letter
+        letter = letter_for(filter_key)
+        mine = sweep_df[sweep_df["filter"].isin([k for k in sweep_df["filter"].unique() if letter_for(k) == letter])]
+        ok = (mine["flow_lph"] >= stack.target_lph) & (mine["turbidity_out_ntu"] <= TARGET_NTU)
+        table.attrs["variants"] = len(mine)
+        table.attrs["meeting_target"] = int(ok.sum())
+        table.attrs["best"] = mine[ok].nlargest(1, "flow_lph").to_dict("records")
+    return table
+
+def _print_sensitivity(key: str, table: pd.DataFrame):
+    stack = stack_for(key)
+    print(f"\n{key}")
+    print(f"  {'param':<6} {'range':>15} {'flow L/h low..high':>22} {'turb. red. % low..high':>24} "
+          f"{'flow elast.':>11} {'dLRV/dln':>9}")
+    for r in table.to_dict("records"):
+        print(f"  {r['parameter']:<6} {r['low']:>7.3g}..{r['high']:<7.3g} {r['flow_low']:>10.3g}..{r['flow_high']:<10.3g} "
+              f"{r['turbidity_low']:>11.1f}..{r['turbidity_high']:<11.1f} {r['flow_elasticity']:>11.2f} {r['lrv_per_ln']:>9.2f}")
+    if "variants" in table.attrs:
+        print(f"  {table.attrs['meeting_target']}/{table.attrs['variants']} variants give >= {stack.target_lph:g} L/h "
+              f"and <= {TARGET_NTU:g} NTU (from {TURBIDITY_IN_NTU:g})")
+        for b in table.attrs["best"]:
+            print(f"  fastest of those: {stack.layers[stack.main].name.lower()} {b['grain_mm']:.3g} mm x "
+                  f"{b['depth_cm']:.3g} cm, head {b['head_cm']:.3g} cm -> {b['flow_lph']:.3g} L/h, "
+                  f"{b['turbidity_out_ntu']:.2f} NTU, LRV {b['lrv']:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model flow and turbidity removal of the layered filters.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("nominal", help="every modelled filter as documented")
+    p_sweep = sub.add_parser("sweep", help="grain x depth x head sweep and sensitivity tables")
+    p_sweep.add_argument("--filters", nargs="+", help="filter letters (default: all modelled: "
+                                                      f"{' '.join(STACKS)})")
+    p_sweep.add_argument("--points", type=int, default=20, help="values per parameter (variants = points**3)")
+    p_sweep.add_argument("--workers", type=int, help="processes (default: all cores)")
+    p_sweep.add_argument("--csv", help="also write every variant here")
+    args = parser.parse_args()
+
+    if args.cmd == "nominal":
+        print(f"{'flow L/h':>9} {'m/h':>6} {'turb. red. %':>12} {'NTU out':>8} {'LRV 1um':>8}  filter")
+        for key in modelled_filters():
+            out = {k: float(v) for k, v in evaluate(stack_for(key)).items()}
+            print(f"{out['flow_lph']:>9.3g} {out['velocity_m_h']:>6.2f} {out['turbidity_reduction_pct']:>12.1f} "
+                  f"{out['turbidity_out_ntu']:>8.2f} {out['lrv']:>8.2f}  {key}")
+        sys.exit(0)
+    keys = modelled_filters()
+    if args.filters:
+        unknown = [f for f in args.filters if f.upper() not in STACKS]
+        if unknown:
+            parser.error(f"not modelled: {' '.join(unknown)} (choose from {' '.join(STACKS)})")
+        keys = [k for k in keys if filter_letter(k) in {f.upper() for f in args.filters}]
+    t0 = time.perf_counter()
+    df = sweep(keys, args.points, args.workers)
+    elapsed = time.perf_counter() - t0
+    for key in keys:
+        _print_sensitivity(key, sensitivity(key, df))
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+    print(f"\n{len(df)} variants of {len(keys)} filters in {elapsed:.2f}s"
+          + (f" -> {args.csv}" if args.csv else ""))
@@ -0,0 +1,189 @@
+# i18n_catalog.py
+# Message catalog for all UI and instruction texts.
+# Sources live in locales/<locale>.json (flat key -> message). They are compiled
+# to GNU .mo binaries and loaded lazily, one locale on first use, with fallback
+# chains such as es-MX -> es -> en. Only locales actually requested are loaded.
+import argparse
+import array
+import copy
+import gettext
+import json
+import os
+import struct
+import sys
+import threading
+
+from aquashield_filters import filter_letter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCALES_DIR = os.path.join(BASE_DIR, "locales")
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+COMPILED_DIR = os.path.join(CACHE_DIR, "locales")
+MISSING_REPORT = os.path.join(COMPILED_DIR, "missing_translations.txt")
+
+DEFAULT_LOCALE = "en"
+
+_lock = threading.Lock()
+_translations = {}  # locale -> GNUTranslations (single locale, no fallback)
+_chains = {}        # requested locale -> GNUTranslations with fallbacks attached
+
+# -------------------------
+# Locale names
+# -------------------------
+def normalize_locale(locale: str) -> str:
+    """'es-mx' / 'es_MX' -> 'es_MX'."""
+    lang, _, region = locale.replace("-", "_").partition("_")
+    return f"{lang.lower()}_{region.upper()}" if region else lang.lower()
+
+def locale_chain(locale: str):
+    """Lookup order for a locale, e.g. es_MX -> [es_MX, es, en]."""
+    loc = normalize_locale(locale or DEFAULT_LOCALE)
+    chain = [loc]
+    lang = loc.split("_")[0]
+    if lang != loc:
+        chain.append(lang)
+    if DEFAULT_LOCALE not in chain:
+        chain.append(DEFAULT_LOCALE)
+    return chain
+
+def available_locales():
+    """Locales with a source catalog, default locale first."""
+    if not os.path.isdir(LOCALES_DIR):
+        return [DEFAULT_LOCALE]
+    locs = sorted(n[:-5] for n in os.listdir(LOCALES_DIR) if n.endswith(".json"))
+    return sorted(locs, key=lambda l: (l != DEFAULT_LOCALE, l))
+
+# -------------------------
+# Compilation (.json -> .mo)
+# -------------------------
+def _source_path(locale: str) -> str:
+    return os.path.join(LOCALES_DIR, f"{locale}.json")
+
+def _compiled_path(locale: str) -> str:
+    return os.path.join(COMPILED_DIR, f"{locale}.mo")
+
+def load_source(locale: str) -> dict:
+    path = _source_path(locale)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_mo(messages: dict, path: str, locale: str):
+    """Write a GNU .mo file (same layout as msgfmt) for the given key -> message map."""
+    header = f"Content-Type: text/plain; charset=UTF-8\nLanguage: {locale}\n"
+    entries = {"": header}
+    entries.update({k: v for k, v in messages.items() if k})
+    keys = sorted(entries)
+    ids = strs = b""
+    offsets = []
+    for k in keys:
+        kb, vb = k.encode("utf-8"), entries[k].encode("utf-8")
+        offsets.append((len(ids), len(kb), len(strs), len(vb)))
+        ids += kb + b"\0"
+        strs += vb + b"\0"
+    keystart = 7 * 4 + 16 * len(keys)
+    valuestart = keystart + len(ids)
+    koffsets, voffsets = [], []
+    for o1, l1, o2, l2 in offsets:
+        koffsets += [l1, o1 + keystart]
+        voffsets += [l2, o2 + valuestart]
+    out = struct.pack("Iiiiiii", 0x950412DE, 0, len(keys), 7 * 4, 7 * 4 + len(keys) * 8, 0, 0)
+    out += array.array("i", koffsets + voffsets).tobytes() + ids + strs
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(out)
+    os.replace(tmp, path)
+
+def _ensure_compiled(locale: str):
+    """Compile a locale if its .mo is missing or older than the JSON source."""
+    src, mo = _source_path(locale), _compiled_path(locale)
+    if not os.path.exists(src):
+        return None
+    if not os.path.exists(mo) or os.path.getmtime(mo) < os.path.getmtime(src):
+        write_mo(load_source(locale), mo, locale)
+    return mo
+
+# -------------------------
+# Lazy runtime lookup
+# -------------------------
+def _load(locale: str):
+    if locale not in _translations:
+        mo = _ensure_compiled(locale)
+        if mo is None:
+            _translations[locale] = None
+        else:
+            with open(mo, "rb") as f:
+                _translations[locale] = gettext.GNUTranslations(f)
+    return _translations[locale]
+
+def translator(locale: str):
+    """Translation object for a locale with its fallback chain attached (cached)."""
+    key = normalize_locale(locale or DEFAULT_LOCALE)
+    if key in _chains:
+        return _chains[key]
+    with _lock:
+        if key not in _chains:
+            # fresh objects per chain: add_fallback mutates, and the same locale
+            # appears in several chains (es_MX -> es, es_AR -> es)
+            head = gettext.NullTranslations()
+            tail = head
+            for loc in locale_chain(key):
+                base = _load(loc)
+                if base is None:
+                    continue
+                link = copy.copy(base)  # shares the parsed catalog dict
+                link._fallback = None
+                tail.add_fallback(link)
+                tail = link
+            _chains[key] = head
+    return _chains[key]
+
+def t(key: str, locale: str = DEFAULT_LOCALE, default: str = None) -> str:
+    """Look up a message; returns `default` (or the key) when no locale in the chain has it."""
+    msg = translator(locale).gettext(key)
+    if msg == key:
+        return key if default is None else default
+    return msg
+
+def filter_text(filter_key: str, kind: str, locale: str = DEFAULT_LOCALE, default: str = "") -> str:
+    """Instruction text for a filter; kind is 'title', 'short', 'full' or 'card'."""
+    return t(f"filter.{filter_letter(filter_key)}.{kind}", locale, default)
+
+def loaded_locales():
+    return sorted(k for k, v in _translations.items() if v is not None)
+
+# -------------------------
+# Build step: compile all + missing-translation report
+# -------------------------
+def build(write_report: bool = True) -> dict:
+    """Compile every locale and return {locale: [keys missing vs. the default locale]}."""
+    reference = load_source(DEFAULT_LOCALE)
+    missing = {}
+    for loc in available_locales():
+        messages = load_source(loc)
+        write_mo(messages, _compiled_path(loc), loc)
+        if loc != DEFAULT_LOCALE:
+            # regional variants only need their overrides; the rest comes from the parent
+            parent = load_source(loc.split("_")[0]) if "_" in loc else {}
+            missing[loc] = sorted(k for k in reference if k not in messages and k not in parent)
+    if write_report:
+        os.makedirs(COMPILED_DIR, exist_ok=True)
+        with open(MISSING_REPORT, "w", encoding="utf-8") as f:
+            for loc, keys in missing.items():
+                f.write(f"[{loc}] {len(keys)} missing\n")
+                for k in keys:
+                    f.write(f"  {k}\n")
+    return missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile locales/*.json and report missing translations.")
+    parser.add_argument("--strict", action="store_true", help="exit non-zero when any translation is missing")
+    args = parser.parse_args()
+    report = build()
+    for loc, keys in report.items():
+        print(f"{loc:<8} {len(keys):>4} missing")
+    print(f"Compiled {len(available_locales())} locales to {COMPILED_DIR}; report: {MISSING_REPORT}")
+    if args.strict and any(report.values()):
+        sys.exit(1)
@@ -0,0 +1,209 @@
+# image_pipeline.py
+# Size variants (thumb / screen / print) and compressed formats for designs/Visuals.
+# Results are cached on disk by source hash so each original is processed once.
+import functools
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import zipfile
+
+from PIL import Image, ImageChops, ImageStat, features
+
+import reproducible
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VISUALS_DIR = os.path.join(BASE_DIR, "designs", "Visuals")
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+
+# Bump when variant settings change so stale cache entries are rebuilt
+PIPELINE_VERSION = 1
+
+# Target widths in px; None keeps the source width
+SIZE_VARIANTS = {
+    "thumb": 240,
+    "screen": 800,
+    "print": None,
+}
+
+# Formats in order of preference (smallest first when supported by the client)
+FORMATS = ("avif", "webp", "png")
+# What the Streamlit pages serve inline: AVIF still fails on older phone browsers
+BROWSER_FORMATS = ("webp", "png")
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+# Palette PNG is only kept when the 256-colour version is visually lossless
+PALETTE_MIN_PSNR = 40.0
+
+# -------------------------
+# Hashing / cache layout
+# -------------------------
+def source_hash(path: str) -> str:
+    """sha256 of an original; hashed once per (path, mtime, size) per process."""
+    st = os.stat(path)
+    return _hash_file(path, st.st_mtime_ns, st.st_size)
+
+@functools.lru_cache(maxsize=256)
+def _hash_file(path: str, mtime_ns: int, size: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _entry_dir(digest: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, digest[:16])
+
+def source_images():
+    """Return the original design PNGs, sorted by name."""
+    if not os.path.isdir(VISUALS_DIR):
+        return []
+    return sorted(
+        os.path.join(VISUALS_DIR, n) for n in os.listdir(VISUALS_DIR)
+        if n.lower().endswith(".png")
+    )
+
+# -------------------------
+# Encoding
+# -------------------------
+def _psnr(a: Image.Image, b: Image.Image) -> float:
+    """Peak signal-to-noise ratio between two RGB images (higher is closer)."""
+    rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    if mse == 0:
+        return float("inf")
+    return 20 * math.log10(255.0 / math.sqrt(mse))
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    out = io.BytesIO()
+    if fmt == "webp":
+        img.save(out, format="WEBP", quality=80, method=6)
+    elif fmt == "avif":
+        img.save(out, format="AVIF", quality=55, speed=6)
+    else:
+        img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+def _palette_png(img: Image.Image):
+    """Return palette-quantized PNG bytes, or None when quantization is visibly lossy."""
+    quant = img.quantize(colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    if _psnr(img, quant.convert("RGB")) < PALETTE_MIN_PSNR:
+        return None
+    out = io.BytesIO()
+    quant.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+def _resize(img: Image.Image, width):
+    if width is None or img.width <= width:
+        return img
+    height = round(img.height * width / img.width)
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+# -------------------------
+# Variant generation (cached by source hash)
+# -------------------------
+def build_variants(path: str) -> dict:
+    """Generate all size/format variants for one original and return its manifest."""
+    digest = source_hash(path)
+    entry = _entry_dir(digest)
+    manifest_path = os.path.join(entry, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == PIPELINE_VERSION:
+            return manifest
+
+    os.makedirs(entry, exist_ok=True)
+    with Image.open(path) as src:
+        img = src.convert("RGB")
+
+    variants = []
+    for size_name, width in SIZE_VARIANTS.items():
+        sized = _resize(img, width)
+        for fmt in FORMATS:
+            if fmt == "avif" and not features.check("avif"):
+                continue
+            if fmt == "png":
+                data = _palette_png(sized) or _encode(sized, "png")
+            else:
+                data = _encode(sized, fmt)
+            fname = f"{size_name}.{fmt}"
+            tmp = os.path.join(entry, f"{fname}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(entry, fname))
+            variants.append({
+                "size": size_name, "format": fmt, "file": fname,
+                "width": sized.width, "height": sized.height, "bytes": len(data),
+            })
+
+    manifest = {
+        "version": PIPELINE_VERSION,
+        "source": os.path.basename(path),
+        "sha256": digest,
+        "width": img.width,
+        "height": img.height,
+        "bytes": os.path.getsize(path),
+        "variants": variants,
+    }
+    tmp = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, manifest_path)
+    return manifest
+
+def pick_variant(path: str, max_width: int, accept=FORMATS):
+    """Return (file_path, mime, variant) for the smallest variant at least `max_width` wide.
+
+    Falls back to the largest size class when no variant is wide enough. The original
+    file is never returned here; use load_original() for that.
+    """
+    manifest = build_variants(path)
+    candidates = [v for v in manifest["variants"] if v["format"] in accept]
+    if not candidates:
+        raise ValueError(f"No variant of {manifest['source']} in formats {accept}")
+    wide_enough = [v for v in candidates if v["width"] >= min(max_width, manifest["width"])]
+    if wide_enough:
+        narrowest = min(v["width"] for v in wide_enough)
+        pool = [v for v in wide_enough if v["width"] == narrowest]
+    else:
+        widest = max(v["width"] for v in candidates)
+        pool = [v for v in candidates if v["width"] == widest]
+    best = min(pool, key=lambda v: v["bytes"])
+    return os.path.join(_entry_dir(manifest["sha256"]), best["file"]), MIME_TYPES[best["format"]], best
+
+def read_variant(path: str, max_width: int, accept=FORMATS) -> bytes:
+    fpath, _, _ = pick_variant(path, max_width, accept)
+    with open(fpath, "rb") as f:
+        return f.read()
+
+def load_original(path: str) -> bytes:
+    """Explicitly load the full-size original (heavy; only on user request)."""
+    with open(path, "rb") as f:
+        return f.read()
+
+def build_visuals_zip(size: str = "screen", accept=BROWSER_FORMATS):
+    """ZIP of all design visuals at one size class, smallest accepted format each."""
+    width = SIZE_VARIANTS[size] or 10**6
+    mem = io.BytesIO()
+    with zipfile.ZipFile(mem, "w", zipfile.ZIP_STORED) as z:
+        # variants are already compressed; deflating them again only costs CPU
+        for path in source_images():
+            fpath, _, variant = pick_variant(path, width, accept)
+            stem = os.path.splitext(os.path.basename(path))[0]
+            reproducible.zip_write(z, fpath, f"{stem}_{size}.{variant['format']}")
+    mem.seek(0)
+    return mem
+
+# -------------------------
+# CLI: build everything and print a size report
+# -------------------------
+if __name__ == "__main__":
+    for p in source_images():
+        m = build_variants(p)
+        print(f"{m['source']}  original {m['width']}x{m['height']}  {m['bytes'] / 1024:.0f} KB")
+        for v in m["variants"]:
+            print(f"  {v['size']:<7} {v['format']:<5} {v['width']:>5}x{v['height']:<5} {v['bytes'] / 1024:8.1f} KB")
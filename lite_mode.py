@@ -0,0 +1,237 @@
+# lite_mode.py
+# Low-bandwidth "lite" view for the app pages, and a page-weight meter.
+#
+# Lite mode is chosen with ?lite=1 (or ?lite=0 to force the full view) or the
+# sidebar toggle, and is otherwise switched on automatically for browsers that
+# send Save-Data: on, or a 2G effective connection type / low Downlink client
+# hint (Chrome sends ECT and Downlink only when a proxy in front of the app
+# asks for them with Accept-CH). In lite mode the filter pages show each
+# filter's short instructions and a ~1 KB offline QR thumbnail first;
+# schematics, browser-side PNG buttons, tabs and downloads are only sent for the
+# filters the reader opens.
+#
+# The meter counts what a view actually transfers: every ForwardMsg the script
+# run sends to the browser plus the media files (images) it references, once
+# each. Downloads served on click and Streamlit's own cached frontend bundle are
+# not part of it. aquashield_app.py reports it in the sidebar and keeps the last
+# figures in st.session_state["page_weight"].
+#
+#   python lite_mode.py budget                # every page's lite first view vs BUDGET_KB
+#   python lite_mode.py budget --full         # also show the full view for comparison
+import argparse
+import inspect
+import os
+import sys
+
+import streamlit as st
+
+import artifact_store
+import aquashield_render as render
+import i18n_catalog
+
+LITE_PARAM = "lite"
+BUDGET_KB = float(os.environ.get("AQUASHIELD_LITE_BUDGET_KB", "100"))  # first lite view, per page
+SLOW_ECT = {"slow-2g", "2g"}
+SLOW_DOWNLINK = 0.5  # Mbps
+# MediaFileManager.add() arguments the media meter reads; checked against the
+# installed Streamlit before patching (it is internal API and may change)
+MEDIA_ADD_PARAMS = ("path_or_data", "is_for_static_download")
+# Pages of aquashield_app.py held to the budget
+PAGE_FILES = ["filters_svg_generator.py", "aquashield_multilang_app.py", "aquashield_print_cards.py",
+              "Qr_link_generator.py", "generate_aquashield_qr_svgs.py", "text_qr_library.py"]
+
+# -------------------------
+# Lite or full
+# -------------------------
+def detect(headers) -> bool:
+    """True when request headers say the connection is slow or data is metered."""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    if headers.get("save-data", "").lower() == "on":
+        return True
+    if headers.get("ect", "").lower() in SLOW_ECT:
+        return True
+    try:
+        return float(headers.get("downlink", "")) < SLOW_DOWNLINK
+    except ValueError:
+        return False
+
+def is_lite() -> bool:
+    """?lite= wins and is remembered for the session; otherwise auto-detect."""
+    value = st.query_params.get(LITE_PARAM)
+    if value is not None:
+        st.session_state[LITE_PARAM] = value not in ("0", "false", "no", "off")
+    if LITE_PARAM not in st.session_state:
+        try:
+            headers = st.context.headers
+        except Exception:
+            headers = {}
+        st.session_state[LITE_PARAM] = detect(headers)
+    return st.session_state[LITE_PARAM]
+
+def _toggled():
+    st.query_params[LITE_PARAM] = "1" if st.session_state["lite_toggle"] else "0"
+
+def lite_toggle(container=None):
+    """Sidebar switch between the lite and the full view; returns the current mode."""
+    lite = is_lite()
+    (container or st.sidebar).toggle("Lite mode (low bandwidth)", value=lite, key="lite_toggle", on_change=_toggled,
+                                     help="Text and small QR codes first; schematics and downloads on request")
+    return lite
+
+def filter_summary(key: str, lang: str = "en") -> bool:
+    """Lite view of one filter: short instructions and an offline QR thumbnail.
+
+    Returns True once the reader asks for the schematic and downloads.
+    """
+    short = i18n_catalog.filter_text(key, "short", lang, i18n_catalog.t("ui.short_unavailable", lang))
+    card = i18n_catalog.filter_text(key, "card", lang, short)
+    col_text, col_qr = st.columns([3, 1])
+    col_text.text(short)
+    col_qr.image(artifact_store.cached_bytes(*render.qr_thumb_artifact(card.strip())), width="content",
+                 caption="Offline QR", output_format="PNG")  # "auto" would re-encode it as JPEG
+    return st.checkbox("Show schematic and downloads", key=f"lite_more_{key}")
+
+# -------------------------
+# Page weight
+# -------------------------
+class PageWeight:
+    """Bytes one script run sends: messages over the websocket plus media it references."""
+
+    def __init__(self, media_metered: bool = True):
+        self.media_metered = media_metered
+        self.messages = 0
+        self.message_bytes = 0
+        self.media_bytes = 0
+        self._media = set()
+
+    def add_message(self, msg):
+        self.messages += 1
+        self.message_bytes += msg.ByteSize()
+
+    def add_media(self, url: str, size: int):
+        if url not in self._media:
+            self._media.add(url)
+            self.media_bytes += size
+
+    @property
+    def total(self) -> int:
+        return self.message_bytes + self.media_bytes
+
+    def as_dict(self) -> dict:
+        return {"messages": self.messages, "message_bytes": self.message_bytes, "media_files": len(self._media),
+                "media_bytes": self.media_bytes, "media_metered": self.media_metered, "total_bytes": self.total}
+
+def _current_weight():
+    from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return getattr(ctx, "_page_weight", None) if ctx else None
+
+def _install_media_meter() -> bool:
+    """Patch MediaFileManager.add once to count media; False if this Streamlit's API doesn't match."""
+    try:
+        from streamlit.runtime.media_file_manager import MediaFileManager
+    except ImportError:
+        return False
+    if getattr(MediaFileManager.add, "_page_weight", False):
+        return True
+    original = MediaFileManager.add
+    signature = inspect.signature(original)
+    if not all(p in signature.parameters for p in MEDIA_ADD_PARAMS):
+        return False
+
+    def add(self, *args, **kwargs):
+        url = original(self, *args, **kwargs)
+        weight = _current_weight()
+        if weight is not None:
+            call = signature.bind(self, *args, **kwargs)
+            call.apply_defaults()
+            data = call.arguments["path_or_data"]
+            if not call.arguments["is_for_static_download"]:
+                weight.add_media(url, os.path.getsize(data) if isinstance(data, str) else len(data))
+        return url
+
+    add._page_weight = True
+    MediaFileManager.add = add
+    return True
+
+def start_meter():
+    """Count everything this script run sends from here on; returns the PageWeight."""
+    from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+    weight = PageWeight(media_metered=_install_media_meter())
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return weight
+    # the context lives as long as the session's script runner, across reruns:
+    # wrap its _enqueue once and only swap the PageWeight it counts into
+    if not getattr(ctx, "_page_weight_metered", False):
+        enqueue = ctx._enqueue
+
+        def metered(msg):
+            current = getattr(ctx, "_page_weight", None)
+            if current is not None:
+                current.add_message(msg)
+            enqueue(msg)
+        ctx._enqueue = metered
+        ctx._page_weight_metered = True
+    ctx._page_weight = weight
+    return weight
+
+def report(weight: PageWeight, container=None, lite: bool = False):
+    """Show this view's weight (and the lite budget) and keep it in session_state."""
+    st.session_state["page_weight"] = dict(weight.as_dict(), lite=lite)
+    kb = weight.total / 1024
+    images = (f"{weight.media_bytes / 1024:.0f} KB in {len(weight._media)} images" if weight.media_metered
+              else "images not counted on this Streamlit version")
+    text = f"This view: {kb:.0f} KB ({weight.message_bytes / 1024:.0f} KB page, {images})"
+    if lite:
+        text += f" · budget {BUDGET_KB:.0f} KB" + (" ✓" if kb <= BUDGET_KB else " — over")
+    (container or st.sidebar).caption(text)
+
+# -------------------------
+# Budget check
+# -------------------------
+def measure_pages(lite: bool = True, pages=None, timeout: float = 300):
+    """(page, PageWeight dict or error) for a first view of each page in a fresh session."""
+    from streamlit.testing.v1 import AppTest
+    results = []
+    for page in pages or PAGE_FILES:
+        at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "aquashield_app.py"),
+                               default_timeout=timeout)
+        at.query_params[LITE_PARAM] = "1" if lite else "0"
+        at.run()  # AppTest can only switch pages after the first run
+        at.switch_page(page).run()
+        if at.exception:
+            results.append((page, {"error": at.exception[0].message}))
+        else:
+            results.append((page, at.session_state["page_weight"]))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the first-view page weight of the app pages.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_budget = sub.add_parser("budget", help="fail when a lite first view is over the budget")
+    p_budget.add_argument("--budget-kb", type=float, default=BUDGET_KB)
+    p_budget.add_argument("--pages", nargs="+", help=f"default: {' '.join(PAGE_FILES)}")
+    p_budget.add_argument("--full", action="store_true", help="also measure the full view (not held to the budget)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AQUASHIELD_WARMUP", "0")  # measure the page, not a warm-up thread competing with it
+    modes = [True, False] if args.full else [True]
+    over = []
+    print(f"{'view':<5} {'total KB':>8} {'page KB':>8} {'media KB':>8} {'msgs':>5}  page")
+    for lite in modes:
+        for page, w in measure_pages(lite, args.pages):
+            view = "lite" if lite else "full"
+            if "error" in w:
+                print(f"{view:<5} {'error':>8}  {page}: {w['error']}")
+                over.append(page)
+                continue
+            kb = w["total_bytes"] / 1024
+            bad = lite and kb > args.budget_kb
+            if bad:
+                over.append(page)
+            print(f"{view:<5} {kb:>8.1f} {w['message_bytes'] / 1024:>8.1f} {w['media_bytes'] / 1024:>8.1f} "
+                  f"{w['messages']:>5}  {page}" + ("  [over budget]" if bad else ""))
+    print(f"budget {args.budget_kb:.0f} KB per lite first view: "
+          + (f"{len(over)} page(s) over or failing" if over else "all pages within budget"))
+    sys.exit(1 if over else 0)
@@ -0,0 +1,327 @@
+# load_test.py
+# Headless multi-session load test for the Streamlit apps, driven through
+# streamlit.testing.v1.AppTest. Each simulated session keeps its own widget
+# state and performs a seeded mix of realistic interactions (switch language,
+# search, click downloads, create printed cards, plain reruns). The report lists
+# p50/p95/p99 latency, throughput and process RSS over time, and can be saved as
+# JSON and compared against a previous release's report.
+#
+#   python load_test.py --sessions 8 --steps 20
+#   python load_test.py --apps multilang print_cards --json report.json --baseline old.json
+#
+# Point AQUASHIELD_CACHE_DIR at a scratch directory to measure a cold start.
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import artifact_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+APPS = {
+    "multilang": "aquashield_multilang_app.py",
+    "print_cards": "aquashield_print_cards.py",
+    "library": "filters_svg_generator.py",
+    "qr_links": "Qr_link_generator.py",
+    "qr_offline": "text_qr_library.py",
+    "qr_svgs": "generate_aquashield_qr_svgs.py",
+    "app": "aquashield_app.py",  # all of the above as pages of one process
+}
+
+SEARCH_QUERIES = ["charcoal", "carbón", "bleach", "sodis", "sand", "arena", "boil", "cloth"]
+
+# -------------------------
+# Deferred downloads
+# -------------------------
+# Download buttons built with a callable register it with the runtime's media
+# file manager; the web server runs it when the browser requests the file.
+# AppTest throws that manager away after every run, so record the callables
+# here and run them ourselves to simulate the click.
+_deferred = {}
+
+def _install_download_recorder():
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    if getattr(MediaFileManager.add_deferred, "_load_test", False):
+        return
+    original = MediaFileManager.add_deferred
+
+    def add_deferred(self, data_callable, *args, **kwargs):
+        file_id = original(self, data_callable, *args, **kwargs)
+        _deferred[file_id] = data_callable
+        return file_id
+
+    add_deferred._load_test = True
+    MediaFileManager.add_deferred = add_deferred
+
+# -------------------------
+# Interactions
+# -------------------------
+# Each returns the action name, or None when the app has no such widget.
+# Switching tabs or opening expanders happens in the browser and never reaches
+# the server, so a plain rerun stands in for the cost of any other widget.
+def _rerun(session, rng):
+    session.run(lambda at: at.run())
+    return "rerun"
+
+def _switch_language(session, rng):
+    boxes = [i for i, b in enumerate(session.at.selectbox) if len(b.options) > 1]
+    if not boxes:
+        return None
+    box = session.at.selectbox[boxes[0]]
+    choice = rng.choice([o for o in box.options if o != box.value] or list(box.options))
+    session.run(lambda at: at.selectbox[boxes[0]].set_value(choice).run())
+    return "switch_language"
+
+def _search(session, rng):
+    if not session.at.text_input:
+        return None
+    query = rng.choice(SEARCH_QUERIES)
+    session.run(lambda at: at.text_input[0].input(query).run())
+    return "search"
+
+def _click_button(prefix, action):
+    def interact(session, rng):
+        labels = [b.label for b in session.at.button if b.label.startswith(prefix)]
+        if not labels:
+            return None
+        label = rng.choice(labels)
+        session.run(lambda at: next(b for b in at.button if b.label == label).click().run())
+        return action
+    return interact
+
+def _switch_page(session, rng):
+    page = rng.choice([p for p in APPS.values() if p != APPS["app"]])
+    session.run(lambda at: at.switch_page(page).run())
+    return "switch_page"
+
+def _download(session, rng):
+    buttons = session.at.get("download_button")
+    if not buttons:
+        return None
+    proto = rng.choice(buttons).proto
+    if not proto.deferred_file_id:
+        # bytes were produced during the rerun and already paid for; not recorded
+        return "download_eager"
+    builder = session.downloads.get(proto.deferred_file_id)
+    if builder is None:
+        return None
+    session.timed(builder)
+    return "download"
+
+# (weight, interaction) mixes per app
+SCENARIOS = {
+    "multilang": [(3, _switch_language), (2, _search), (4, _download), (1, _click_button("Prepare", "export")),
+                  (1, _rerun)],
+    "print_cards": [(2, _switch_language), (2, _click_button("Create printed card", "create_card")),
+                    (4, _download), (1, _rerun)],
+    "library": [(2, _search), (1, _click_button("Load original", "load_original")), (4, _download), (1, _rerun)],
+    "qr_links": [(3, _rerun), (2, _download)],
+    "qr_offline": [(3, _rerun), (2, _download)],
+    "qr_svgs": [(3, _rerun), (2, _download)],
+    "app": [(3, _switch_page), (2, _search), (3, _download), (1, _rerun)],
+}
+
+# -------------------------
+# Sessions and measurement
+# -------------------------
+# AppTest installs a process-wide mock runtime for the duration of each run,
+# so script runs are serialized here. Sessions still interleave between runs;
+# time spent waiting for another session's rerun counts towards latency, much
+# as it does on a single-process server whose reruns contend for the GIL.
+_run_lock = threading.Lock()
+
+class Session:
+    def __init__(self, app: str, seed: int, timeout: float, records: list):
+        from streamlit.testing.v1 import AppTest
+        self.app = app
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(os.path.join(BASE_DIR, APPS[app]), default_timeout=timeout)
+        self.records = records
+        self.downloads = {}
+        self.last = None
+
+    def run(self, fn):
+        t0 = time.perf_counter()
+        with _run_lock:
+            t1 = time.perf_counter()
+            _deferred.clear()
+            fn(self.at)
+            self.downloads = dict(_deferred)
+        t2 = time.perf_counter()
+        self.last = (t2 - t0, t2 - t1)
+        if self.at.exception:
+            raise RuntimeError(f"{self.app}: {self.at.exception[0].message}")
+
+    def timed(self, fn):
+        t0 = time.perf_counter()
+        data = fn()
+        if not data:
+            raise RuntimeError(f"{self.app}: download returned no data")
+        elapsed = time.perf_counter() - t0
+        self.last = (elapsed, elapsed)
+
+    def step(self, started: float, action_fn=None):
+        if action_fn is None:
+            weights, fns = zip(*SCENARIOS[self.app])
+            action_fn = self.rng.choices(fns, weights=weights)[0]
+        at_offset = time.perf_counter() - started
+        try:
+            action = action_fn(self, self.rng) or _rerun(self, self.rng)
+            ok, error = True, None
+        except Exception as e:
+            action, ok, error = getattr(action_fn, "__name__", "step").lstrip("_"), False, str(e)
+            self.last = (time.perf_counter() - started - at_offset,) * 2
+        if action == "download_eager":
+            return
+        latency, service = self.last
+        self.records.append({"app": self.app, "action": action, "t": round(at_offset, 4),
+                             "latency": latency, "service": service, "ok": ok, "error": error})
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB (Linux /proc; 0 elsewhere)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def _sample_rss(samples: list, started: float, stop: threading.Event, interval: float):
+    while not stop.is_set():
+        samples.append((round(time.perf_counter() - started, 3), round(rss_mb(), 1)))
+        stop.wait(interval)
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of `values` (q in 0-100)."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(q / 100 * len(s) + 0.5)) - 1))]
+
+def _summarize(records, duration: float) -> dict:
+    lat = [r["latency"] for r in records if r["ok"]]
+    return {"count": len(records), "errors": sum(1 for r in records if not r["ok"]),
+            "throughput_per_s": round(len(records) / duration, 2) if duration else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 1),
+            "p95_ms": round(percentile(lat, 95) * 1000, 1),
+            "p99_ms": round(percentile(lat, 99) * 1000, 1),
+            "service_p50_ms": round(percentile([r["service"] for r in records if r["ok"]], 50) * 1000, 1)}
+
+def _revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_load_test(apps, sessions: int = 4, steps: int = 10, seed: int = 1, timeout: float = 120,
+                  rss_interval: float = 0.5) -> dict:
+    """Run `sessions` concurrent sessions per app, `steps` interactions each; returns the report."""
+    import streamlit
+    _install_download_recorder()
+    records, rss = [], []
+    started = time.perf_counter()
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample_rss, args=(rss, started, stop, rss_interval), daemon=True)
+    sampler.start()
+
+    def worker(app, n):
+        session = Session(app, seed * 1000 + n, timeout, records)
+        session.step(started, _rerun)          # first page load
+        for _ in range(steps):
+            session.step(started)
+
+    threads = [threading.Thread(target=worker, args=(app, n), name=f"{app}-{n}")
+               for app in apps for n in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    rss.append((round(duration, 3), round(rss_mb(), 1)))
+
+    report = {
+        "revision": _revision(), "python": platform.python_version(), "streamlit": streamlit.__version__,
+        "config": {"apps": list(apps), "sessions": sessions, "steps": steps, "seed": seed},
+        "duration_s": round(duration, 2),
+        "overall": _summarize(records, duration),
+        "apps": {}, "rss_mb": {"start": rss[0][1], "peak": max(m for _, m in rss), "end": rss[-1][1],
+                               "samples": rss},
+        "errors": sorted({r["error"] for r in records if r["error"]})[:20],
+    }
+    report["artifacts"] = artifact_store.STORE.stats()
+    for app in apps:
+        app_records = [r for r in records if r["app"] == app]
+        report["apps"][app] = _summarize(app_records, duration)
+        report["apps"][app]["actions"] = {
+            action: _summarize([r for r in app_records if r["action"] == action], duration)
+            for action in sorted({r["action"] for r in app_records})}
+    return report
+
+def format_report(report: dict, baseline: dict = None) -> str:
+    def delta(app, field):
+        if not baseline:
+            return ""
+        old = (baseline["overall"] if app is None else baseline.get("apps", {}).get(app, {})).get(field)
+        new = (report["overall"] if app is None else report["apps"][app])[field]
+        if not old:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    c = report["config"]
+    lines = [f"AquaShield load test @ {report['revision'] or 'unknown revision'} — "
+             f"{c['sessions']} sessions/app × {c['steps']} steps, seed {c['seed']}, {report['duration_s']} s",
+             f"{'app / action':<28}{'n':>6}{'err':>5}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+
+    def row(name, s, app=None, compare=False):
+        d = (lambda f: delta(app, f)) if compare else (lambda f: "")
+        lines.append(f"{name:<28}{s['count']:>6}{s['errors']:>5}{s['throughput_per_s']:>8}"
+                     f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}"
+                     + "".join(x for x in (d("p50_ms"), d("p95_ms"), d("p99_ms")) if x))
+
+    for app, s in report["apps"].items():
+        row(app, s, app, compare=True)
+        for action, a in s["actions"].items():
+            row(f"  {action}", a)
+    row("overall", report["overall"], None, compare=True)
+    r = report["rss_mb"]
+    lines.append(f"RSS MiB: start {r['start']}, peak {r['peak']}, end {r['end']}"
+                 + (f" (baseline peak {baseline['rss_mb']['peak']})" if baseline else ""))
+    if "artifacts" in report:
+        a = report["artifacts"]
+        lines.append(f"Artifacts: {a['builds']} built, {a['coalesced']} coalesced waits, {a['hits']} memory hits")
+    for error in report["errors"]:
+        lines.append(f"error: {error}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless multi-session load test for the AquaShield apps.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions per app")
+    parser.add_argument("--steps", type=int, default=10, help="interactions per session after the first load")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    parser.add_argument("--json", help="write the full report (including RSS samples) here")
+    parser.add_argument("--baseline", help="earlier --json report to compare p50/p95/p99 against")
+    args = parser.parse_args()
+
+    report = run_load_test(args.apps, args.sessions, args.steps, args.seed, args.timeout)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["overall"]["errors"] else 0)
@@ -0,0 +1,301 @@
+# maintenance_scheduler.py
+# Replacement-cycle and maintenance scheduling for deployed filters.
+# Rules come from the "Use & maintenance" sections of the filter instructions;
+# a registry of installations (CSV) is turned into one min-heap of due tasks per
+# region, so "what is due this week in region X" only touches the due entries.
+import argparse
+import csv
+import heapq
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from aquashield_filters import FILTER_KEYS, filter_letter
+
+# -------------------------
+# Rules
+# -------------------------
+# letter -> [(task id, reminder text, min_days, max_days)]. Ranges such as
+# "every 2-4 weeks depending on turbidity" become (14, 28): heavy users get the
+# short interval, light users the long one. Condition-based advice ("replace if
+# cracked") becomes a periodic inspection. Daily habits (rinse cloth daily) stay
+# on the printed cards; G (SODIS) and H (crisis method) have no consumables to track.
+MAINTENANCE_RULES = {
+    "A": [("replace_charcoal", "Replace charcoal", 14, 28),
+          ("rinse_cloth", "Rinse cloth; replace when worn", 7, 7)],
+    "B": [("replace_media", "Replace media (microfiber, sand, charcoal)", 14, 42)],
+    "C": [("replace_charcoal", "Replace charcoal", 30, 30),
+          ("check_sand", "Check top sand; rinse if clogged, replace if fouled", 14, 14)],
+    "D": [("replace_charcoal", "Replace charcoal", 30, 30),
+          ("clean_spigot", "Clean spigot", 7, 7)],
+    "E": [("inspect_pot", "Inspect ceramic pot; replace if cracked", 30, 30)],
+    "F": [("inspect_cloth", "Inspect cloth; replace when torn", 7, 7)],
+    "G": [],
+    "H": [],
+}
+
+# Daily use (litres) at which the long / short end of a range applies
+LIGHT_USE_LPD = 10.0
+HEAVY_USE_LPD = 40.0
+DEFAULT_USE_LPD = 20.0
+
+def interval_days(min_days: int, max_days: int, daily_litres: float) -> int:
+    """Interval for a rule, interpolated by daily usage between the range ends."""
+    if min_days == max_days:
+        return min_days
+    f = (daily_litres - LIGHT_USE_LPD) / (HEAVY_USE_LPD - LIGHT_USE_LPD)
+    f = min(max(f, 0.0), 1.0)
+    return round(max_days - f * (max_days - min_days))
+
+def _letter(value: str) -> str:
+    """Accept 'D' or a full filter key ('Filter D - Family Bucket Filter')."""
+    value = value.strip()
+    return filter_letter(value) if value.lower().startswith("filter ") else value.upper()
+
+# -------------------------
+# Scheduler
+# -------------------------
+class MaintenanceScheduler:
+    """Per-region min-heaps of (due day, install, rule) with lazy invalidation.
+
+    Completing a task pushes a new entry; the old one is recognised as stale
+    (its due day no longer matches next_due) and skipped, and heaps are rebuilt
+    once more than half of their entries are stale.
+    """
+
+    def __init__(self):
+        self.installs = []      # dicts: id, filter, region, install_day, daily_litres, contact, lang
+        self.by_id = {}         # install id -> index
+        self.heaps = {}         # region -> heap of (due_day, install index, rule index)
+        self.next_due = {}      # (install index, rule index) -> current due day
+        self.stale = {}         # region -> number of stale heap entries
+
+    def add_install(self, install_id: str, filter_name: str, region: str, install_day: int,
+                    daily_litres: float = DEFAULT_USE_LPD, contact: str = "", lang: str = "en", heapify: bool = True):
+        letter = _letter(filter_name)
+        if letter not in MAINTENANCE_RULES:
+            raise ValueError(f"{install_id}: unknown filter '{filter_name}'")
+        if install_id in self.by_id:
+            raise ValueError(f"duplicate installation id '{install_id}'")
+        idx = len(self.installs)
+        self.installs.append({"id": install_id, "filter": letter, "region": region, "install_day": install_day,
+                              "daily_litres": daily_litres, "contact": contact, "lang": lang})
+        self.by_id[install_id] = idx
+        heap = self.heaps.setdefault(region, [])
+        self.stale.setdefault(region, 0)
+        for r, (_, _, lo, hi) in enumerate(MAINTENANCE_RULES[letter]):
+            due = install_day + interval_days(lo, hi, daily_litres)
+            self.next_due[(idx, r)] = due
+            if heapify:
+                heapq.heappush(heap, (due, idx, r))
+            else:
+                heap.append((due, idx, r))
+
+    def heapify(self):
+        """Restore the heap property after bulk loading with heapify=False."""
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    def rule_index(self, install_id: str, task: str) -> int:
+        """Index of `task` in the installation's rules; ValueError for an unknown install or task."""
+        if install_id not in self.by_id:
+            raise ValueError(f"unknown installation '{install_id}'")
+        letter = self.installs[self.by_id[install_id]]["filter"]
+        for r, (task_id, _, _, _) in enumerate(MAINTENANCE_RULES[letter]):
+            if task_id == task:
+                return r
+        tasks = ", ".join(t for t, _, _, _ in MAINTENANCE_RULES[letter]) or "none"
+        raise ValueError(f"{install_id}: filter {letter} has no task '{task}' (tasks: {tasks})")
+
+    def complete(self, install_id: str, task: str, day: int):
+        """Record a done task; the next occurrence is scheduled from `day`."""
+        r = self.rule_index(install_id, task)
+        idx = self.by_id[install_id]
+        inst = self.installs[idx]
+        _, _, lo, hi = MAINTENANCE_RULES[inst["filter"]][r]
+        due = day + interval_days(lo, hi, inst["daily_litres"])
+        if self.next_due[(idx, r)] == due:
+            return
+        self.next_due[(idx, r)] = due
+        region = inst["region"]
+        heapq.heappush(self.heaps[region], (due, idx, r))
+        self.stale[region] += 1
+        if self.stale[region] * 2 > len(self.heaps[region]):
+            self._compact(region)
+
+    def _compact(self, region: str):
+        # a set also drops duplicates left by completing a task back to an earlier due day
+        heap = list({e for e in self.heaps[region] if self.next_due[(e[1], e[2])] == e[0]})
+        heapq.heapify(heap)
+        self.heaps[region] = heap
+        self.stale[region] = 0
+
+    def _due_entries(self, region: str, until: int):
+        """Live heap entries with due <= until, walking only the matching part of the heap."""
+        heap = self.heaps.get(region, [])
+        out, seen = [], set()
+        stack = [0] if heap and heap[0][0] <= until else []
+        while stack:
+            i = stack.pop()
+            due, idx, r = heap[i]
+            if self.next_due[(idx, r)] == due and (idx, r) not in seen:
+                seen.add((idx, r))
+                out.append(heap[i])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap) and heap[child][0] <= until:
+                    stack.append(child)
+        return out
+
+    def due(self, until: int, region: str = None, today: int = None, filters=None) -> list:
+        """Reminders due on or before `until` (overdue included), soonest first."""
+        regions = [region] if region is not None else sorted(self.heaps)
+        entries = []
+        for reg in regions:
+            entries += self._due_entries(reg, until)
+        entries.sort()
+        today = until if today is None else today
+        out = []
+        for due, idx, r in entries:
+            inst = self.installs[idx]
+            if filters and inst["filter"] not in filters:
+                continue
+            task_id, text, _, _ = MAINTENANCE_RULES[inst["filter"]][r]
+            out.append({
+                "install_id": inst["id"], "region": inst["region"], "filter": inst["filter"],
+                "task": task_id, "reminder": text, "due": date.fromordinal(due).isoformat(),
+                "days_overdue": max(0, today - due), "contact": inst["contact"], "lang": inst["lang"],
+            })
+        return out
+
+    def regions(self):
+        return sorted(self.heaps)
+
+# -------------------------
+# Registry / service log I/O
+# -------------------------
+# Registry CSV: install_id, filter, region, install_date (YYYY-MM-DD)
+#               [, daily_litres, contact, lang]
+# Service log CSV: install_id, task, date
+def _day(value: str) -> int:
+    return date.fromisoformat(value.strip()).toordinal()
+
+def load_registry(path: str, scheduler: MaintenanceScheduler = None) -> MaintenanceScheduler:
+    scheduler = scheduler or MaintenanceScheduler()
+    with open(path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                litres = row.get("daily_litres") or ""
+                scheduler.add_install(
+                    row["install_id"].strip(), row["filter"], row["region"].strip(), _day(row["install_date"]),
+                    float(litres) if litres.strip() else DEFAULT_USE_LPD,
+                    (row.get("contact") or "").strip(), (row.get("lang") or "en").strip(), heapify=False)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}:{line}: {e}") from None
+    scheduler.heapify()
+    return scheduler
+
+def apply_service_log(path: str, scheduler: MaintenanceScheduler) -> list:
+    """Apply completed tasks; bad lines are skipped and returned as messages, so one
+    typo in the log doesn't stop every reminder."""
+    rows, problems = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                rows.append((_day(row["date"]), line, row["install_id"].strip(), row["task"].strip()))
+            except (KeyError, ValueError, AttributeError) as e:
+                problems.append(f"{path}:{line}: skipped: {e}")
+    for day, line, install_id, task in sorted(rows):  # log order may not be chronological
+        try:
+            scheduler.complete(install_id, task, day)
+        except ValueError as e:
+            problems.append(f"{path}:{line}: skipped: {e}")
+    return problems
+
+def record_service(path: str, install_id: str, task: str, day: date, scheduler: MaintenanceScheduler):
+    """Append a completed task to the service log after checking it against the registry."""
+    scheduler.rule_index(install_id, task)
+    new = not os.path.exists(path)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        if new:
+            w.writerow(["install_id", "task", "date"])
+        w.writerow([install_id, task, day.isoformat()])
+
+REMINDER_FIELDS = ["due", "days_overdue", "region", "install_id", "filter", "task", "reminder", "contact", "lang"]
+
+def export_reminders(reminders: list, path: str):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=REMINDER_FIELDS)
+        w.writeheader()
+        for r in reminders:
+            w.writerow({k: r[k] for k in REMINDER_FIELDS})
+
+def write_synthetic_registry(path: str, installs: int, seed: int = 0):
+    """Random registry for sizing and benchmarks."""
+    rng = random.Random(seed)
+    regions = ["Kenya", "Haiti", "Bangladesh", "Peru", "Philippines", "Mozambique"]
+    start = date(2024, 1, 1).toordinal()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["install_id", "filter", "region", "install_date", "daily_litres", "contact", "lang"])
+        for i in range(installs):
+            w.writerow([f"INS{i:07d}", filter_letter(rng.choice(FILTER_KEYS)), rng.choice(regions),
+                        date.fromordinal(start + rng.randrange(700)).isoformat(), round(rng.uniform(5, 50), 1),
+                        f"+2547{rng.randrange(10**8):08d}", rng.choice(["en", "es"])])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance reminders for deployed AquaShield filters.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_due = sub.add_parser("due", help="list tasks due in a window (overdue included)")
+    p_due.add_argument("--registry", required=True, help="installations CSV")
+    p_due.add_argument("--service-log", help="completed tasks CSV (install_id, task, date)")
+    p_due.add_argument("--region")
+    p_due.add_argument("--filter", action="append", help="filter letter (repeatable)")
+    p_due.add_argument("--from", dest="start", default=date.today().isoformat(), help="window start (default: today)")
+    p_due.add_argument("--days", type=int, default=7, help="window length (default: 7, i.e. this week)")
+    p_due.add_argument("--out", help="write reminders CSV here instead of printing")
+    p_done = sub.add_parser("done", help="record a completed task in the service log")
+    p_done.add_argument("--service-log", required=True)
+    p_done.add_argument("--registry", required=True, help="installations CSV the task is checked against")
+    p_done.add_argument("install_id")
+    p_done.add_argument("task")
+    p_done.add_argument("--date", default=date.today().isoformat())
+    p_syn = sub.add_parser("synth", help="write a synthetic registry for benchmarks")
+    p_syn.add_argument("path")
+    p_syn.add_argument("--installs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.cmd == "due":
+        t0 = time.perf_counter()
+        try:
+            sched = load_registry(args.registry)
+            if args.service_log and os.path.exists(args.service_log):
+                for problem in apply_service_log(args.service_log, sched):
+                    print(problem, file=sys.stderr)
+        except ValueError as e:
+            sys.exit(str(e))
+        t1 = time.perf_counter()
+        start = date.fromisoformat(args.start)
+        until = (start + timedelta(days=args.days - 1)).toordinal()
+        reminders = sched.due(until, region=args.region, today=start.toordinal(),
+                              filters={f.upper() for f in args.filter} if args.filter else None)
+        t2 = time.perf_counter()
+        if args.out:
+            export_reminders(reminders, args.out)
+        else:
+            for r in reminders:
+                late = f" ({r['days_overdue']}d overdue)" if r["days_overdue"] else ""
+                print(f"{r['due']}  {r['region']:<12} {r['install_id']:<12} {r['filter']}  {r['reminder']}{late}")
+        print(f"{len(reminders)} reminders; loaded {len(sched.installs)} installations in {t1 - t0:.2f}s, "
+              f"query {1000 * (t2 - t1):.1f} ms" + (f" -> {args.out}" if args.out else ""), file=sys.stderr)
+    elif args.cmd == "done":
+        try:
+            record_service(args.service_log, args.install_id, args.task, date.fromisoformat(args.date),
+                           load_registry(args.registry))
+        except ValueError as e:
+            sys.exit(str(e))
+    else:
+        write_synthetic_registry(args.path, args.installs)
+        print(f"wrote {args.installs} installations to {args.path}")
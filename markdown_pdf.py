@@ -0,0 +1,402 @@
+# markdown_pdf.py
+# Render documentation/*.md (headings, lists, bold/italic, rules, code blocks)
+# into formatted A5 PDFs with FPDF.
+# Caching: the parsed AST is kept per file hash, laid-out lines per section hash
+# and the final PDF per document hash. After a small edit only the edited file
+# is re-rendered, and inside it only the changed section is re-measured.
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+from fpdf import FPDF
+
+import reproducible
+import text_layout
+from aquashield_filters import filter_doc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.join(BASE_DIR, "documentation")
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+MD_CACHE_DIR = os.path.join(CACHE_DIR, "markdown")
+
+# Bump when parsing, styles or layout change so cached entries are rebuilt
+RENDER_VERSION = 3
+
+MARGIN = 12
+BOTTOM_MARGIN = 12
+FONT = "Arial"
+MONO = "Courier"
+
+# block kind -> (font style, size pt, line height mm, space before mm)
+STYLES = {
+    "h1": ("B", 15, 7.5, 0),
+    "h2": ("B", 12.5, 6.5, 3.5),
+    "h3": ("B", 11, 5.8, 2.5),
+    "h4": ("B", 10.5, 5.5, 2),
+    "p": ("", 10, 5, 1.5),
+    "li": ("", 10, 5, 0.6),
+    "code": ("", 8.5, 4, 1.5),
+}
+LIST_INDENT = 5
+FPDF_K = 72 / 25.4  # points per mm, FPDF's scale factor for unit="mm"
+RULE_SPACE = 3
+
+# Characters outside latin-1 that appear in the docs, mapped to readable ASCII
+PDF_REPLACEMENTS = {
+    "—": "-", "–": "-", "‘": "'", "’": "'", "“": '"', "”": '"', "…": "...", "•": "-",
+    "→": "->", "←": "<-", "↓": "v", "↑": "^", "✔": "+", "✓": "+", "✘": "x", "✗": "x",
+    "≥": ">=", "≤": "<=", "≈": "~", "×": "x", " ": " ",
+}
+
+def pdf_text(text: str) -> str:
+    for bad, good in PDF_REPLACEMENTS.items():
+        text = text.replace(bad, good)
+    return text.encode("latin-1", errors="replace").decode("latin-1")
+
+def _sha(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+# -------------------------
+# Parsing -> AST
+# -------------------------
+# Blocks are JSON-friendly lists so they can be cached on disk:
+#   ["h", level, spans] | ["p", spans] | ["li", depth, marker, spans] | ["hr"] | ["code", lines]
+# spans are [text, style] with style "", "B" or "I"; text "\n" is a hard line break.
+_INLINE = re.compile(r"(\*\*.+?\*\*|__.+?__|\*[^*\s][^*]*?\*|_[^_\s][^_]*?_|`[^`]+`)")
+
+def parse_inline(text: str):
+    spans = []
+    for part in _INLINE.split(text):
+        if not part:
+            continue
+        if (part.startswith("**") and part.endswith("**")) or (part.startswith("__") and part.endswith("__")):
+            spans.append([part[2:-2], "B"])
+        elif len(part) > 2 and part[0] == part[-1] and part[0] in "*_":
+            spans.append([part[1:-1], "I"])
+        elif part.startswith("`") and part.endswith("`"):
+            spans.append([part[1:-1], ""])
+        else:
+            spans.append([part, ""])
+    return spans
+
+def parse_markdown(text: str):
+    blocks = []
+    para = []
+    code = None
+    in_indented = False
+
+    def flush_para():
+        if para:
+            spans = []
+            for i, (line, _) in enumerate(para):
+                if i:
+                    spans.append(["\n", ""] if para[i - 1][1] else [" ", ""])
+                spans.extend(parse_inline(line))
+            blocks.append(["p", spans])
+            para.clear()
+
+    for raw in text.splitlines():
+        line = raw.rstrip("\n")
+        if code is not None:
+            if line.strip().startswith("```"):
+                blocks.append(["code", code])
+                code = None
+            else:
+                code.append(line)
+            continue
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            flush_para()
+            code = []
+            continue
+        if not stripped:
+            flush_para()
+            if in_indented:
+                blocks[-1][1].append("")
+            continue
+        if line.startswith("    ") and not para and not re.match(r"^\s*([-*+]|\d+[.)])\s", line):
+            # indented code block (ASCII schematics); consecutive lines form one block
+            if in_indented:
+                blocks[-1][1].append(line[4:])
+            else:
+                blocks.append(["code", [line[4:]]])
+            in_indented = True
+            continue
+        in_indented = False
+        m = re.match(r"^(#{1,6})\s+(.*?)\s*#*$", stripped)
+        if m:
+            flush_para()
+            blocks.append(["h", len(m.group(1)), parse_inline(m.group(2))])
+            continue
+        if re.match(r"^(-{3,}|\*{3,}|_{3,})$", stripped):
+            flush_para()
+            blocks.append(["hr"])
+            continue
+        m = re.match(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$", line)
+        if m:
+            flush_para()
+            depth = len(m.group(1).expandtabs(4)) // 2
+            marker = "-" if m.group(2) in "-*+" else m.group(2)
+            blocks.append(["li", depth, marker, parse_inline(m.group(3).strip())])
+            continue
+        para.append((stripped, line.endswith("  ")))
+    flush_para()
+    if code is not None:
+        blocks.append(["code", code])
+    for b in blocks:
+        while b[0] == "code" and b[1] and not b[1][-1].strip():
+            b[1].pop()
+    return blocks
+
+def split_sections(blocks):
+    """Split blocks into sections starting at each h1/h2 heading."""
+    sections = []
+    for b in blocks:
+        if not sections or (b[0] == "h" and b[1] <= 2):
+            sections.append([])
+        sections[-1].append(b)
+    return sections
+
+_ast_cache = {}
+
+def parse_file(path: str):
+    """Parsed AST for a Markdown file, cached by content hash (memory + disk)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    key = _sha(data + f"|v{RENDER_VERSION}".encode())
+    if key in _ast_cache:
+        return key, _ast_cache[key]
+    disk = os.path.join(MD_CACHE_DIR, "ast", key[:32] + ".json")
+    if os.path.exists(disk):
+        with open(disk, encoding="utf-8") as f:
+            blocks = json.load(f)
+    else:
+        blocks = parse_markdown(data.decode("utf-8"))
+        _write_json(disk, blocks)
+    _ast_cache[key] = blocks
+    return key, blocks
+
+# -------------------------
+# Layout (per section, cached)
+# -------------------------
+# A laid-out line is [kind, space_before, height, runs]; kind is "text", "keep"
+# (heading: keep with next line) or "hr"; runs are [x, family, style, size, text].
+def _width(text: str, family: str, style: str, size: float) -> float:
+    # glyph advance tables shared with the card and page renderers (text_layout.py)
+    return text_layout.pdf_metrics(family, style).width(text) * size / FPDF_K
+
+def _wrap(spans, width: float, base_style: str, size: float, x0: float = 0.0, family: str = FONT):
+    """Greedy word wrap of styled spans; returns a list of run lists."""
+    lines, runs, x = [], [], x0
+    pending_space = False
+    for text, style in spans:
+        style = "".join(sorted(set(base_style + style)))
+        if text == "\n":
+            lines.append(runs)
+            runs, x, pending_space = [], x0, False
+            continue
+        for token in re.split(r"(\s+)", pdf_text(text)):
+            if not token:
+                continue
+            if token.isspace():
+                pending_space = bool(runs)
+                continue
+            space = _width(" ", family, style, size) if pending_space else 0.0
+            w = _width(token, family, style, size)
+            if runs and x + space + w > width:
+                lines.append(runs)
+                runs, x, space = [], x0, 0.0
+            while w > width - x0 and len(token) > 1:
+                # a single word wider than the box: hard-split it
+                cut = len(token)
+                while cut > 1 and _width(token[:cut] + "-", family, style, size) > width - x:
+                    cut -= 1
+                runs.append([x, family, style, size, token[:cut] + "-"])
+                lines.append(runs)
+                runs, x = [], x0
+                token = token[cut:]
+                w = _width(token, family, style, size)
+            runs.append([x + space, family, style, size, token])
+            x += space + w
+            pending_space = False
+    if runs:
+        lines.append(runs)
+    return lines
+
+def layout_section(blocks, width: float):
+    out = []
+    for b in blocks:
+        kind = b[0]
+        if kind == "h":
+            style, size, lh, before = STYLES[f"h{min(b[1], 4)}"]
+            for i, runs in enumerate(_wrap(b[2], width, style, size)):
+                out.append(["keep", before if i == 0 else 0, lh, runs])
+        elif kind == "p":
+            style, size, lh, before = STYLES["p"]
+            for i, runs in enumerate(_wrap(b[1], width, style, size)):
+                out.append(["text", before if i == 0 else 0, lh, runs])
+        elif kind == "li":
+            style, size, lh, before = STYLES["li"]
+            indent = LIST_INDENT * (b[1] + 1)
+            marker = pdf_text(b[2])
+            text_x = indent + max(_width(marker + " ", FONT, "B", size), 4)
+            lines = _wrap(b[3], width, style, size, x0=text_x)
+            for i, runs in enumerate(lines or [[]]):
+                if i == 0:
+                    runs = [[indent, FONT, "B", size, marker]] + runs
+                out.append(["text", before if i == 0 else 0, lh, runs])
+        elif kind == "hr":
+            out.append(["hr", RULE_SPACE, RULE_SPACE, []])
+        elif kind == "code":
+            style, size, lh, before = STYLES["code"]
+            for i, line in enumerate(b[1]):
+                out.append(["text", before if i == 0 else 0, lh, [[2, MONO, style, size, pdf_text(line)]]])
+    return out
+
+def _section_key(blocks, width: float) -> str:
+    return _sha(json.dumps([RENDER_VERSION, width, blocks], ensure_ascii=False))
+
+_layout_cache = {}
+
+def layout_document(path: str, blocks, width: float):
+    """Laid-out lines per section; unchanged sections come from the per-file layout cache."""
+    store_path = os.path.join(MD_CACHE_DIR, "layout", _sha(os.path.abspath(path))[:32] + ".json")
+    stored = _layout_cache.get(store_path)
+    if stored is None:
+        stored = {}
+        if os.path.exists(store_path):
+            with open(store_path, encoding="utf-8") as f:
+                stored = json.load(f)
+    fresh, reused = {}, 0
+    sections = []
+    for sec in split_sections(blocks):
+        key = _section_key(sec, width)
+        if key in stored:
+            lines = stored[key]
+            reused += 1
+        else:
+            lines = layout_section(sec, width)
+        fresh[key] = lines
+        sections.append(lines)
+    if fresh.keys() != stored.keys():
+        _write_json(store_path, fresh)
+    _layout_cache[store_path] = fresh
+    return sections, reused
+
+# -------------------------
+# PDF output
+# -------------------------
+def render_sections(sections, title: str = "") -> bytes:
+    pdf = FPDF(format="A5")
+    pdf.set_margins(MARGIN, MARGIN, MARGIN)
+    pdf.set_auto_page_break(False)
+    if title:
+        pdf.set_title(pdf_text(title))
+    pdf.add_page()
+    bottom = pdf.h - BOTTOM_MARGIN
+    lines = [ln for sec in sections for ln in sec]
+    for i, (kind, before, height, runs) in enumerate(lines):
+        y = pdf.get_y()
+        if y > pdf.t_margin:
+            y += before
+        need = height
+        if kind == "keep" and i + 1 < len(lines):
+            need += lines[i + 1][2]  # never leave a heading alone at the page bottom
+        if y + need > bottom:
+            pdf.add_page()
+            y = pdf.get_y()
+        if kind == "hr":
+            mid = y + height / 2
+            pdf.set_draw_color(160, 160, 160)
+            pdf.line(pdf.l_margin, mid, pdf.w - pdf.r_margin, mid)
+        for x, family, style, size, text in runs:
+            pdf.set_font(family, style, size)
+            pdf.set_xy(pdf.l_margin + x, y)
+            pdf.cell(0, height, text)
+        pdf.set_y(y + height)
+    return reproducible.pdf_bytes(pdf)
+
+def _doc_title(blocks) -> str:
+    for b in blocks:
+        if b[0] == "h":
+            return "".join(t for t, _ in b[2])
+    return ""
+
+def render_markdown_file(path: str, stats: dict = None) -> bytes:
+    """A5 PDF bytes for one Markdown file (cached by content hash)."""
+    key, blocks = parse_file(path)
+    pdf_path = os.path.join(MD_CACHE_DIR, "pdf", key[:32] + ".pdf")
+    if os.path.exists(pdf_path):
+        if stats is not None:
+            stats["cached"] = stats.get("cached", 0) + 1
+        with open(pdf_path, "rb") as f:
+            return f.read()
+    width = FPDF(format="A5").w - 2 * MARGIN
+    sections, reused = layout_document(path, blocks, width)
+    data = render_sections(sections, _doc_title(blocks))
+    os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+    tmp = f"{pdf_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, pdf_path)
+    if stats is not None:
+        stats["rendered"] = stats.get("rendered", 0) + 1
+        stats["sections_reused"] = stats.get("sections_reused", 0) + reused
+        stats["sections_laid_out"] = stats.get("sections_laid_out", 0) + len(sections) - reused
+    return data
+
+def _write_json(path: str, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+# -------------------------
+# Documentation set / filter guides
+# -------------------------
+def documentation_files():
+    out = []
+    for root, _, names in os.walk(DOCS_DIR):
+        out += [os.path.join(root, n) for n in names if n.endswith(".md")]
+    return sorted(out)
+
+def render_documentation(out_dir: str = None) -> dict:
+    """Render every documentation/*.md; optionally mirror the PDFs into out_dir."""
+    stats = {"files": 0}
+    t0 = time.perf_counter()
+    for path in documentation_files():
+        data = render_markdown_file(path, stats)
+        stats["files"] += 1
+        if out_dir:
+            rel = os.path.relpath(path, DOCS_DIR)[:-3] + ".pdf"
+            dest = os.path.join(out_dir, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, "wb") as f:
+                f.write(data)
+    stats["seconds"] = round(time.perf_counter() - t0, 4)
+    return stats
+
+def filter_guide_path(filter_key: str, lang: str = "en"):
+    """Markdown source of the guide for a filter in `lang` (English if no translation), or None."""
+    rel = filter_doc(filter_key, lang)
+    if rel is None:
+        return None
+    path = os.path.join(DOCS_DIR, rel)
+    return path if os.path.exists(path) else None
+
+def filter_guide_pdf(filter_key: str, lang: str = "en"):
+    """Formatted A5 guide for a filter, or None when there is no guide."""
+    path = filter_guide_path(filter_key, lang)
+    return render_markdown_file(path) if path else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render documentation/*.md to formatted A5 PDFs.")
+    parser.add_argument("--out", help="directory to write the PDFs to (mirrors documentation/)")
+    args = parser.parse_args()
+    print(json.dumps(render_documentation(args.out)))
@@ -0,0 +1,137 @@
+# performance_dashboard.py
+# Turbidity and log-reduction trends per filter from the ingested data/ results
+# (see performance_data.py). Series are reduced server-side with LTTB before
+# charting, and cached per query, so only a few hundred points reach the browser.
+# All-time rollups come from the saved streaming aggregates (field_aggregates.py),
+# so they show right after a restart, even before anything is ingested. The page
+# only reads the saved state; new rows are folded in the background
+# (field_aggregates.start_updater, started with the warm-up) or by
+# `python field_aggregates.py update`.
+import os
+
+import streamlit as st
+import pandas as pd
+
+import downsample
+import field_aggregates
+import performance_data
+
+st.title("📈 Filter Performance Dashboard")
+
+METRIC_LABELS = {
+    "lrv": "E. coli log reduction (LRV)",
+    "turbidity_out_ntu": "Turbidity after filtering (NTU)",
+    "turbidity_in_ntu": "Turbidity before filtering (NTU)",
+    "turbidity_reduction_pct": "Turbidity reduction (%)",
+    "flow_lph": "Flow rate (L/h)",
+}
+
+# -------------------------
+# Cached queries
+# -------------------------
+def store_version():
+    """Changes whenever new CSVs are ingested; part of every cache key below."""
+    manifest = performance_data.read_manifest()
+    return manifest["rows"], tuple(sorted((k, v["sha256"]) for k, v in manifest["sources"].items()))
+
+@st.cache_resource(max_entries=2)
+def open_store(version):
+    return performance_data.PerformanceStore()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def trend(version, metric, filters, region, date_from, date_to, daily, points):
+    """Long-format (date, filter, value) frame, at most `points` rows per filter."""
+    store = open_store(version)
+    frames, raw = [], 0
+    for f in filters:
+        x, y = performance_data.metric_series(store, metric, daily=daily, filter=f, region=region,
+                                              date_from=date_from, date_to=date_to)
+        raw += len(x)
+        if len(x) == 0:
+            continue
+        x, y = downsample.downsample(x, y, points)
+        frames.append(pd.DataFrame({"date": pd.to_datetime(x, unit="D"), "filter": f, "value": y}))
+    if not frames:
+        return pd.DataFrame(columns=["date", "filter", "value"]), raw
+    return pd.concat(frames, ignore_index=True), raw
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def stats_table(version, filters, region, date_from, date_to):
+    stats = performance_data.filter_stats(open_store(version), filter=list(filters), region=region,
+                                          date_from=date_from, date_to=date_to)
+    return pd.DataFrame(stats)
+
+def state_signature():
+    """(mtime, size) of the saved aggregate state; changes whenever the updater saves."""
+    try:
+        s = os.stat(field_aggregates.STATE_PATH)
+    except OSError:
+        return None
+    return s.st_mtime_ns, s.st_size
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def saved_aggregates(signature):
+    return field_aggregates.load_state()
+
+def rollup_section(region=None) -> bool:
+    """All-time rollups from the saved aggregates; False when there are none."""
+    state = saved_aggregates(state_signature())
+    if not state["groups"]:
+        if field_aggregates.folding():
+            st.caption("All-time rollups are being computed in the background…")
+        return False
+    st.subheader("All-time rollups")
+    st.caption("From the saved streaming aggregates (field_aggregates.py); p5/p50/p95 are sketch estimates (±2%).")
+    c1, c2 = st.columns(2)
+    metric = c1.selectbox("Rollup metric", field_aggregates.METRICS, format_func=METRIC_LABELS.get, key="rollup_metric")
+    by = c2.multiselect("Group by", field_aggregates.DIMENSIONS, default=["filter"], key="rollup_by") or ["filter"]
+    rows = [dict(zip(by, key), **s) for key, s in field_aggregates.rollup(state, metric, by=tuple(by), region=region).items()]
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+    return True
+
+# -------------------------
+# Page
+# -------------------------
+version = store_version()
+store = open_store(version)
+if store.rows == 0:
+    if not rollup_section():
+        st.info("No test results ingested yet. Add CSVs under `data/` (schema in `data/README.md`) "
+                "and run `python performance_data.py ingest`.")
+    st.stop()
+
+filters_all = store.dictionaries["filter"]
+regions_all = store.dictionaries["region"]
+days = store.column("date")
+first_day = pd.to_datetime(int(days.min()), unit="D").date()
+last_day = pd.to_datetime(int(days.max()), unit="D").date()
+
+st.sidebar.header("Dashboard")
+metric = st.sidebar.selectbox("Metric", list(METRIC_LABELS), format_func=METRIC_LABELS.get)
+filters = st.sidebar.multiselect("Filters", filters_all, default=filters_all)
+region = st.sidebar.selectbox("Region", ["All regions"] + regions_all)
+date_range = st.sidebar.date_input("Dates", (first_day, last_day), min_value=first_day, max_value=last_day)
+daily = st.sidebar.radio("Resolution", ("Daily mean", "Individual samples")) == "Daily mean"
+points = st.sidebar.slider("Max points per filter", 100, 2000, 500, step=100,
+                           help="Series are downsampled on the server (LTTB) before plotting.")
+
+region_arg = None if region == "All regions" else region
+date_from = str(date_range[0]) if len(date_range) > 0 else None
+date_to = str(date_range[1]) if len(date_range) > 1 else None
+
+if not filters:
+    st.warning("Select at least one filter.")
+    st.stop()
+
+df, raw = trend(version, metric, tuple(filters), region_arg, date_from, date_to, daily, points)
+st.subheader(METRIC_LABELS[metric])
+if df.empty:
+    st.info("No measurements for this selection.")
+else:
+    st.line_chart(df, x="date", y="value", color="filter")
+    st.caption(f"{len(df):,} points plotted from {raw:,} {'daily means' if daily else 'samples'}.")
+
+st.subheader("Per-filter summary")
+st.dataframe(stats_table(version, tuple(filters), region_arg, date_from, date_to), hide_index=True)
+
+rollup_section(region_arg)
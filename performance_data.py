@@ -0,0 +1,486 @@
+# performance_data.py
+# Ingestion and statistics for filter performance tests (CSV files under data/).
+# CSVs are validated against SCHEMA and appended to a columnar store: one raw
+# little-endian file per column, opened with numpy.memmap, plus manifest.json
+# (row count, dtypes, category dictionaries, ingested sources). Queries never
+# reparse CSVs; per-filter statistics are computed with vectorized numpy.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+PROFILES_DIR = os.path.join(DATA_DIR, "contamination_profiles")
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+STORE_DIR = os.path.join(CACHE_DIR, "performance")
+STORE_VERSION = 1
+
+CHUNK_ROWS = 50_000  # rows parsed at a time; ingest memory peaks at one chunk (~100 MB of strings)
+# E. coli counts of 0 are below the detection limit of a 100 mL membrane test
+ECOLI_DETECTION_LIMIT = 1.0
+
+# -------------------------
+# Schema
+# -------------------------
+# name -> (kind, required, default). kind: "category" (dictionary-encoded int32),
+# "date" (int32 days since 1970-01-01) or "float" (float64, must be >= 0, empty = NaN).
+SCHEMA = {
+    "filter": ("category", True, None),
+    "date": ("date", True, None),
+    "region": ("category", False, "unknown"),
+    "lab": ("category", False, "unknown"),
+    "profile": ("category", False, None),  # default: CSV name under contamination_profiles/, else "general"
+    "turbidity_in_ntu": ("float", False, np.nan),
+    "turbidity_out_ntu": ("float", False, np.nan),
+    "ecoli_in_cfu_100ml": ("float", False, np.nan),
+    "ecoli_out_cfu_100ml": ("float", False, np.nan),
+    "flow_lph": ("float", False, np.nan),
+    "volume_l": ("float", False, np.nan),
+}
+DTYPES = {"category": "<i4", "date": "<i4", "float": "<f8"}
+
+class ValidationError(ValueError):
+    pass
+
+def _profile_default(path: str) -> str:
+    rel = os.path.relpath(path, PROFILES_DIR)
+    if rel.startswith(".."):
+        return "general"
+    return os.path.splitext(rel)[0].replace(os.sep, "/")
+
+def validate_chunk(df, path: str, first_line: int):
+    """Coerce a raw string chunk to schema types.
+
+    Returns (columns, errors): columns maps name -> numpy array (categories still
+    as strings) for valid rows only; errors are 'file:line: column: message'.
+    """
+    bad = np.zeros(len(df), dtype=bool)
+    errors = []
+    cols = {}
+
+    def reject(mask, col, message):
+        nonlocal bad
+        for i in np.flatnonzero(mask & ~bad)[:20]:
+            errors.append(f"{os.path.relpath(path, BASE_DIR)}:{first_line + i}: {col}: {message}")
+        bad |= mask
+
+    for name, (kind, required, default) in SCHEMA.items():
+        raw = df[name].str.strip() if name in df else pd.Series([""] * len(df), index=df.index)
+        empty = raw.isna().to_numpy() | (raw.fillna("") == "").to_numpy()
+        if required:
+            reject(empty, name, "required value missing")
+        if kind == "category":
+            if name == "profile" and default is None:
+                default = _profile_default(path)
+            cols[name] = np.where(empty, default or "", raw.fillna("").to_numpy(dtype=object))
+        elif kind == "date":
+            parsed = pd.to_datetime(raw, format="%Y-%m-%d", errors="coerce")
+            reject(parsed.isna().to_numpy() & ~empty, name, "expected YYYY-MM-DD")
+            days = parsed.to_numpy(dtype="datetime64[D]").astype("int64")
+            cols[name] = np.where(parsed.isna().to_numpy(), 0, days).astype(np.int32)
+        else:
+            values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64)
+            reject(np.isnan(values) & ~empty, name, "not a number")
+            reject(values < 0, name, "must be >= 0")
+            cols[name] = np.where(empty, default, values)
+    keep = ~bad
+    errors.sort(key=lambda e: int(e.split(":")[1]))
+    return {k: v[keep] for k, v in cols.items()}, errors
+
+def read_csv_chunks(path: str, chunk_rows: int = CHUNK_ROWS):
+    """Yield (validated columns, errors) per chunk; raises ValidationError on a bad header."""
+    header = pd.read_csv(path, nrows=0).columns.str.strip().str.lower()
+    missing = [n for n, (_, required, _) in SCHEMA.items() if required and n not in header]
+    if missing:
+        raise ValidationError(f"{os.path.relpath(path, BASE_DIR)}: missing required column(s): {', '.join(missing)}")
+    line = 2
+    for df in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows, skipinitialspace=True):
+        df.columns = df.columns.str.strip().str.lower()
+        yield validate_chunk(df, path, line)
+        line += len(df)
+
+# -------------------------
+# Columnar store
+# -------------------------
+def _manifest_path(store_dir: str) -> str:
+    return os.path.join(store_dir, "manifest.json")
+
+def _column_path(store_dir: str, name: str) -> str:
+    return os.path.join(store_dir, f"{name}.col")
+
+def _empty_manifest() -> dict:
+    return {"version": STORE_VERSION, "rows": 0,
+            "columns": {n: DTYPES[kind] for n, (kind, _, _) in SCHEMA.items()},
+            "dictionaries": {n: [] for n, (kind, _, _) in SCHEMA.items() if kind == "category"},
+            "sources": {}}
+
+def read_manifest(store_dir: str = STORE_DIR) -> dict:
+    path = _manifest_path(store_dir)
+    if not os.path.exists(path):
+        return _empty_manifest()
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != STORE_VERSION or set(manifest["columns"]) != set(SCHEMA):
+        return _empty_manifest()
+    return manifest
+
+def _write_manifest(store_dir: str, manifest: dict):
+    path = _manifest_path(store_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def _truncate_columns(store_dir: str, manifest: dict):
+    """Drop bytes past the manifest row count (left behind by an interrupted ingest)."""
+    for name, dtype in manifest["columns"].items():
+        path = _column_path(store_dir, name)
+        size = manifest["rows"] * np.dtype(dtype).itemsize
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        if os.path.getsize(path) != size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+def _encode(values, dictionary: list, lookup: dict):
+    """Dictionary-encode strings, extending the (append-only) dictionary."""
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    codes = np.empty(len(uniques), dtype=np.int32)
+    for i, u in enumerate(uniques):
+        if u not in lookup:
+            lookup[u] = len(dictionary)
+            dictionary.append(u)
+        codes[i] = lookup[u]
+    return codes[inverse]
+
+def source_csvs(data_dir: str = DATA_DIR):
+    out = []
+    for root, _, names in os.walk(data_dir):
+        out += [os.path.join(root, n) for n in names if n.lower().endswith(".csv")]
+    return sorted(out)
+
+def _file_sha(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def ingest(paths=None, store_dir: str = STORE_DIR, rebuild: bool = False, strict: bool = False) -> dict:
+    """Append new CSVs to the store.
+
+    Unchanged files are skipped by content hash. If an already ingested file
+    changed, the store is rebuilt from every known source plus `paths` (known
+    sources that no longer exist are reported as missing). With strict=True a
+    file with any invalid row is rejected as a whole. Chunks are appended to
+    the column files as they are read, so memory does not grow with file size;
+    a rejected file is rolled back to the last manifest. A rebuild first
+    commits an empty manifest listing its sources as pending, so an
+    interrupted rebuild leaves an empty store that the next run completes.
+    """
+    paths = source_csvs() if paths is None else [os.path.abspath(p) for p in paths]
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    report = {"ingested": [], "skipped": [], "rejected": [], "missing": [], "errors": [], "rows_added": 0}
+    for rel in manifest.get("pending", []):
+        path = os.path.normpath(os.path.join(BASE_DIR, rel))
+        if path not in paths and rel not in manifest["sources"]:
+            if os.path.exists(path):
+                paths.append(path)
+            else:
+                report["missing"].append(rel)
+    hashes = {os.path.relpath(p, BASE_DIR): _file_sha(p) for p in paths}
+    known = manifest["sources"]
+    if not rebuild and any(hashes.get(rel, s["sha256"]) != s["sha256"] for rel, s in known.items()):
+        rebuild = True
+    if rebuild:
+        for rel in known:
+            path = os.path.normpath(os.path.join(BASE_DIR, rel))
+            if path in paths:
+                continue
+            if os.path.exists(path):
+                paths.append(path)
+                hashes[rel] = _file_sha(path)
+            else:
+                report["missing"].append(rel)
+        manifest = _empty_manifest()
+        manifest["pending"] = sorted(os.path.relpath(p, BASE_DIR) for p in paths)
+        # commit point of the rebuild, before any column byte changes: the old rows
+        # are gone, never mixed with partial new ones
+        _write_manifest(store_dir, manifest)
+    _truncate_columns(store_dir, manifest)
+    lookups = {n: {v: i for i, v in enumerate(d)} for n, d in manifest["dictionaries"].items()}
+    for path in paths:
+        rel = os.path.relpath(path, BASE_DIR)
+        if rel in manifest["sources"]:
+            report["skipped"].append(rel)
+            continue
+        dictionaries = {n: list(d) for n, d in manifest["dictionaries"].items()}
+        errors, added, failed = [], 0, False
+        try:
+            for cols, errs in read_csv_chunks(path):
+                errors += errs
+                if strict and errs:
+                    failed = True
+                    break
+                for name, dtype in manifest["columns"].items():
+                    values = cols[name]
+                    if name in manifest["dictionaries"]:
+                        values = _encode(values, manifest["dictionaries"][name], lookups[name])
+                    with open(_column_path(store_dir, name), "ab") as f:
+                        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                added += len(cols["filter"])
+        except (ValidationError, pd.errors.ParserError) as e:
+            errors.append(str(e))
+            failed = True
+        report["errors"] += errors
+        if failed or (not added and errors):
+            # roll back this file: column bytes past the manifest and new dictionary entries
+            _truncate_columns(store_dir, manifest)
+            manifest["dictionaries"] = dictionaries
+            lookups = {n: {v: i for i, v in enumerate(d)} for n, d in dictionaries.items()}
+            report["rejected"].append(rel)
+            continue
+        manifest["rows"] += added
+        manifest["sources"][rel] = {"sha256": hashes[rel], "rows": added, "invalid_rows": len(errors)}
+        _write_manifest(store_dir, manifest)  # commit point for this file
+        report["ingested"].append(rel)
+        report["rows_added"] += added
+    manifest.pop("pending", None)
+    _write_manifest(store_dir, manifest)
+    report["rows"] = manifest["rows"]
+    return report
+
+class PerformanceStore:
+    """Read-only memory-mapped view of the columnar store."""
+
+    def __init__(self, store_dir: str = STORE_DIR):
+        self.store_dir = store_dir
+        self.manifest = read_manifest(store_dir)
+        self.rows = self.manifest["rows"]
+        self.dictionaries = self.manifest["dictionaries"]
+        self._columns = {}
+
+    def column(self, name: str):
+        if name not in self._columns:
+            dtype = np.dtype(self.manifest["columns"][name])
+            if self.rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(_column_path(self.store_dir, name), dtype=dtype, mode="r", shape=(self.rows,))
+        return self._columns[name]
+
+    def codes_for(self, name: str, values) -> list:
+        lookup = {v: i for i, v in enumerate(self.dictionaries[name])}
+        return [lookup[v] for v in values if v in lookup]
+
+    def mask(self, date_from: str = None, date_to: str = None, **equals):
+        """Row mask: inclusive date range plus category equality, e.g. region='Kenya'."""
+        m = np.ones(self.rows, dtype=bool)
+        if date_from:
+            m &= self.column("date") >= np.datetime64(date_from, "D").astype(np.int64)
+        if date_to:
+            m &= self.column("date") <= np.datetime64(date_to, "D").astype(np.int64)
+        for name, value in equals.items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            m &= np.isin(self.column(name), self.codes_for(name, values))
+        return m
+
+# -------------------------
+# Vectorized statistics
+# -------------------------
+def group_percentiles(codes, values, ngroups: int, qs):
+    """Linear-interpolated percentiles of `values` per group code, ignoring NaN.
+
+    Returns an array (ngroups, len(qs)); groups without data are NaN.
+    """
+    ok = ~np.isnan(values)
+    codes, values = codes[ok], values[ok]
+    order = np.lexsort((values, codes))
+    v = values[order]
+    counts = np.bincount(codes, minlength=ngroups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    out = np.full((ngroups, len(qs)), np.nan)
+    has = counts > 0
+    for j, q in enumerate(qs):
+        pos = q / 100.0 * (counts[has] - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        frac = pos - lo
+        base = starts[has]
+        out[has, j] = v[base + lo] * (1 - frac) + v[base + hi] * frac
+    return out
+
+def group_mean(codes, values, ngroups: int):
+    ok = ~np.isnan(values)
+    n = np.bincount(codes[ok], minlength=ngroups)
+    s = np.bincount(codes[ok], weights=values[ok], minlength=ngroups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, s / np.maximum(n, 1), np.nan), n
+
+def log_reduction(count_in, count_out, detection_limit: float = ECOLI_DETECTION_LIMIT):
+    """LRV = log10(in / out); out below the detection limit counts as the limit."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lrv = np.log10(count_in / np.maximum(count_out, detection_limit))
+    return np.where(count_in > 0, lrv, np.nan)
+
+def filter_stats(store: PerformanceStore = None, by: str = "filter", **where) -> list:
+    """Per-group statistics (default: per filter) for rows matching `where` (see PerformanceStore.mask)."""
+    store = store or PerformanceStore()
+    names = store.dictionaries[by]
+    if store.rows == 0:
+        return []
+    m = store.mask(**where)
+    codes = np.asarray(store.column(by))[m]
+    n = len(names)
+    col = lambda name: np.asarray(store.column(name))[m]
+
+    lrv = log_reduction(col("ecoli_in_cfu_100ml"), col("ecoli_out_cfu_100ml"))
+    t_in, t_out = col("turbidity_in_ntu"), col("turbidity_out_ntu")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_red = np.where(t_in > 0, 100.0 * (1 - t_out / t_in), np.nan)
+    rows = np.bincount(codes, minlength=n)
+    lrv_mean, lrv_n = group_mean(codes, lrv, n)
+    lrv_p = group_percentiles(codes, lrv, n, (5, 50))
+    tin_mean, _ = group_mean(codes, t_in, n)
+    tout_mean, _ = group_mean(codes, t_out, n)
+    tred_p = group_percentiles(codes, t_red, n, (50,))
+    flow_p = group_percentiles(codes, col("flow_lph"), n, (10, 50, 90))
+
+    def r(x, d=3):
+        return None if np.isnan(x) else round(float(x), d)
+
+    out = []
+    for g in np.flatnonzero(rows):
+        out.append({
+            by: names[g], "rows": int(rows[g]),
+            "lrv_n": int(lrv_n[g]), "lrv_mean": r(lrv_mean[g]), "lrv_p5": r(lrv_p[g, 0]), "lrv_median": r(lrv_p[g, 1]),
+            "turbidity_in_mean": r(tin_mean[g]), "turbidity_out_mean": r(tout_mean[g]),
+            "turbidity_reduction_median_pct": r(tred_p[g, 0], 1),
+            "flow_p10": r(flow_p[g, 0], 2), "flow_p50": r(flow_p[g, 1], 2), "flow_p90": r(flow_p[g, 2], 2),
+        })
+    return out
+
+SERIES_METRICS = ("lrv", "turbidity_in_ntu", "turbidity_out_ntu", "turbidity_reduction_pct", "flow_lph")
+
+def metric_values(store: PerformanceStore, metric: str, mask):
+    if metric == "lrv":
+        return log_reduction(np.asarray(store.column("ecoli_in_cfu_100ml"))[mask],
+                             np.asarray(store.column("ecoli_out_cfu_100ml"))[mask])
+    if metric == "turbidity_reduction_pct":
+        t_in = np.asarray(store.column("turbidity_in_ntu"))[mask]
+        t_out = np.asarray(store.column("turbidity_out_ntu"))[mask]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(t_in > 0, 100.0 * (1 - t_out / t_in), np.nan)
+    return np.asarray(store.column(metric))[mask]
+
+def metric_series(store: PerformanceStore, metric: str, daily: bool = True, **where):
+    """(days, values) sorted by date for rows matching `where`.
+
+    daily=True averages per day; otherwise every sample is returned, spread
+    evenly within its day so the x axis stays strictly ordered.
+    """
+    if store.rows == 0:
+        return np.empty(0), np.empty(0)
+    m = store.mask(**where)
+    days = np.asarray(store.column("date"))[m].astype(np.int64)
+    values = metric_values(store, metric, m)
+    ok = ~np.isnan(values)
+    days, values = days[ok], values[ok]
+    if len(days) == 0:
+        return np.empty(0), np.empty(0)
+    if daily:
+        first = days.min()
+        n = np.bincount(days - first)
+        s = np.bincount(days - first, weights=values)
+        has = np.flatnonzero(n)
+        return (has + first).astype(np.float64), s[has] / n[has]
+    order = np.argsort(days, kind="stable")
+    days, values = days[order], values[order]
+    starts = np.searchsorted(days, days, side="left")
+    counts = np.searchsorted(days, days, side="right") - starts
+    x = days + (np.arange(len(days)) - starts) / counts
+    return x, values
+
+# -------------------------
+# Synthetic data (benchmarks only)
+# -------------------------
+def write_synthetic_csv(path: str, rows: int, seed: int = 0):
+    """Plausible random test results in the schema, for sizing and benchmarks."""
+    rng = np.random.default_rng(seed)
+    filters = np.array(list("ABCDEFGH"))
+    regions = np.array(["Kenya", "Haiti", "Bangladesh", "Peru", "Philippines", "Mozambique"])
+    f = rng.integers(0, len(filters), rows)
+    base_lrv = np.array([1.5, 2.0, 1.8, 2.2, 2.8, 0.8, 3.0, 3.5])[f]
+    e_in = np.round(10 ** rng.uniform(1.5, 4.0, rows))
+    e_out = np.floor(e_in / 10 ** np.clip(rng.normal(base_lrv, 0.5), 0, None))
+    t_in = np.round(rng.lognormal(3.0, 0.8, rows), 2)
+    t_out = np.round(t_in * rng.uniform(0.02, 0.4, rows), 2)
+    flow = np.round(rng.lognormal(np.log(np.array([2, 4, 6, 10, 1.5, 8, 0.5, 5])[f]), 0.3), 2)
+    days = rng.integers(np.datetime64("2023-01-01").astype(int), np.datetime64("2025-12-31").astype(int), rows)
+    df = pd.DataFrame({
+        "filter": filters[f], "date": np.datetime_as_string(days.astype("datetime64[D]")),
+        "region": regions[rng.integers(0, len(regions), rows)], "lab": "synthetic",
+        "turbidity_in_ntu": t_in, "turbidity_out_ntu": t_out,
+        "ecoli_in_cfu_100ml": e_in, "ecoli_out_cfu_100ml": e_out,
+        "flow_lph": flow, "volume_l": np.round(rng.uniform(0, 4000, rows), 1),
+    })
+    df.to_csv(path, index=False)
+
+def _print_stats(stats: list, by: str):
+    cols = ["rows", "lrv_mean", "lrv_p5", "lrv_median", "turbidity_in_mean", "turbidity_out_mean",
+            "turbidity_reduction_median_pct", "flow_p10", "flow_p50", "flow_p90"]
+    print(f"{by:<14}" + "".join(f"{c.replace('turbidity_', 't_').replace('_median_pct', '%'):>13}" for c in cols))
+    for s in stats:
+        print(f"{s[by]:<14}" + "".join(f"{'-' if s[c] is None else s[c]:>13}" for c in cols))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest filter performance CSVs and print per-filter statistics.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_ing = sub.add_parser("ingest", help="validate and append CSVs (default: every CSV under data/)")
+    p_ing.add_argument("paths", nargs="*")
+    p_ing.add_argument("--rebuild", action="store_true", help="drop the store and re-ingest everything")
+    p_ing.add_argument("--strict", action="store_true", help="reject a whole file if any row is invalid")
+    p_st = sub.add_parser("stats", help="per-group statistics from the store")
+    p_st.add_argument("--by", default="filter", choices=[n for n, (k, _, _) in SCHEMA.items() if k == "category"])
+    p_st.add_argument("--filter")
+    p_st.add_argument("--region")
+    p_st.add_argument("--from", dest="date_from")
+    p_st.add_argument("--to", dest="date_to")
+    p_st.add_argument("--json", action="store_true")
+    p_syn = sub.add_parser("synth", help="write a synthetic CSV for benchmarks (not into data/)")
+    p_syn.add_argument("path")
+    p_syn.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.cmd == "ingest":
+        t0 = time.perf_counter()
+        rep = ingest(args.paths or None, rebuild=args.rebuild, strict=args.strict)
+        for e in rep["errors"][:50]:
+            print(e, file=sys.stderr)
+        print(f"ingested {len(rep['ingested'])} file(s), skipped {len(rep['skipped'])}, rejected {len(rep['rejected'])}; "
+              f"+{rep['rows_added']} rows, {rep['rows']} total ({time.perf_counter() - t0:.2f}s)")
+        if rep["missing"]:
+            print(f"dropped on rebuild (file no longer exists): {', '.join(rep['missing'])}", file=sys.stderr)
+        if rep["rejected"]:
+            sys.exit(1)
+    elif args.cmd == "stats":
+        t0 = time.perf_counter()
+        stats = filter_stats(by=args.by, filter=args.filter, region=args.region,
+                             date_from=args.date_from, date_to=args.date_to)
+        if args.json:
+            print(json.dumps(stats, indent=1))
+        else:
+            _print_stats(stats, args.by)
+            print(f"({time.perf_counter() - t0:.3f}s)", file=sys.stderr)
+    else:
+        write_synthetic_csv(args.path, args.rows)
+        print(f"wrote {args.rows} rows to {args.path}")
@@ -0,0 +1,422 @@
+# qr_verify.py
+# Scan-verification for every QR code the project generates: the offline and
+# online QR PNGs, the QR printed on each card, and the segno codes of the
+# standalone QR apps. Each code is decoded from its PNG and must give back the
+# exact payload bytes; it is then "printed" at shrinking sizes under a
+# degradation profile (printer resolution, ink spread, contrast loss, noise) and
+# re-read, to find the smallest print size that still scans.
+#
+# The built-in reader knows where the symbol sits in the image (we made it), so
+# it skips localization: it samples module centres, reads format information,
+# unmasks and de-interleaves the codewords, and a degraded print passes when
+# every Reed-Solomon block has no more wrong codewords than it can correct and
+# the finder patterns survive. When zxing-cpp or pyzbar is installed the
+# degraded prints are also decoded end-to-end with it and must match exactly.
+# Codes are checked in parallel across all cores.
+#
+#   python qr_verify.py                        # everything, cheap-inkjet profile
+#   python qr_verify.py --profile inkjet --json report.json
+#   python qr_verify.py --only card --locales es
+import argparse
+import functools
+import io
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageFilter
+import qrcode.base
+import qrcode.util
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Printer dots per inch, ink spread (Gaussian sigma in dots), printed black/white
+# levels (0-255) and sensor noise (sigma, grey levels)
+Degradation = namedtuple("Degradation", "dpi blur contrast noise")
+PROFILES = {
+    "laser": Degradation(600, 0.5, (25, 240), 6),
+    "inkjet": Degradation(300, 0.8, (45, 225), 10),
+    "cheap-inkjet": Degradation(150, 1.0, (70, 205), 16),
+    "photocopy": Degradation(200, 1.3, (90, 190), 22),
+}
+DEFAULT_PROFILE = "cheap-inkjet"
+SIZES_MM = (100, 80, 60, 50, 40, 35, 30, 25, 22, 20, 18, 16, 14, 12, 10)
+TRIALS = 3           # noise seeds per size; all must read
+FINDER_TOLERANCE = 0.12  # share of finder-pattern modules that may flip
+
+# QR format-information EC bits -> level name (ISO/IEC 18004 table 12)
+EC_LEVELS = {1: "L", 0: "M", 3: "Q", 2: "H"}
+# Codewords set aside for misdecode protection in the smallest versions (table 9)
+MISDECODE_P = {(1, "L"): 3, (1, "M"): 2, (1, "Q"): 1, (1, "H"): 1, (2, "L"): 2, (3, "L"): 1}
+ALNUM = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+Symbol = namedtuple("Symbol", "matrix version ec mask payload eci x0 y0 module quiet")
+
+try:
+    import zxingcpp
+    DECODER = "zxing-cpp"
+except ImportError:
+    try:
+        from pyzbar import pyzbar
+        DECODER = "pyzbar"
+    except ImportError:
+        DECODER = None
+
+# -------------------------
+# Symbol structure
+# -------------------------
+@functools.lru_cache(maxsize=None)
+def function_map(version: int) -> np.ndarray:
+    """True for finder, separator, timing, alignment, format and version modules."""
+    n = 17 + 4 * version
+    f = np.zeros((n, n), dtype=bool)
+    f[:9, :9] = f[:9, n - 8:] = f[n - 8:, :9] = True
+    f[6, :] = f[:, 6] = True
+    pos = qrcode.util.pattern_position(version)
+    for r in pos:
+        for c in pos:
+            if (r, c) in ((6, 6), (6, n - 7), (n - 7, 6)):
+                continue
+            f[r - 2:r + 3, c - 2:c + 3] = True
+    if version >= 7:
+        f[:6, n - 11:n - 8] = f[n - 11:n - 8, :6] = True
+    return f
+
+@functools.lru_cache(maxsize=None)
+def data_order(version: int):
+    """(rows, cols) of the data modules in placement order (two-column zigzag from bottom-right)."""
+    n = 17 + 4 * version
+    func = function_map(version)
+    rows, cols = [], []
+    upward = True
+    col = n - 1
+    while col > 0:
+        if col == 6:
+            col -= 1  # the vertical timing pattern is skipped
+        for row in (range(n - 1, -1, -1) if upward else range(n)):
+            for c in (col, col - 1):
+                if not func[row, c]:
+                    rows.append(row)
+                    cols.append(c)
+        upward = not upward
+        col -= 2
+    return np.array(rows), np.array(cols)
+
+@functools.lru_cache(maxsize=None)
+def finder_map(version: int) -> np.ndarray:
+    n = 17 + 4 * version
+    f = np.zeros((n, n), dtype=bool)
+    f[:7, :7] = f[:7, n - 7:] = f[n - 7:, :7] = True
+    return f
+
+@functools.lru_cache(maxsize=None)
+def codeword_blocks(version: int, ec: str):
+    """Block index of every codeword in transmission order, and (data, total) per block."""
+    level = {v: k for k, v in EC_LEVELS.items()}[ec]
+    blocks = [(b.data_count, b.total_count) for b in qrcode.base.rs_blocks(version, level)]
+    owner = []
+    for i in range(max(d for d, _ in blocks)):
+        owner.extend(b for b, (d, _) in enumerate(blocks) if i < d)
+    for i in range(max(t - d for d, t in blocks)):
+        owner.extend(b for b, (d, t) in enumerate(blocks) if i < t - d)
+    return np.array(owner), blocks
+
+def correctable(version: int, ec: str, data: int, total: int) -> int:
+    return (total - data - MISDECODE_P.get((version, ec), 0)) // 2
+
+# -------------------------
+# Reading a clean PNG
+# -------------------------
+def _locate(dark: np.ndarray):
+    """(x0, y0, module size in px, modules per side) of the symbol in a clean image."""
+    ys, xs = np.nonzero(dark)
+    if not len(xs):
+        raise ValueError("no dark modules found")
+    x0, x1, y0 = xs.min(), xs.max(), ys.min()
+    run = 0
+    while x0 + run <= x1 and dark[y0, x0 + run]:
+        run += 1
+    approx = (x1 - x0 + 1) / (run / 7.0)
+    n = int(round((approx - 17) / 4.0)) * 4 + 17  # sides are 17 + 4 * version
+    if not 21 <= n <= 177:
+        raise ValueError(f"not a QR code symbol ({approx:.1f} modules across)")
+    return x0, y0, (x1 - x0 + 1) / n, n
+
+def _sample(gray: np.ndarray, x0: float, y0: float, module: float, n: int) -> np.ndarray:
+    """Grey level at each module centre (bilinear)."""
+    centres = (np.arange(n) + 0.5) * module
+    xs = np.clip(x0 + centres - 0.5, 0, gray.shape[1] - 1)
+    ys = np.clip(y0 + centres - 0.5, 0, gray.shape[0] - 1)
+    xi, yi = np.minimum(xs.astype(int), gray.shape[1] - 2), np.minimum(ys.astype(int), gray.shape[0] - 2)
+    xf, yf = (xs - xi)[None, :], (ys - yi)[:, None]
+    g = gray.astype(np.float32)
+    top = g[np.ix_(yi, xi)] * (1 - xf) + g[np.ix_(yi, xi + 1)] * xf
+    bottom = g[np.ix_(yi + 1, xi)] * (1 - xf) + g[np.ix_(yi + 1, xi + 1)] * xf
+    return top * (1 - yf) + bottom * yf
+
+def _format_info(matrix: np.ndarray):
+    """(ec level, mask) from the format bits next to the top-left finder."""
+    n = len(matrix)
+    bits = 0
+    for i in range(15):
+        row = i if i < 6 else i + 1 if i < 8 else n - 15 + i
+        bits |= int(matrix[row, 8]) << i
+    best = min(((bin(bits ^ qrcode.util.BCH_type_info((ec << 3) | mask)).count("1"), ec, mask)
+                for ec in EC_LEVELS for mask in range(8)))
+    if best[0] > 3:
+        raise ValueError("format information unreadable")
+    return EC_LEVELS[best[1]], best[2]
+
+def _codewords(matrix: np.ndarray, version: int, mask: int) -> np.ndarray:
+    rows, cols = data_order(version)
+    mask_fn = qrcode.util.mask_func(mask)
+    bits = matrix[rows, cols] ^ np.array([mask_fn(r, c) for r, c in zip(rows, cols)], dtype=bool)
+    bits = bits[:len(bits) // 8 * 8].reshape(-1, 8)
+    return np.packbits(bits, axis=1).ravel()
+
+def _parse_segments(data: bytes, version: int):
+    """Payload bytes and ECI designator (or None) from the data codewords."""
+    bits = "".join(f"{b:08b}" for b in data)
+    group = 0 if version < 10 else 1 if version < 27 else 2
+    pos, out, eci = 0, bytearray(), None
+
+    def take(k):
+        nonlocal pos
+        v = int(bits[pos:pos + k] or "0", 2)
+        pos += k
+        return v
+    while pos + 4 <= len(bits):
+        mode = take(4)
+        if mode == 0:
+            break
+        if mode == 0b0111:  # ECI
+            first = take(8)
+            eci = first if first < 0x80 else ((first & 0x3F) << 8 | take(8)) if first < 0xC0 else \
+                ((first & 0x1F) << 16 | take(16))
+        elif mode == 0b0001:  # numeric
+            count = take((10, 12, 14)[group])
+            digits = ""
+            while len(digits) < count:
+                k = min(3, count - len(digits))
+                digits += str(take((4, 7, 10)[k - 1])).zfill(k)
+            out += digits.encode("ascii")
+        elif mode == 0b0010:  # alphanumeric
+            count = take((9, 11, 13)[group])
+            for _ in range(count // 2):
+                v = take(11)
+                out += (ALNUM[v // 45] + ALNUM[v % 45]).encode("ascii")
+            if count % 2:
+                out += ALNUM[take(6)].encode("ascii")
+        elif mode == 0b0100:  # byte
+            count = take((8, 16, 16)[group])
+            out += bytes(take(8) for _ in range(count))
+        else:
+            raise ValueError(f"unsupported segment mode {mode:04b}")
+    return bytes(out), eci
+
+def read_symbol(img: Image.Image) -> Symbol:
+    """Decode a clean, axis-aligned QR image into its module matrix and payload bytes."""
+    gray = np.asarray(img.convert("L"))
+    x0, y0, module, n = _locate(gray < 128)
+    matrix = _sample(gray, x0, y0, module, n) < 128
+    version = (n - 17) // 4
+    ec, mask = _format_info(matrix)
+    words = _codewords(matrix, version, mask)
+    owner, blocks = codeword_blocks(version, ec)
+    words = words[:len(owner)]
+    # a block's data codewords precede its EC codewords in transmission order
+    data = b"".join(bytes(words[owner == b][:d]) for b, (d, _) in enumerate(blocks))
+    payload, eci = _parse_segments(data, version)
+    quiet = float(min(x0, y0) / module)
+    return Symbol(matrix, version, ec, mask, payload, eci, x0, y0, module, quiet)
+
+def payload_matches(symbol: Symbol, payload: str):
+    """(ok, charset) -- how a reader turns the bytes back into `payload`, if it can."""
+    declared = {3: "latin-1", 20: "shift_jis", 26: "utf-8"}.get(symbol.eci)
+    for charset in ([declared] if declared else ["latin-1", "utf-8", "shift_jis"]):
+        try:
+            if symbol.payload.decode(charset) == payload:
+                return True, charset
+        except UnicodeDecodeError:
+            pass
+    return False, None
+
+# -------------------------
+# Simulated print + re-read
+# -------------------------
+def degrade(img: Image.Image, size_mm: float, profile: Degradation, seed: int):
+    """(grey levels, px per source px) of the image printed `size_mm` wide under `profile`."""
+    px = max(8, int(round(size_mm / 25.4 * profile.dpi)))
+    scale = px / img.width
+    printed = img.convert("L").resize((px, max(8, int(round(img.height * scale)))), Image.BOX)
+    if profile.blur:
+        printed = printed.filter(ImageFilter.GaussianBlur(profile.blur))
+    lo, hi = profile.contrast
+    g = lo + np.asarray(printed, dtype=np.float32) * ((hi - lo) / 255.0)
+    if profile.noise:
+        g += np.random.default_rng(seed).normal(0.0, profile.noise, g.shape)
+    return np.clip(g, 0, 255), scale
+
+def reads_at(img: Image.Image, symbol: Symbol, size_mm: float, profile: Degradation, seed: int,
+             expected: bytes = None) -> bool:
+    gray, scale = degrade(img, size_mm, profile, seed)
+    n = len(symbol.matrix)
+    lo, hi = np.percentile(gray, (5, 95))
+    seen = _sample(gray, symbol.x0 * scale, symbol.y0 * scale, symbol.module * scale, n) < (lo + hi) / 2
+    wrong = seen != symbol.matrix
+    finder = finder_map(symbol.version)
+    if wrong[finder].mean() > FINDER_TOLERANCE:
+        return False
+    try:
+        if _format_info(seen) != (symbol.ec, symbol.mask):
+            return False
+    except ValueError:
+        return False
+    rows, cols = data_order(symbol.version)
+    owner, blocks = codeword_blocks(symbol.version, symbol.ec)
+    flips = wrong[rows, cols][:len(owner) * 8].reshape(-1, 8).any(axis=1)
+    for b, (d, t) in enumerate(blocks):
+        if flips[owner == b].sum() > correctable(symbol.version, symbol.ec, d, t):
+            return False
+    if DECODER and expected is not None:
+        return _external_decode(gray) == expected
+    return True
+
+def _external_decode(gray: np.ndarray):
+    """Payload bytes read by the installed decoder (camera ~4 px per printed dot), or None."""
+    img = Image.fromarray(gray.astype(np.uint8))
+    if img.width < 600:
+        f = -(-600 // img.width)
+        img = img.resize((img.width * f, img.height * f), Image.BILINEAR)
+    if DECODER == "zxing-cpp":
+        found = zxingcpp.read_barcodes(img)
+        return found[0].bytes if found else None
+    found = pyzbar.decode(img)
+    return found[0].data if found else None
+
+# -------------------------
+# Artifact set
+# -------------------------
+def qr_jobs(locales=None, only=None):
+    """(name, spec, payload) for every QR the project ships; spec says how to render it."""
+    import i18n_catalog
+    from aquashield_filters import FILTER_KEYS, FILTER_URLS, OFFLINE_QR_PAYLOADS, QR_LINK_TARGETS
+    locales = locales or i18n_catalog.available_locales()
+    jobs = []
+    for loc in locales:
+        for key in FILTER_KEYS:
+            card = i18n_catalog.filter_text(key, "card", loc, i18n_catalog.t("ui.short_unavailable", loc))
+            jobs.append((f"offline {loc} {key}", ("qr", card.strip()), card.strip()))
+            jobs.append((f"card {loc} {key}", ("card", key, i18n_catalog.filter_text(key, "card", loc)),
+                         i18n_catalog.filter_text(key, "card", loc)))
+    for key in FILTER_KEYS:
+        url = FILTER_URLS.get(key, "https://example.org/AquaShield/")
+        jobs.append((f"online {key}", ("qr", url), url))
+    for prefix, payloads in (("text_qr_library", OFFLINE_QR_PAYLOADS), ("Qr_link_generator", QR_LINK_TARGETS)):
+        for name, payload in payloads.items():
+            jobs.append((f"{prefix} {name}", ("segno", payload), payload))
+    if only:
+        jobs = [j for j in jobs if j[1][0] == only or j[0].split(" ")[0] == only]
+    return jobs
+
+def _render(spec):
+    """(image holding just the QR, its intended print width in mm or None)."""
+    import artifact_store
+    import aquashield_render as render
+    if spec[0] == "qr":
+        png = artifact_store.cached_bytes(*render.qr_png_artifact(spec[1]))
+        return Image.open(io.BytesIO(png)), None
+    if spec[0] == "card":
+        _, key, text = spec
+        png = artifact_store.cached_bytes(*render.card_png_artifact(key, text))
+        card = Image.open(io.BytesIO(png))
+        x, y, side = render.card_qr_box(size=card.size)
+        # the card PDF scales the card PNG to the A5 width inside its margins
+        mm_per_px = (148 - 2 * render.CARD_PDF_MARGIN) / card.width
+        return card.crop((x, y, x + side, y + side)), round(side * mm_per_px, 1)
+    png = artifact_store.cached_bytes(*render.segno_qr_artifact(spec[1], "png", scale=10))  # as the QR pages do
+    return Image.open(io.BytesIO(png)), None
+
+def verify(job, profile_name: str = DEFAULT_PROFILE, sizes=SIZES_MM, trials: int = TRIALS) -> dict:
+    """Decode one code clean, then shrink it under the profile until it stops reading."""
+    name, spec, payload = job
+    profile = PROFILES[profile_name]
+    result = {"name": name, "kind": spec[0], "ok": False, "min_mm": None, "print_mm": None, "error": None}
+    try:
+        img, result["print_mm"] = _render(spec)
+        symbol = read_symbol(img)
+    except Exception as e:
+        result["error"] = f"clean decode failed: {e}"
+        return result
+    matched, charset = payload_matches(symbol, payload)
+    result.update(version=symbol.version, ec=symbol.ec, modules=len(symbol.matrix), bytes=len(symbol.payload),
+                  charset=charset, eci=symbol.eci)
+    if not matched:
+        result["error"] = "payload mismatch"
+        return result
+    if charset != "latin-1" and symbol.eci is None:
+        # the spec's default is ISO-8859-1; other charsets rely on the reader guessing
+        result["warning"] = f"{charset} without ECI: readers that don't guess the charset show mojibake"
+    expected = symbol.payload
+
+    def reads(size):
+        return all(reads_at(img, symbol, size, profile, seed, expected) for seed in range(trials))
+    # readability only improves with size, so bisect for the smallest size that reads
+    sizes = sorted(sizes)
+    lo, hi = 0, len(sizes) - 1
+    if reads(sizes[hi]):
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if reads(sizes[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        result["min_mm"] = sizes[hi]
+    if result["min_mm"] is None:
+        result["error"] = f"unreadable at {max(sizes)} mm"
+    elif result["print_mm"] is not None and result["print_mm"] < result["min_mm"]:
+        result["error"] = f"printed at {result['print_mm']} mm, needs {result['min_mm']} mm"
+    else:
+        result["ok"] = True
+    if result["min_mm"] is not None:
+        result["module_mm"] = round(result["min_mm"] / (len(symbol.matrix) + 2 * symbol.quiet), 2)
+    return result
+
+def verify_all(jobs, profile_name: str = DEFAULT_PROFILE, workers: int = None):
+    """verify() for every job across processes; results keep the job order."""
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(functools.partial(verify, profile_name=profile_name), jobs, chunksize=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode every generated QR code and find its smallest readable print size.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--locales", nargs="+", help="default: every locale in locales/")
+    parser.add_argument("--only", help="job kind or prefix: offline, online, card, segno, text_qr_library, ...")
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--json", help="also write the full report here")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    jobs = qr_jobs(args.locales, args.only)
+    results = verify_all(jobs, args.profile, args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"{'':2} {'min mm':>6} {'print':>6} {'ver':>4} {'bytes':>5}  name")
+    for r in results:
+        mark = "ok" if r["ok"] else "!!"
+        print(f"{mark:2} {r['min_mm'] or '-':>6} {r['print_mm'] or '':>6} {r.get('version', '-'):>4} "
+              f"{r.get('bytes', '-'):>5}  {r['name']}" + (f"  [{r['error']}]" if r["error"] else ""))
+    failed = [r for r in results if not r["ok"]]
+    warned = [r for r in results if r.get("warning")]
+    print(f"{len(results)} codes, {len(failed)} failed, {len(warned)} warnings; profile {args.profile}, "
+          f"decoder {DECODER or 'built-in grid reader'}; {elapsed:.1f}s")
+    for r in warned:
+        print(f"  {r['name']}: {r['warning']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"profile": args.profile, "decoder": DECODER, "seconds": round(elapsed, 2),
+                       "results": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
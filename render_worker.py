@@ -0,0 +1,339 @@
+# render_worker.py
+# Out-of-process render workers shared by every app replica on a host. With
+# AQUASHIELD_RENDER_QUEUE pointing at a SQLite file, replicas stop rendering
+# PDFs, QR codes, schematics and cards themselves: artifact_store hands each
+# missing artifact's parts to the queue and waits for the key to appear in the
+# shared artifact store (same AQUASHIELD_CACHE_DIR), which a pool of worker
+# processes fills. Render capacity then scales with `serve --processes N`,
+# independently of how many UI replicas run.
+#
+# Jobs are keyed by artifact key, so a render requested by ten sessions on
+# three replicas is queued and built once. Claims carry a lease; a worker that
+# dies mid-render has its job picked up again when the lease runs out, and a
+# job that keeps failing is marked failed after MAX_ATTEMPTS. When no worker
+# has sent a heartbeat recently, or one doesn't finish within WAIT, the replica
+# renders in-process instead, so a stopped worker pool degrades to the old
+# behaviour rather than to errors.
+#
+#   AQUASHIELD_RENDER_QUEUE=/srv/aquashield/render_queue.sqlite3
+#   python render_worker.py serve --processes 4   # the worker pool
+#   python render_worker.py warm                  # queue every artifact the apps serve
+#   python render_worker.py status
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import artifact_store
+import aquashield_render as render
+
+QUEUE_PATH = os.environ.get("AQUASHIELD_RENDER_QUEUE")
+LEASE = 120.0         # seconds a claimed job stays with its worker
+MAX_ATTEMPTS = 3
+HEARTBEAT_TTL = 15.0  # a worker silent for longer counts as gone
+WAIT = float(os.environ.get("AQUASHIELD_RENDER_WAIT", "60"))  # then the replica renders itself
+POLL = 0.05           # replica's poll interval while waiting for a result
+IDLE = 0.2            # worker's poll interval on an empty queue
+PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND = 10, 0
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    parts TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    enqueued REAL NOT NULL,
+    finished REAL,
+    digest TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs(state, priority DESC, enqueued);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    heartbeat REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# -------------------------
+# Queue backend
+# -------------------------
+class SqliteQueue:
+    """Render job queue in one SQLite file (WAL), shared by replicas and workers.
+
+    Another backend only needs the same methods: enqueue, claim, complete,
+    fail, state, heartbeat, workers_alive, stats.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA_SQL)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, jobs, priority: int = PRIORITY_BACKGROUND) -> int:
+        """Queue (key, parts) pairs; finished or failed jobs are queued again. Returns rows changed."""
+        now = time.time()
+        rows = [(key, json.dumps(list(parts)), priority, now) for key, parts in jobs]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.executemany(
+                "INSERT INTO jobs (key, parts, priority, enqueued) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "  priority = max(priority, excluded.priority), "
+                "  state = CASE WHEN state IN ('done', 'failed') THEN 'pending' ELSE state END, "
+                "  attempts = CASE WHEN state IN ('done', 'failed') THEN 0 ELSE attempts END, "
+                "  enqueued = CASE WHEN state IN ('done', 'failed') THEN excluded.enqueued ELSE enqueued END",
+                rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def claim(self, worker: str, lease: float = LEASE):
+        """Oldest highest-priority job (or one whose lease expired) as (key, parts), or None."""
+        now = time.time()
+        row = self._conn().execute(
+            "UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+            "WHERE key = (SELECT key FROM jobs WHERE state = 'pending' "
+            "             OR (state = 'running' AND lease_until < ?) "
+            "             ORDER BY priority DESC, enqueued LIMIT 1) "
+            "RETURNING key, parts, attempts", (worker, now + lease, now)).fetchone()
+        if row is None:
+            return None
+        key, parts, attempts = row
+        if attempts > MAX_ATTEMPTS:
+            self.fail(key, "gave up: workers kept dying on this job", retry=False)
+            return self.claim(worker, lease)
+        return key, json.loads(parts)
+
+    def complete(self, key: str, digest: str, worker: str = None):
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET state = 'done', digest = ?, finished = ?, error = NULL WHERE key = ?",
+                     (digest, time.time(), key))
+        if worker:
+            conn.execute("UPDATE workers SET done = done + 1 WHERE id = ?", (worker,))
+
+    def fail(self, key: str, error: str, worker: str = None, retry: bool = True):
+        """Back to pending while attempts remain (if `retry`), else failed."""
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET error = ?, finished = ?, "
+            "state = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END WHERE key = ?",
+            (error[:500], time.time(), int(retry), MAX_ATTEMPTS, key))
+        if worker:
+            conn.execute("UPDATE workers SET failed = failed + 1 WHERE id = ?", (worker,))
+
+    def state(self, key: str):
+        """(state, error) of a job, or (None, None) if it was never queued."""
+        row = self._conn().execute("SELECT state, error FROM jobs WHERE key = ?", (key,)).fetchone()
+        return row if row else (None, None)
+
+    def heartbeat(self, worker: str):
+        self._conn().execute(
+            "INSERT INTO workers (id, host, pid, heartbeat) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (worker, socket.gethostname(), os.getpid(), time.time()))
+
+    def workers_alive(self) -> int:
+        return self._conn().execute("SELECT count(*) FROM workers WHERE heartbeat > ?",
+                                    (time.time() - HEARTBEAT_TTL,)).fetchone()[0]
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        states = dict(conn.execute("SELECT state, count(*) FROM jobs GROUP BY state").fetchall())
+        workers = [dict(zip(("id", "host", "pid", "age_s", "done", "failed"), row)) for row in conn.execute(
+            "SELECT id, host, pid, round(? - heartbeat, 1), done, failed FROM workers "
+            "WHERE heartbeat > ? ORDER BY id", (time.time(), time.time() - HEARTBEAT_TTL))]
+        return {"jobs": states, "workers": workers}
+
+# -------------------------
+# Replica side: artifact_store delegate
+# -------------------------
+class RemoteRenderer:
+    """Builders that queue the render and wait for a worker to store the result."""
+
+    def __init__(self, queue: SqliteQueue, wait: float = WAIT):
+        self.queue = queue
+        self.wait = wait
+        self.remote = self.local = 0
+
+    @staticmethod
+    def _rebuildable(parts) -> bool:
+        try:
+            return render.artifact_from_parts(parts) is not None
+        except (ValueError, OSError):
+            return False
+
+    def builder(self, parts, fallback):
+        if not self._rebuildable(parts):
+            return fallback
+        key = artifact_store.artifact_key(*parts)
+
+        def build():
+            if not self.queue.workers_alive():
+                self.local += 1
+                return fallback()
+            self.queue.enqueue([(key, parts)], PRIORITY_INTERACTIVE)
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                digest = artifact_store.STORE.lookup(key)
+                if digest is not None:
+                    self.remote += 1
+                    return artifact_store.STORE.get(digest)
+                state, _error = self.queue.state(key)
+                if state == "failed":
+                    # e.g. a worker on another RENDER_VERSION mid-deploy: render here instead
+                    break
+                time.sleep(POLL)
+            # the pool failed the job, is overloaded or stuck: render here rather than fail the click
+            self.local += 1
+            return fallback()
+        return build
+
+    def prefetch(self, parts_list):
+        jobs = []
+        for parts in parts_list:
+            key = artifact_store.artifact_key(*parts)
+            if self._rebuildable(parts) and artifact_store.STORE.lookup(key) is None:
+                jobs.append((key, parts))
+        if jobs and self.queue.workers_alive():
+            self.queue.enqueue(jobs, PRIORITY_BACKGROUND)
+
+_attached = None
+
+def attach(path: str = QUEUE_PATH):
+    """Send this process's renders to the worker pool when a queue is configured; idempotent."""
+    global _attached
+    if _attached is None and path:
+        _attached = RemoteRenderer(SqliteQueue(path))
+        artifact_store.set_delegate(_attached)
+    return _attached
+
+# -------------------------
+# Worker side
+# -------------------------
+class Worker:
+    def __init__(self, queue: SqliteQueue, worker_id: str = None):
+        self.queue = queue
+        self.id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._last_beat = 0.0
+
+    def _beat(self):
+        now = time.monotonic()
+        if now - self._last_beat >= HEARTBEAT_TTL / 3:
+            self.queue.heartbeat(self.id)
+            self._last_beat = now
+
+    def run_one(self) -> bool:
+        """Claim and render one job; False when the queue is empty."""
+        self._beat()
+        job = self.queue.claim(self.id)
+        if job is None:
+            return False
+        key, parts = job
+        try:
+            rebuilt = render.artifact_from_parts(parts)
+            if rebuilt is None:
+                raise ValueError(f"no renderer for {parts[0]!r}")
+            if artifact_store.artifact_key(*rebuilt[0]) != key:
+                raise ValueError("inputs changed since the job was queued")
+            digest = artifact_store.STORE.digest_for(key, rebuilt[1])
+        except Exception as e:
+            self.queue.fail(key, f"{type(e).__name__}: {e}", self.id,
+                            retry=not isinstance(e, ValueError))
+            return True
+        self.queue.complete(key, digest, self.id)
+        return True
+
+    def run(self, stop: threading.Event = None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if not self.run_one():
+                stop.wait(IDLE)
+
+def _serve_one(path: str):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # not the pool's handler, inherited on fork
+    try:
+        Worker(SqliteQueue(path)).run()
+    except KeyboardInterrupt:
+        pass
+
+def _stop_on_sigterm(signum, frame):
+    raise SystemExit(0)
+
+def serve(path: str, processes: int):
+    """Run `processes` worker processes until interrupted or sent SIGTERM; stops them on the way out."""
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    procs = [multiprocessing.Process(target=_serve_one, args=(path,), name=f"render-worker-{i}", daemon=True)
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    try:
+        while True:
+            for i, p in enumerate(procs):
+                if not p.is_alive():
+                    # a crashed worker's job comes back when its lease expires; replace the process
+                    procs[i] = multiprocessing.Process(target=_serve_one, args=(path,), name=p.name, daemon=True)
+                    procs[i].start()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # a claimed job comes back to the queue when its lease runs out
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join(5)
+            if p.is_alive():
+                p.kill()
+                p.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AquaShield render worker pool and queue tools.")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="SQLite queue file (default: $AQUASHIELD_RENDER_QUEUE)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve", help="run worker processes")
+    p_serve.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    p_warm = sub.add_parser("warm", help="queue every artifact the apps serve (warmup.py's list)")
+    p_warm.add_argument("--locales", nargs="+")
+    sub.add_parser("status", help="job counts and live workers")
+    args = parser.parse_args()
+    if not args.queue:
+        parser.error("set AQUASHIELD_RENDER_QUEUE or pass --queue")
+
+    if args.cmd == "serve":
+        print(f"{args.processes} render workers on {args.queue} -> {artifact_store.ARTIFACT_DIR}", file=sys.stderr)
+        serve(args.queue, args.processes)
+    elif args.cmd == "warm":
+        import warmup
+        q = SqliteQueue(args.queue)
+        jobs = [(artifact_store.artifact_key(*parts), parts) for _, parts, _ in warmup.warmup_tasks(args.locales)
+                if RemoteRenderer._rebuildable(parts)]
+        print(f"queued {q.enqueue(jobs)} of {len(jobs)} artifacts")
+    else:
+        print(json.dumps(SqliteQueue(args.queue).stats(), indent=2))
@@ -0,0 +1,132 @@
+# reproducible.py
+# Byte-reproducible PDFs and ZIPs. FPDF stamps every file with the wall-clock
+# /CreationDate and zipfile stamps every member with the current time (or the
+# source file's mtime), so the same input used to give different bytes on every
+# build -- which defeats ETags, content-hash dedup and delta sync of bundles.
+# Every renderer writes through pdf_bytes() / zip_writestr() / zip_write()
+# instead: one fixed timestamp (SOURCE_DATE_EPOCH when set, else 1980-01-01, the
+# earliest a ZIP can hold), fixed member permissions, and members in the order
+# the caller gives (callers pass sorted or fixed-order items). PNG (Pillow,
+# qrcode, segno) and SVG output carry no timestamps and need nothing.
+# AQUASHIELD_REPRODUCIBLE=0 restores wall-clock timestamps.
+#
+#   python reproducible.py check       # rebuild the whole catalog twice, compare hashes
+#   python reproducible.py hashes      # sha256 of every catalog entry, one build
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+
+ENABLED = os.environ.get("AQUASHIELD_REPRODUCIBLE", "1") != "0"
+EPOCH = max(int(os.environ.get("SOURCE_DATE_EPOCH", "315532800")), 315532800)  # not before 1980-01-01
+STAMP = datetime.fromtimestamp(EPOCH, timezone.utc)
+ZIP_DATE_TIME = STAMP.timetuple()[:6]
+FILE_MODE = 0o644
+_CREATION_DATE = re.compile(r"/CreationDate \(D:\d{14}\)")
+
+# -------------------------
+# PDF
+# -------------------------
+def pdf_bytes(pdf) -> bytes:
+    """FPDF document as bytes, with /CreationDate pinned to EPOCH.
+
+    The stamp has the same length as the one FPDF wrote, so the xref offsets stay valid.
+    """
+    out = pdf.output(dest="S")
+    if ENABLED:
+        out = _CREATION_DATE.sub(f"/CreationDate (D:{STAMP:%Y%m%d%H%M%S})", out, count=1)
+    return out.encode("latin-1")
+
+# -------------------------
+# ZIP
+# -------------------------
+def zip_writestr(zf, arcname: str, data):
+    """zf.writestr() with a fixed timestamp and permissions, in the archive's compression."""
+    if not ENABLED:
+        zf.writestr(arcname, data)
+        return
+    info = zipfile.ZipInfo(arcname, date_time=ZIP_DATE_TIME)
+    info.compress_type = zf.compression
+    info.external_attr = FILE_MODE << 16
+    zf.writestr(info, data)
+
+def zip_write(zf, path: str, arcname: str):
+    """zf.write() without the file's mtime and mode."""
+    with open(path, "rb") as f:
+        zip_writestr(zf, arcname, f.read())
+
+# -------------------------
+# Whole-catalog check
+# -------------------------
+def _data(value) -> bytes:
+    if isinstance(value, io.BytesIO):
+        return value.getvalue()
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+def catalog():
+    """(name, builder) for every file the apps and tools hand out, rendered from scratch."""
+    import aquashield_render as render
+    import export_jobs
+    import icon_cards
+    import svg_optimize
+    import warmup
+    from aquashield_filters import FILTER_SVGS
+
+    items = [(name, builder) for name, _parts, builder in warmup.warmup_tasks()]
+    items.append(("svg zip", lambda: svg_optimize.build_svg_zip(FILTER_SVGS)))
+    for key in icon_cards.FILTER_KEYS:
+        items.append((f"icon card pdf {key}", lambda key=key: icon_cards.card_pdf(key)))
+    items.append(("icon cards zip", lambda: icon_cards.build_cards_zip(dpis=(150,))))
+    for export, params in (("card_pdfs", {"locale": "en"}), ("printed_cards", {"locale": "es"}), ("all_languages", {})):
+        def build(export=export, params=params):
+            members = {path: io.BytesIO(_data(builder())) for path, _parts, builder in export_jobs.EXPORTS[export][2](**params)}
+            return render.build_pdfs_zip(members)
+        items.append((f"export {export_jobs.export_file_name(export, params)}", build))
+    return items
+
+def catalog_hashes() -> dict:
+    return {name: hashlib.sha256(_data(builder())).hexdigest() for name, builder in catalog()}
+
+def _hashes_in_fresh_process() -> dict:
+    """One full build in a new interpreter with an empty cache, so nothing is reused."""
+    with tempfile.TemporaryDirectory(prefix="aquashield_repro_") as cache:
+        env = dict(os.environ, AQUASHIELD_CACHE_DIR=cache, AQUASHIELD_WARMUP="0")
+        env.pop("AQUASHIELD_RENDER_QUEUE", None)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "hashes", "--json"], env=env,
+                             check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that every renderer gives byte-identical output.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_hashes = sub.add_parser("hashes", help="build the catalog once and print sha256 per entry")
+    p_hashes.add_argument("--json", action="store_true")
+    sub.add_parser("check", help="build the catalog twice in fresh processes; exit 1 on any difference")
+    args = parser.parse_args()
+
+    if args.cmd == "hashes":
+        hashes = catalog_hashes()
+        if args.json:
+            print(json.dumps(hashes))
+        else:
+            for name, digest in hashes.items():
+                print(f"{digest[:16]}  {name}")
+        sys.exit(0)
+    t0 = time.perf_counter()
+    first = _hashes_in_fresh_process()
+    time.sleep(2)  # a ZIP timestamp has 2 s resolution; make sure the clock has moved on
+    second = _hashes_in_fresh_process()
+    differ = sorted(name for name in first.keys() | second.keys() if first.get(name) != second.get(name))
+    for name in differ:
+        print(f"differs: {name}")
+    print(f"{len(first)} catalog entries built twice in {time.perf_counter() - t0:.1f}s: "
+          + (f"{len(differ)} differ" if differ else "all byte-identical"))
+    sys.exit(1 if differ else 0)
@@ -0,0 +1,286 @@
+# search_index.py
+# Accent- and case-insensitive full-text search over all EN/ES instructions:
+# documentation/ (Markdown guides, SMS sheets, icon cards) and the locales/ catalogs.
+# The inverted index is built once and stored as zlib-compressed JSON
+# (.aquashield_cache/search/search_index.json.z); the same file ships in the
+# offline ZIP bundles and can be opened with load_index(path).
+import argparse
+import bisect
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+
+import i18n_catalog
+import markdown_pdf
+import reproducible
+import sms_compiler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.join(BASE_DIR, "documentation")
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+INDEX_NAME = "search_index.json.z"
+INDEX_PATH = os.path.join(CACHE_DIR, "search", INDEX_NAME)
+INDEX_VERSION = 1
+SNIPPET_CHARS = 240
+
+_lock = threading.Lock()
+_index = None
+
+# -------------------------
+# Normalization
+# -------------------------
+_TOKEN = re.compile(r"\w+")
+
+def fold(text: str) -> str:
+    """'Carbón' -> 'carbon': strip accents (NFKD) and case-fold."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+def tokenize(text: str):
+    return _TOKEN.findall(fold(text))
+
+# -------------------------
+# Collecting documents
+# -------------------------
+# A document is {"source", "lang", "title", "text"}; Markdown guides are split
+# into one document per h1/h2 section so hits point at the relevant part.
+def _lang_for(path: str) -> str:
+    return "es" if os.sep + "Spanish" + os.sep in path else "en"
+
+def _block_text(block) -> str:
+    if block[0] == "h":
+        return "".join(t for t, _ in block[2])
+    if block[0] == "p":
+        return "".join(t for t, _ in block[1])
+    if block[0] == "li":
+        return "".join(t for t, _ in block[3])
+    if block[0] == "code":
+        return "\n".join(block[1])
+    return ""
+
+def _markdown_docs(path: str):
+    _, blocks = markdown_pdf.parse_file(path)
+    rel = os.path.relpath(path, BASE_DIR)
+    doc_title = markdown_pdf._doc_title(blocks)
+    for section in markdown_pdf.split_sections(blocks):
+        lines = [_block_text(b) for b in section]
+        heading = lines[0] if section[0][0] == "h" else doc_title
+        title = doc_title if heading == doc_title else f"{doc_title} — {heading}"
+        yield {"source": rel, "lang": _lang_for(path), "title": title, "text": "\n".join(l for l in lines if l)}
+
+def _text_docs(path: str, lang: str = "en"):
+    """Plain-text sheets: one document per blank-line separated paragraph."""
+    with open(path, encoding="utf-8") as f:
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", f.read()) if p.strip()]
+    rel = os.path.relpath(path, BASE_DIR)
+    heading = paragraphs[0].splitlines()[0] if paragraphs else rel
+    for p in paragraphs[1:]:
+        yield {"source": rel, "lang": lang, "title": f"{heading} — {p.splitlines()[0]}", "text": p}
+
+def _sms_docs():
+    rel = os.path.relpath(sms_compiler.SMS_SOURCES["crisis_sms"], BASE_DIR)
+    for m in sms_compiler.parse_crisis_sms():
+        yield {"source": rel, "lang": m["lang"], "title": f"SMS — {m['name']}", "text": m["text"]}
+
+def _catalog_docs():
+    for loc in i18n_catalog.available_locales():
+        messages = i18n_catalog.load_source(loc)
+        for key, text in messages.items():
+            if not key.startswith("filter.") or key.endswith(".title"):
+                continue
+            letter = key.split(".")[1]
+            title = messages.get(f"filter.{letter}.title") or f"Filter {letter}"
+            yield {"source": f"locales/{loc}.json:{key}", "lang": loc, "title": title, "text": text}
+
+def source_files():
+    """Every file the index is built from (used for the staleness fingerprint)."""
+    files = []
+    for root, _, names in os.walk(DOCS_DIR):
+        files += [os.path.join(root, n) for n in names]
+    files += [os.path.join(i18n_catalog.LOCALES_DIR, f"{loc}.json") for loc in i18n_catalog.available_locales()]
+    return sorted(f for f in files if os.path.isfile(f))
+
+def sources_fingerprint() -> str:
+    h = hashlib.sha256(f"v{INDEX_VERSION}".encode())
+    for path in source_files():
+        h.update(os.path.relpath(path, BASE_DIR).encode() + b"\0")
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+def collect_documents():
+    docs = []
+    for path in markdown_pdf.documentation_files():
+        docs += _markdown_docs(path)
+    docs += _text_docs(sms_compiler.SMS_SOURCES["water_filter_sms"])
+    docs += _text_docs(os.path.join(DOCS_DIR, "english", "icon_cards.txt"))
+    docs += _sms_docs()
+    docs += _catalog_docs()
+    return docs
+
+# -------------------------
+# Build / serialize
+# -------------------------
+# On disk: {"version", "fingerprint", "docs": [[source, lang, title, snippet, length]],
+#           "terms": [sorted folded terms], "postings": [[doc_delta, tf, doc_delta, tf, ...]]}
+def build_index(docs=None, fingerprint: str = None) -> dict:
+    docs = collect_documents() if docs is None else docs
+    postings = {}
+    records = []
+    for doc_id, d in enumerate(docs):
+        tokens = tokenize(d["title"] + "\n" + d["text"])
+        counts = {}
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, tf in counts.items():
+            postings.setdefault(tok, []).append((doc_id, tf))
+        snippet = re.sub(r"\s+", " ", d["text"]).strip()[:SNIPPET_CHARS]
+        records.append([d["source"], d["lang"], d["title"], snippet, len(tokens)])
+    terms = sorted(postings)
+    packed = []
+    for term in terms:
+        flat, prev = [], 0
+        for doc_id, tf in postings[term]:
+            flat += [doc_id - prev, tf]
+            prev = doc_id
+        packed.append(flat)
+    return {"version": INDEX_VERSION, "fingerprint": fingerprint, "docs": records, "terms": terms, "postings": packed}
+
+def index_bytes(index: dict) -> bytes:
+    raw = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, 9)
+
+def write_index(path: str = INDEX_PATH) -> dict:
+    index = build_index(fingerprint=sources_fingerprint())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(index_bytes(index))
+    os.replace(tmp, path)
+    return index
+
+# -------------------------
+# Loading / querying
+# -------------------------
+class SearchIndex:
+    def __init__(self, index: dict):
+        self.docs = index["docs"]
+        self.terms = index["terms"]
+        self.postings = []
+        for flat in index["postings"]:
+            decoded, doc_id = [], 0
+            for i in range(0, len(flat), 2):
+                doc_id += flat[i]
+                decoded.append((doc_id, flat[i + 1]))
+            self.postings.append(decoded)
+        n = max(len(self.docs), 1)
+        self.idf = [math.log(1 + n / len(p)) for p in self.postings]
+
+    def _prefix_range(self, prefix: str):
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo)
+        return range(lo, hi)
+
+    def search(self, query: str, limit: int = 10, lang: str = None):
+        """Docs matching every query word (each as a prefix), best first."""
+        words = tokenize(query)
+        if not words:
+            return []
+        scores = None
+        for word in dict.fromkeys(words):
+            word_scores = {}
+            for t in self._prefix_range(word):
+                # exact term beats a longer completion ("sand" over "sandpaper")
+                weight = self.idf[t] * (1.0 if self.terms[t] == word else 0.6)
+                for doc_id, tf in self.postings[t]:
+                    word_scores[doc_id] = word_scores.get(doc_id, 0.0) + weight * (1 + math.log(tf))
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {d: s + word_scores[d] for d, s in scores.items() if d in word_scores}
+            if not scores:
+                return []
+        hits = []
+        for doc_id, score in scores.items():
+            source, doc_lang, title, snippet, length = self.docs[doc_id]
+            if lang and doc_lang.split("_")[0] != lang.split("_")[0]:
+                continue
+            hits.append({"source": source, "lang": doc_lang, "title": title, "snippet": snippet,
+                         "score": round(score / math.sqrt(1 + length / 50), 4)})
+        hits.sort(key=lambda h: -h["score"])
+        return hits[:limit]
+
+def load_index(path: str = None) -> SearchIndex:
+    """Index from an explicit file (e.g. an offline bundle), or the cached one (rebuilt when stale)."""
+    global _index
+    if path is not None:
+        with open(path, "rb") as f:
+            return SearchIndex(json.loads(zlib.decompress(f.read())))
+    if _index is not None:
+        return _index
+    with _lock:
+        if _index is None:
+            fingerprint = sources_fingerprint()
+            index = None
+            if os.path.exists(INDEX_PATH):
+                with open(INDEX_PATH, "rb") as f:
+                    index = json.loads(zlib.decompress(f.read()))
+                if index.get("version") != INDEX_VERSION or index.get("fingerprint") != fingerprint:
+                    index = None
+            if index is None:
+                index = write_index()
+            _index = SearchIndex(index)
+    return _index
+
+def search(query: str, limit: int = 10, lang: str = None):
+    return load_index().search(query, limit=limit, lang=lang)
+
+def sidebar(lang: str = None, heading: str = "## Search", limit: int = 8):
+    """Sidebar search box for the app pages; only hits in `lang` when given (else EN and ES)."""
+    import streamlit as st
+    st.sidebar.markdown(heading)
+    label = "Search instructions" + ("" if lang else " (EN/ES)")
+    query = st.sidebar.text_input(label, placeholder="charcoal, carbón, bleach...", key="search_query")
+    if not query:
+        return
+    hits = search(query, limit=limit, lang=lang)
+    if not hits:
+        st.sidebar.caption("No matches.")
+    for h in hits:
+        st.sidebar.markdown(f"**{h['title']}** `{h['lang']}`  \n{h['snippet']}  \n_{h['source']}_")
+
+def add_to_zip(zf, arcname: str = INDEX_NAME):
+    """Ship the prebuilt index inside an offline bundle (zipfile.ZipFile opened for writing)."""
+    load_index()
+    reproducible.zip_write(zf, INDEX_PATH, arcname)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the AquaShield instruction search index.")
+    parser.add_argument("query", nargs="*", help="words to search for (prefixes, accents optional)")
+    parser.add_argument("--build", action="store_true", help="rebuild the index file")
+    parser.add_argument("--lang", help="only show hits in this language")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    if args.build:
+        t0 = time.perf_counter()
+        idx = write_index()
+        print(f"Indexed {len(idx['docs'])} documents, {len(idx['terms'])} terms -> {INDEX_PATH} "
+              f"({os.path.getsize(INDEX_PATH)} bytes, {time.perf_counter() - t0:.3f}s)")
+    if args.query:
+        index = load_index()
+        q = " ".join(args.query)
+        t0 = time.perf_counter()
+        hits = index.search(q, limit=args.limit, lang=args.lang)
+        elapsed = (time.perf_counter() - t0) * 1000
+        for h in hits:
+            print(f"{h['score']:>7.3f}  [{h['lang']}] {h['title']}  ({h['source']})")
+        print(f"{len(hits)} hits in {elapsed:.3f} ms", file=sys.stderr)
+    elif not args.build:
+        parser.print_help()
@@ -0,0 +1,429 @@
+# sms_broadcast.py
+# Asyncio bulk SMS broadcast for the compiled crisis instructions.
+# Token-bucket rate limit, bounded concurrency, retries with backoff, resumable
+# checkpoints and throughput metrics. Includes a local HTTP mock gateway so the
+# whole pipeline can be exercised and load-tested offline.
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+import time
+
+import sms_compiler
+
+DEFAULT_LANG = "en"
+
+# -------------------------
+# Recipients / content
+# -------------------------
+def read_recipients(csv_path: str):
+    """Read recipients from CSV with a `phone` column and optional `lang` column."""
+    recipients = []
+    seen = set()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            phone = "".join(ch for ch in (row.get("phone") or "") if ch.isdigit() or ch == "+")
+            if not phone or phone in seen:
+                continue
+            seen.add(phone)
+            lang = (row.get("lang") or DEFAULT_LANG).strip().lower()[:2] or DEFAULT_LANG
+            recipients.append({"phone": phone, "lang": lang})
+    return recipients
+
+def compile_content(source: str = "crisis_sms", max_segments: int = 6) -> dict:
+    """Packed GSM-7 SMS texts per language for one SMS source."""
+    messages = sms_compiler.load_messages()[source]
+    langs = sorted({m["lang"] for m in messages})
+    return {lang: sms_compiler.compile_language(messages, lang, max_segments=max_segments) for lang in langs}
+
+# -------------------------
+# Gateways
+# -------------------------
+class GatewayError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class Gateway:
+    """Interface for SMS gateways. Implementations return a provider message id."""
+
+    async def send(self, phone: str, text: str) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class HttpGateway(Gateway):
+    """POSTs {"to", "text"} as JSON over keep-alive HTTP/1.1 connections."""
+
+    def __init__(self, url: str, pool_size: int = 32, timeout: float = 10.0, token: str = None):
+        if not url.startswith("http://"):
+            raise ValueError("HttpGateway only speaks plain http://; terminate TLS in a local proxy")
+        hostport, _, path = url[len("http://"):].partition("/")
+        host, _, port = hostport.partition(":")
+        self.host, self.port, self.path = host, int(port or 80), "/" + path
+        self.timeout = timeout
+        self.token = token
+        self._pool = asyncio.LifoQueue()
+        self._sem = asyncio.Semaphore(pool_size)
+
+    async def _connection(self):
+        try:
+            return self._pool.get_nowait()
+        except asyncio.QueueEmpty:
+            return await asyncio.open_connection(self.host, self.port)
+
+    async def _request(self, conn, body: bytes):
+        reader, writer = conn
+        headers = [
+            f"POST {self.path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive",
+        ]
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("ascii") + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("gateway closed connection")
+        status = int(status_line.split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+            elif name.strip().lower() == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        payload = await reader.readexactly(length) if length else b""
+        return status, payload, keep_alive
+
+    async def send(self, phone: str, text: str) -> str:
+        body = json.dumps({"to": phone, "text": text}).encode("utf-8")
+        async with self._sem:
+            conn = None
+            try:
+                conn = await asyncio.wait_for(self._connection(), self.timeout)
+                status, payload, keep_alive = await asyncio.wait_for(self._request(conn, body), self.timeout)
+            except BaseException as e:
+                # a half-used connection can't go back to the pool; close it or it leaks
+                if conn is not None:
+                    conn[1].close()
+                if isinstance(e, (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError)):
+                    raise GatewayError(f"transport error: {e!r}", retryable=True)
+                raise
+            if keep_alive:
+                self._pool.put_nowait(conn)
+            else:
+                conn[1].close()
+        if status == 429 or status >= 500:
+            raise GatewayError(f"HTTP {status}", retryable=True)
+        if status >= 400:
+            raise GatewayError(f"HTTP {status}: {payload[:200]!r}", retryable=False)
+        try:
+            return str(json.loads(payload or b"{}").get("id", ""))
+        except ValueError:
+            return ""
+
+    async def close(self):
+        while not self._pool.empty():
+            _, writer = self._pool.get_nowait()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+# -------------------------
+# Local mock gateway (HTTP)
+# -------------------------
+class MockGatewayServer:
+    """Minimal HTTP SMS gateway for offline tests: POST /send -> {"id": n}.
+
+    `failure_rate` answers that share of requests with 503 to exercise retries.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.host, self.port = host, port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.received = 0
+        self.rejected = 0
+        self._rng = random.Random(seed)
+        self._server = None
+        self._handlers = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/send"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # closing our side feeds EOF to idle keep-alive handlers so they exit cleanly
+            for writer in list(self._handlers.values()):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self._handlers[asyncio.current_task()] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                if length:
+                    await reader.readexactly(length)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self._rng.random() < self.failure_rate:
+                    self.rejected += 1
+                    status, body = "503 Service Unavailable", b'{"error": "busy"}'
+                else:
+                    self.received += 1
+                    status, body = "200 OK", json.dumps({"id": self.received}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+# -------------------------
+# Rate limiting / checkpoints
+# -------------------------
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class Checkpoint:
+    """Append-only progress log of delivered (phone, part, text digest); reopening resumes.
+
+    The digest of the SMS text is part of every entry, so a file reused for
+    another message (or a recipient now getting another language) sends again
+    rather than skipping. Entries without a digest, from older files, are ignored.
+    """
+
+    def __init__(self, path: str, flush_every: int = 200):
+        self.path = path
+        self.flush_every = flush_every
+        self.done = set()
+        self._pending = []
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    fields = line.strip().split("\t")
+                    if len(fields) == 3 and fields[0]:
+                        self.done.add((fields[0], int(fields[1]), fields[2]))
+
+    def is_done(self, phone: str, part: int, text: str) -> bool:
+        return (phone, part, text_digest(text)) in self.done
+
+    def mark(self, phone: str, part: int, text: str):
+        digest = text_digest(text)
+        self.done.add((phone, part, digest))
+        self._pending.append(f"{phone}\t{part}\t{digest}\n")
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.path or not self._pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(self._pending)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+# -------------------------
+# Broadcast engine
+# -------------------------
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q / 100 * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+async def broadcast(recipients, content: dict, gateway: Gateway, rate: float = 100.0, concurrency: int = 50,
+                    max_retries: int = 5, base_backoff: float = 0.5, checkpoint_path: str = None,
+                    progress=None) -> dict:
+    """Send each recipient every packed SMS for their language; return metrics.
+
+    Recipients whose language has no content fall back to DEFAULT_LANG. Already
+    checkpointed (phone, part, text) entries are skipped, so an interrupted run resumes.
+    """
+    bucket = TokenBucket(rate)
+    checkpoint = Checkpoint(checkpoint_path)
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    metrics = {"sent": 0, "failed": 0, "retries": 0, "skipped": 0, "segments": 0}
+    latencies = []
+    failures = []
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            phone, part, text = item
+            attempt = 0
+            while True:
+                await bucket.acquire()
+                t0 = time.perf_counter()
+                try:
+                    await gateway.send(phone, text)
+                except GatewayError as e:
+                    if e.retryable and attempt < max_retries:
+                        attempt += 1
+                        metrics["retries"] += 1
+                        # exponential backoff with full jitter
+                        await asyncio.sleep(random.uniform(0, base_backoff * (2 ** (attempt - 1))))
+                        continue
+                    metrics["failed"] += 1
+                    failures.append({"phone": phone, "part": part, "error": str(e)})
+                    break
+                latencies.append(time.perf_counter() - t0)
+                metrics["sent"] += 1
+                metrics["segments"] += len(sms_compiler.split_segments(text))
+                checkpoint.mark(phone, part, text)
+                break
+            if progress:
+                progress(metrics)
+            queue.task_done()
+
+    started = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for r in recipients:
+            packs = content.get(r["lang"]) or content[DEFAULT_LANG]
+            for part, text in enumerate(packs):
+                if checkpoint.is_done(r["phone"], part, text):
+                    metrics["skipped"] += 1
+                    continue
+                await queue.put((r["phone"], part, text))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+        checkpoint.flush()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    metrics.update({
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(metrics["sent"] / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "latency_p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "failures": failures[:100],
+    })
+    return metrics
+
+# -------------------------
+# CLI
+# -------------------------
+async def _run(args):
+    content = compile_content(args.source, max_segments=args.max_segments)
+    mock = None
+    if args.load_test:
+        langs = sorted(content)
+        recipients = [{"phone": f"+1555{i:07d}", "lang": langs[i % len(langs)]} for i in range(args.load_test)]
+    else:
+        recipients = read_recipients(args.recipients)
+    if args.mock or args.load_test:
+        mock = await MockGatewayServer(latency=args.mock_latency, failure_rate=args.mock_failure_rate).start()
+        url = mock.url
+    else:
+        url = args.gateway_url
+    gateway = HttpGateway(url, pool_size=args.concurrency, token=os.environ.get("AQUASHIELD_SMS_TOKEN"))
+    try:
+        metrics = await broadcast(recipients, content, gateway, rate=args.rate, concurrency=args.concurrency,
+                                  max_retries=args.max_retries, checkpoint_path=args.checkpoint)
+    finally:
+        await gateway.close()
+        if mock:
+            await mock.stop()
+    if mock:
+        metrics["mock_received"] = mock.received
+        metrics["mock_rejected"] = mock.rejected
+    print(json.dumps(metrics, indent=1))
+
+async def _serve_mock(args):
+    mock = await MockGatewayServer(port=args.port, latency=args.mock_latency, failure_rate=args.mock_failure_rate).start()
+    print(f"Mock SMS gateway listening on {mock.url}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Broadcast the compiled AquaShield crisis SMS to a recipient list.")
+    parser.add_argument("recipients", nargs="?", help="CSV with `phone` and optional `lang` columns")
+    parser.add_argument("--gateway-url", help="http:// URL of the SMS gateway send endpoint")
+    parser.add_argument("--source", default="crisis_sms", choices=sorted(sms_compiler.SMS_SOURCES))
+    parser.add_argument("--rate", type=float, default=100.0, help="messages per second")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--max-segments", type=int, default=6)
+    parser.add_argument("--checkpoint", help="progress file; rerun with the same file to resume")
+    parser.add_argument("--mock", action="store_true", help="send to an in-process mock gateway")
+    parser.add_argument("--load-test", type=int, metavar="N", help="broadcast to N synthetic recipients via the mock")
+    parser.add_argument("--serve-mock", action="store_true", help="only run the mock gateway")
+    parser.add_argument("--port", type=int, default=8025, help="port for --serve-mock")
+    parser.add_argument("--mock-latency", type=float, default=0.0)
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.serve_mock:
+        asyncio.run(_serve_mock(args))
+    else:
+        if not args.load_test and not args.recipients:
+            parser.error("recipients CSV is required unless --load-test is used")
+        if not (args.mock or args.load_test or args.gateway_url):
+            parser.error("choose --gateway-url, --mock or --load-test")
+        asyncio.run(_run(args))
@@ -0,0 +1,243 @@
+# sms_compiler.py
+# GSM-7 / UCS-2 aware SMS compiler for the crisis SMS texts in documentation/.
+# Measures encoding and segment count, applies GSM-7-safe substitutions and
+# packs instructions into the fewest concatenated segments per language.
+import argparse
+import json
+import os
+import re
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SMS_SOURCES = {
+    "water_filter_sms": os.path.join(BASE_DIR, "documentation", "english", "water_filter_sms.txt"),
+    "crisis_sms": os.path.join(BASE_DIR, "documentation", "Crisis_sms_en_es"),
+}
+
+# -------------------------
+# GSM 03.38 alphabet
+# -------------------------
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table: each costs an escape septet + the character (2 septets)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+# Segment capacities (single / per part of a concatenated message)
+GSM7_SINGLE, GSM7_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+# Readable GSM-7 replacements for characters that would force UCS-2
+GSM7_SUBSTITUTIONS = {
+    "–": "-", "—": "-", "‐": "-", "−": "-",
+    "‘": "'", "’": "'", "‚": "'", "`": "'", "´": "'",
+    "“": '"', "”": '"', "„": '"', "«": '"', "»": '"',
+    "…": "...", "•": "-", "·": "-",
+    "→": ">", "←": "<", "×": "x", "÷": "/",
+    " ": " ", " ": " ", " ": " ", "\t": " ",
+    "á": "a", "í": "i", "ó": "o", "ú": "u", "â": "a", "ê": "e", "î": "i", "ô": "o", "û": "u",
+    "ã": "a", "õ": "o", "ç": "c", "ë": "e", "ï": "i",
+    "Á": "A", "À": "A", "Â": "A", "Ã": "A", "Í": "I", "Ó": "O", "Ú": "U", "È": "E", "Ê": "E",
+    "Ì": "I", "Ò": "O", "Ù": "U", "Õ": "O",
+    "º": "o", "ª": "a", "°": "o",
+}
+
+def is_gsm7_char(ch: str) -> bool:
+    return ch in GSM7_BASIC or ch in GSM7_EXTENDED
+
+# -------------------------
+# Measuring
+# -------------------------
+def _units(text: str, encoding: str):
+    """Per-character cost in code units (septets for GSM-7, UTF-16 units for UCS-2)."""
+    if encoding == "GSM-7":
+        return [2 if ch in GSM7_EXTENDED else 1 for ch in text]
+    return [2 if ord(ch) > 0xFFFF else 1 for ch in text]
+
+def detect_encoding(text: str) -> str:
+    return "GSM-7" if all(is_gsm7_char(ch) for ch in text) else "UCS-2"
+
+def split_segments(text: str, encoding: str = None):
+    """Split text into the segments a handset would receive.
+
+    Escape sequences and surrogate pairs are never split across segments.
+    """
+    encoding = encoding or detect_encoding(text)
+    single, multi = (GSM7_SINGLE, GSM7_MULTI) if encoding == "GSM-7" else (UCS2_SINGLE, UCS2_MULTI)
+    costs = _units(text, encoding)
+    if sum(costs) <= single:
+        return [text] if text else []
+    segments, start, used = [], 0, 0
+    for i, cost in enumerate(costs):
+        if used + cost > multi:
+            segments.append(text[start:i])
+            start, used = i, 0
+        used += cost
+    segments.append(text[start:])
+    return segments
+
+def measure(text: str) -> dict:
+    encoding = detect_encoding(text)
+    return {
+        "encoding": encoding,
+        "chars": len(text),
+        "units": sum(_units(text, encoding)),
+        "segments": len(split_segments(text, encoding)),
+        "non_gsm": sorted({ch for ch in text if not is_gsm7_char(ch)}),
+    }
+
+# -------------------------
+# Substitution
+# -------------------------
+def suggest_substitutions(text: str) -> dict:
+    """Map each non-GSM character to its GSM-7 replacement ('' means dropped)."""
+    out = {}
+    for ch in sorted({ch for ch in text if not is_gsm7_char(ch)}):
+        out[ch] = GSM7_SUBSTITUTIONS.get(ch, "")
+    return out
+
+def to_gsm7(text: str) -> str:
+    """Apply GSM-7-safe substitutions; characters with no equivalent (emoji) are dropped."""
+    out = []
+    for ch in text:
+        if is_gsm7_char(ch):
+            out.append(ch)
+        else:
+            out.append(GSM7_SUBSTITUTIONS.get(ch, ""))
+    # dropping characters can leave double spaces behind
+    return re.sub(r"[ ]{2,}", " ", "".join(out)).strip()
+
+# -------------------------
+# Source parsing
+# -------------------------
+def parse_crisis_sms(path: str = SMS_SOURCES["crisis_sms"]):
+    """Parse Crisis_sms_en_es into [{'name', 'lang', 'text'}] in file order."""
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    messages = []
+    for block in re.split(r"^\s*---\s*$", raw, flags=re.M):
+        lines = [ln.strip() for ln in block.strip().splitlines()]
+        if not lines:
+            continue
+        title = to_gsm7(lines[0]).strip(" -")
+        current = None
+        body = {}
+        for ln in lines[1:]:
+            m = re.match(r"^(EN|ES)\s*\(\d+\s*chars?\)$", ln)
+            if m:
+                current = m.group(1).lower()
+                body[current] = []
+            elif current and ln:
+                body[current].append(ln)
+        for lang, parts in body.items():
+            messages.append({"name": title, "lang": lang, "text": " ".join(parts)})
+    return messages
+
+def parse_water_filter_sms(path: str = SMS_SOURCES["water_filter_sms"]):
+    """Parse the English SMS sheet into one message per numbered section."""
+    with open(path, encoding="utf-8") as f:
+        raw = f.read().strip()
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", raw) if p.strip()]
+    messages = []
+    for p in paragraphs[1:]:  # first paragraph is the sheet heading
+        lines = [ln.strip() for ln in p.splitlines()]
+        name = lines[0] if re.match(r"^\d+\.", lines[0]) else "NOTE"
+        messages.append({"name": name, "lang": "en", "text": "\n".join(lines)})
+    return messages
+
+def load_messages():
+    return {
+        "water_filter_sms": parse_water_filter_sms(),
+        "crisis_sms": parse_crisis_sms(),
+    }
+
+# -------------------------
+# Packing
+# -------------------------
+def pack_messages(texts, max_segments: int = 6, separator: str = "\n"):
+    """Pack ordered texts into concatenated SMS using the fewest total segments.
+
+    Instructions are kept whole and in order; each packed SMS is limited to
+    `max_segments` parts (many handsets drop longer concatenations). Solved
+    exactly with a DP over split points.
+    """
+    n = len(texts)
+    INF = (float("inf"), float("inf"))
+    # (total segments, number of SMS): ties go to fewer separate messages
+    best = [(0, 0)] + [INF] * n
+    cut = [0] * (n + 1)
+    for i in range(1, n + 1):
+        for j in range(i - 1, -1, -1):
+            joined = separator.join(texts[j:i])
+            segs = len(split_segments(joined))
+            if segs > max_segments and j < i - 1:
+                break
+            cand = (best[j][0] + segs, best[j][1] + 1)
+            if cand < best[i]:
+                best[i] = cand
+                cut[i] = j
+    packs = []
+    i = n
+    while i > 0:
+        packs.append(separator.join(texts[cut[i]:i]))
+        i = cut[i]
+    return packs[::-1]
+
+def compile_language(messages, lang: str, apply_substitutions: bool = True, max_segments: int = 6):
+    texts = [m["text"] for m in messages if m["lang"] == lang]
+    if apply_substitutions:
+        texts = [to_gsm7(t) for t in texts]
+    return pack_messages(texts, max_segments=max_segments)
+
+# -------------------------
+# Report
+# -------------------------
+def build_report(max_segments: int = 6) -> dict:
+    report = {"messages": [], "packs": {}}
+    for source, messages in load_messages().items():
+        for m in messages:
+            before = measure(m["text"])
+            after = measure(to_gsm7(m["text"]))
+            report["messages"].append({
+                "source": source, "name": m["name"], "lang": m["lang"],
+                "encoding": before["encoding"], "chars": before["chars"],
+                "segments": before["segments"],
+                "gsm7_chars": after["chars"], "gsm7_segments": after["segments"],
+                "substitutions": suggest_substitutions(m["text"]),
+            })
+        for lang in sorted({m["lang"] for m in messages}):
+            raw_total = sum(measure(m["text"])["segments"] for m in messages if m["lang"] == lang)
+            packs = compile_language(messages, lang, max_segments=max_segments)
+            report["packs"][f"{source}:{lang}"] = {
+                "segments_unpacked": raw_total,
+                "segments_packed": sum(len(split_segments(p)) for p in packs),
+                "sms_count": len(packs),
+                "packs": packs,
+            }
+    return report
+
+def print_report(report: dict):
+    print(f"{'source':<17} {'lang':<4} {'enc':<6} {'chars':>5} {'segs':>4} -> {'gsm7':>5} {'segs':>4}  name")
+    for r in report["messages"]:
+        print(f"{r['source']:<17} {r['lang']:<4} {r['encoding']:<6} {r['chars']:>5} {r['segments']:>4} -> "
+              f"{r['gsm7_chars']:>5} {r['gsm7_segments']:>4}  {r['name']}")
+        if r["substitutions"]:
+            subs = ", ".join(f"{k!r}->{v!r}" for k, v in r["substitutions"].items())
+            print(f"{'':<17} substitutions: {subs}")
+    print()
+    for key, p in report["packs"].items():
+        print(f"{key:<22} {p['segments_unpacked']:>3} segments as-is -> {p['segments_packed']:>3} "
+              f"segments in {p['sms_count']} SMS (GSM-7, packed)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segment report / compiler for AquaShield SMS texts.")
+    parser.add_argument("--max-segments", type=int, default=6, help="max parts per concatenated SMS")
+    parser.add_argument("--json", action="store_true", help="print the full report (incl. packed texts) as JSON")
+    args = parser.parse_args()
+    rep = build_report(max_segments=args.max_segments)
+    if args.json:
+        json.dump(rep, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    else:
+        print_report(rep)
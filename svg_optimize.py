@@ -0,0 +1,288 @@
+# svg_optimize.py
+# Optimization pass for the hand-written schematics (FILTER_SVGS). Each SVG is
+# parsed once, stripped of its XML prolog and inter-tag whitespace, its colours
+# and lengths normalized, attributes equal to their inherited/initial value
+# dropped, and presentation attributes repeated across elements folded into
+# short CSS classes. Bare '&' in text is escaped first, so hand-edited SVGs that
+# aren't well-formed XML still come out valid.
+#
+# prepare() memoizes the optimized text, its base64 data URL and byte sizes per
+# content hash, so reruns and embedded components reuse them instead of
+# re-encoding. sprite() packs a set of schematics into one sheet (<symbol> for
+# inline <use>, <view> for <img src="sprite.svg#id-view">) so static and offline
+# pages load every schematic in a single request.
+#
+#   python svg_optimize.py                 # size report for FILTER_SVGS
+#   python svg_optimize.py a.svg b.svg -o out/ --sprite
+import argparse
+import base64
+import functools
+import hashlib
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import Counter, namedtuple
+
+import reproducible
+
+# Bump when the optimizer's output changes so stored artifacts are rebuilt
+OPTIMIZER_VERSION = 2
+SVG_NS = "http://www.w3.org/2000/svg"
+ET.register_namespace("", SVG_NS)
+
+# Presentation attributes that are folded into classes
+PRESENTATION = ("fill", "stroke", "stroke-width", "font-size", "font-family",
+                "font-weight", "text-anchor", "opacity")
+# Inherited properties and their initial values; an attribute repeating what
+# the element would inherit anyway is dropped
+INHERITED = {"fill": "#000", "stroke": "none", "stroke-width": "1", "font-weight": "normal",
+             "text-anchor": "start"}
+LENGTHS = ("stroke-width", "font-size")  # need a unit once they move into CSS
+COLOURS = {"black": "#000", "white": "#fff", "red": "#f00", "none": "none"}
+MIN_CLASS_USES = 2
+
+Optimized = namedtuple("Optimized", "svg data_url raw_bytes bytes digest")
+
+# -------------------------
+# Parsing / normalization
+# -------------------------
+_PROLOG = re.compile(r"^\s*(<\?xml[^>]*\?>)?\s*(<!DOCTYPE[^>]*>)?\s*", re.I)
+_BARE_AMP = re.compile(r"&(?!#?\w+;)")
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+def _parse(svg_text: str) -> ET.Element:
+    text = _BARE_AMP.sub("&amp;", _PROLOG.sub("", svg_text))
+    root = ET.fromstring(text)
+    if not root.tag.startswith("{"):
+        # placeholder SVGs without xmlns don't render as <img>; put everything in the SVG namespace
+        for el in root.iter():
+            if isinstance(el.tag, str) and not el.tag.startswith("{"):
+                el.tag = f"{{{SVG_NS}}}{el.tag}"
+    return root
+
+def _number(value: str) -> str:
+    if _NUMBER.match(value) and "." in value:
+        value = value.rstrip("0").rstrip(".")
+        if value.startswith("0.") or value.startswith("-0."):
+            value = value.replace("0.", ".", 1)
+    return value
+
+def _normalize_value(name: str, value: str) -> str:
+    value = " ".join(value.split())
+    if name in ("fill", "stroke"):
+        return COLOURS.get(value.lower(), value.lower())
+    return _number(value)
+
+def _normalize(el: ET.Element, inherited: dict):
+    """Normalize attribute values and drop ones that repeat the inherited value."""
+    for name in list(el.attrib):
+        el.attrib[name] = _normalize_value(name, el.attrib[name])
+    here = dict(inherited)
+    for name in INHERITED:
+        value = el.attrib.get(name)
+        if value is None:
+            continue
+        if value == inherited[name]:
+            del el.attrib[name]
+        else:
+            here[name] = value
+    if el.text is not None and not el.text.strip() and len(el):
+        el.text = None
+    for child in el:
+        if child.tail is not None and not child.tail.strip():
+            child.tail = None
+        _normalize(child, here)
+
+def _style_of(el: ET.Element):
+    return tuple((n, el.attrib[n]) for n in PRESENTATION if n in el.attrib)
+
+def _css(style) -> str:
+    return ";".join(f"{n}:{v}px" if n in LENGTHS and _NUMBER.match(v) else f"{n}:{v}" for n, v in style)
+
+def _class_names():
+    """a, b, ..., z, aa, ab, ... (short names: every byte counts in a QR-era data URL)."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    n = 0
+    while True:
+        name, i = "", n
+        while True:
+            name = letters[i % 26] + name
+            i = i // 26 - 1
+            if i < 0:
+                break
+        yield name
+        n += 1
+
+def _assign_classes(roots):
+    """Fold presentation attributes repeated across `roots` into classes; returns the CSS."""
+    counts = Counter(_style_of(el) for root in roots for el in root.iter() if el is not root)
+    names = _class_names()
+    classes = {style: next(names) for style, n in counts.most_common()
+               if style and n >= MIN_CLASS_USES}
+    for root in roots:
+        for el in root.iter():
+            style = _style_of(el)
+            if el is root or style not in classes:
+                continue
+            for n, _ in style:
+                del el.attrib[n]
+            existing = el.attrib.pop("class", "")
+            el.set("class", f"{existing} {classes[style]}".strip())
+    return "".join(f".{name}{{{_css(style)}}}" for style, name in
+                   sorted(classes.items(), key=lambda item: item[1]))
+
+def _serialize(el: ET.Element) -> str:
+    return ET.tostring(el, encoding="unicode", short_empty_elements=True).replace(" />", "/>")
+
+def _style_element(css: str) -> ET.Element:
+    style = ET.Element(f"{{{SVG_NS}}}style")
+    style.text = css
+    return style
+
+# -------------------------
+# Single SVG
+# -------------------------
+def optimize(svg_text: str) -> str:
+    """Minified, normalized, well-formed SVG text with repeated styles as classes."""
+    root = _parse(svg_text)
+    _normalize(root, INHERITED)
+    css = _assign_classes([root])
+    if css:
+        root.insert(0, _style_element(css))
+    return _serialize(root)
+
+@functools.lru_cache(maxsize=256)
+def _prepare(digest: str, svg_text: str) -> Optimized:
+    svg = optimize(svg_text)
+    data = svg.encode("utf-8")
+    url = "data:image/svg+xml;base64," + base64.b64encode(data).decode("ascii")
+    return Optimized(svg, url, len(svg_text.encode("utf-8")), len(data), digest)
+
+def prepare(svg_text: str) -> Optimized:
+    """Optimized SVG, its data URL and sizes -- computed once per content hash."""
+    return _prepare(hashlib.sha256(svg_text.encode("utf-8")).hexdigest(), svg_text)
+
+def data_url(svg_text: str) -> str:
+    """Drop-in for the apps' svg_to_data_url(), backed by prepare()."""
+    return prepare(svg_text).data_url
+
+# -------------------------
+# Sprite sheet
+# -------------------------
+def symbol_id(title: str) -> str:
+    """'Filter A - Basic Bottle Microfilter' -> 'filter-a-basic-bottle-microfilter'."""
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "svg"
+
+def _size(root: ET.Element):
+    box = root.get("viewBox")
+    if box:
+        _, _, w, h = (float(v) for v in box.replace(",", " ").split())
+        return box, w, h
+    w = float(re.sub(r"[^\d.]", "", root.get("width", "")) or 300)
+    h = float(re.sub(r"[^\d.]", "", root.get("height", "")) or 150)
+    return f"0 0 {_number(str(w))} {_number(str(h))}", w, h
+
+def sprite(svgs: dict) -> str:
+    """One SVG holding every {title: svg} as a <symbol id=...> plus a <view id=...-view>.
+
+    Inline pages use <svg><use href="sprite.svg#ID"/></svg>; <img> tags (which
+    also work from file://) use src="sprite.svg#ID-view". Classes are shared
+    across all symbols, so repeated styling is written once for the whole sheet.
+    """
+    roots = {}
+    for title, svg in svgs.items():
+        root = _parse(svg)
+        _normalize(root, INHERITED)
+        roots[symbol_id(title)] = root
+    css = _assign_classes(list(roots.values()))
+    sheet = ET.Element(f"{{{SVG_NS}}}svg")
+    if css:
+        sheet.append(_style_element(css))
+    defs = ET.SubElement(sheet, f"{{{SVG_NS}}}defs")
+    y, width = 0.0, 0.0
+    for sid, root in roots.items():
+        box, w, h = _size(root)
+        symbol = ET.SubElement(defs, f"{{{SVG_NS}}}symbol", id=sid, viewBox=box)
+        for name, value in _style_of(root):
+            symbol.set(name, value)
+        symbol.extend(list(root))
+        ET.SubElement(sheet, f"{{{SVG_NS}}}view", id=f"{sid}-view",
+                      viewBox=f"0 {_number(str(y))} {_number(str(w))} {_number(str(h))}")
+        ET.SubElement(sheet, f"{{{SVG_NS}}}use", href=f"#{sid}", y=_number(str(y)),
+                      width=_number(str(w)), height=_number(str(h)))
+        y += h
+        width = max(width, w)
+    sheet.set("viewBox", f"0 0 {_number(str(width))} {_number(str(y))}")
+    return _serialize(sheet)
+
+def sprite_index_html(svgs: dict, sprite_name: str = "sprite.svg") -> str:
+    """Offline viewer page showing every schematic from the sprite sheet (one request)."""
+    figures = []
+    for title, svg in svgs.items():
+        _, w, h = _size(_parse(svg))
+        figures.append(f'<figure><img src="{sprite_name}#{symbol_id(title)}-view" width="{_number(str(w))}" '
+                       f'height="{_number(str(h))}" alt="{_escape(title)}"><figcaption>{_escape(title)}</figcaption></figure>')
+    return ('<!doctype html><meta charset="utf-8"><title>AquaShield schematics</title>'
+            '<style>body{font-family:sans-serif}figure{display:inline-block;margin:1em;vertical-align:top}'
+            'img{max-width:100%;height:auto;border:1px solid #ccc}</style>' + "".join(figures))
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+# -------------------------
+# Bundle
+# -------------------------
+def build_svg_zip(svgs: dict, include_sprite: bool = True) -> bytes:
+    """ZIP of optimized {title: svg} files, plus sprite.svg and index.html when asked."""
+    mem = io.BytesIO()
+    with zipfile.ZipFile(mem, "w", zipfile.ZIP_DEFLATED) as z:
+        for title, svg in svgs.items():
+            reproducible.zip_writestr(z, title.replace(" ", "_") + ".svg", prepare(svg).svg)
+        if include_sprite:
+            reproducible.zip_writestr(z, "sprite.svg", sprite(svgs))
+            reproducible.zip_writestr(z, "index.html", sprite_index_html(svgs))
+    return mem.getvalue()
+
+def svg_zip_artifact(svgs: dict, include_sprite: bool = True):
+    return (("svg_zip", OPTIMIZER_VERSION, include_sprite, *svgs.items()),
+            lambda: build_svg_zip(svgs, include_sprite))
+
+def svg_artifact(svg_text: str):
+    return ("svg", OPTIMIZER_VERSION, svg_text), lambda: prepare(svg_text).svg
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minify SVG schematics and optionally pack them into a sprite sheet.")
+    parser.add_argument("files", nargs="*", help="SVG files (default: FILTER_SVGS from aquashield_filters.py)")
+    parser.add_argument("-o", "--out", help="write optimized files (and the sprite) to this directory")
+    parser.add_argument("--sprite", action="store_true", help="also write sprite.svg and index.html")
+    args = parser.parse_args()
+
+    if args.files:
+        svgs = {}
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                svgs[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    else:
+        from aquashield_filters import FILTER_SVGS
+        svgs = FILTER_SVGS
+
+    raw = opt = 0
+    for title, svg in svgs.items():
+        p = prepare(svg)
+        raw, opt = raw + p.raw_bytes, opt + p.bytes
+        print(f"{p.raw_bytes:6d} -> {p.bytes:6d} B  {title}")
+    sheet = sprite(svgs)
+    print(f"{raw:6d} -> {opt:6d} B  total ({100 - 100 * opt / max(raw, 1):.0f}% smaller); "
+          f"sprite {len(sheet.encode('utf-8'))} B for {len(svgs)} schematics")
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for title, svg in svgs.items():
+            with open(os.path.join(args.out, title.replace(" ", "_") + ".svg"), "w", encoding="utf-8") as f:
+                f.write(prepare(svg).svg)
+        if args.sprite:
+            with open(os.path.join(args.out, "sprite.svg"), "w", encoding="utf-8") as f:
+                f.write(sheet)
+            with open(os.path.join(args.out, "index.html"), "w", encoding="utf-8") as f:
+                f.write(sprite_index_html(svgs))
@@ -0,0 +1,292 @@
+# text_layout.py
+# One line-breaking engine for PDF pages and Pillow images. Glyph advances come
+# from per-font tables cached for the life of the process (FPDF core-font
+# widths, or TrueType advances measured once per glyph), paragraphs are broken
+# greedily with syllable hyphenation and optional justification, and broken
+# paragraphs are memoized. Widths are in em (multiples of the font size), so a
+# card laid out once breaks identically on the PNG and in the PDF.
+#
+#   python text_layout.py check     # line-breaking regression cases; exit 1 on failure
+import functools
+import re
+import sys
+from collections import namedtuple
+
+from fpdf.fonts import fpdf_charwidths
+from PIL import ImageFont
+
+MIN_PREFIX = 2   # letters kept before a hyphen
+MIN_SUFFIX = 3   # letters carried to the next line
+MIN_HYPHENATE = 6
+HYPHEN_MIN_ROOM = 0.15  # only hyphenate when the line would otherwise end this short of full
+SOFT_HYPHEN = "\u00ad"
+BREAK_AFTER = "-/"  # a word may break after these without adding a hyphen
+
+# A line of a broken paragraph: words, natural width in em (single spaces) and
+# whether it ends the paragraph (last lines are never justified).
+Line = namedtuple("Line", "words width last")
+
+# -------------------------
+# Glyph metrics
+# -------------------------
+class FontMetrics:
+    """Advance widths in em for one font; each glyph is measured once."""
+
+    def __init__(self, name: str, measure):
+        self.name = name
+        self._measure = measure
+        self._advance = {}
+
+    def advance(self, ch: str) -> float:
+        a = self._advance.get(ch)
+        if a is None:
+            a = self._advance[ch] = self._measure(ch)
+        return a
+
+    def width(self, text: str) -> float:
+        adv = self._advance
+        total = 0.0
+        for ch in text:
+            a = adv.get(ch)
+            if a is None:
+                a = self.advance(ch)
+            total += a
+        return total
+
+    def __repr__(self):
+        return f"FontMetrics({self.name!r})"
+
+_PDF_FAMILIES = {"arial": "helvetica", "helvetica": "helvetica", "times": "times", "courier": "courier"}
+
+@functools.lru_cache(maxsize=None)
+def pdf_metrics(family: str = "Arial", style: str = "", encode=None) -> FontMetrics:
+    """Metrics of an FPDF core font. `encode` maps text to what is actually written
+    (e.g. a latin-1 sanitizer), so replaced glyphs are measured as their replacement."""
+    font = _PDF_FAMILIES.get(family.lower(), family.lower()) + "".join(sorted(style.upper()))
+    widths = fpdf_charwidths[font]
+
+    def measure(ch):
+        out = encode(ch) if encode else ch
+        return sum(widths.get(c, 0) for c in out) / 1000.0
+    return FontMetrics(f"pdf:{font}", measure)
+
+@functools.lru_cache(maxsize=None)
+def pil_metrics(font_name: str = "DejaVuSans.ttf") -> FontMetrics:
+    """Metrics of a TrueType font as Pillow draws it (built-in font if not found)."""
+    try:
+        font = ImageFont.truetype(font_name, 1000)
+        scale = 1000.0
+    except OSError:
+        font = ImageFont.load_default()
+        scale = float(getattr(font, "size", 11))
+    return FontMetrics(f"pil:{font_name}", lambda ch: font.getlength(ch) / scale)
+
+@functools.lru_cache(maxsize=None)
+def combined_metrics(*metrics: FontMetrics) -> FontMetrics:
+    """Widest advance of several fonts: breaks computed with it fit in every one of them."""
+    return FontMetrics("+".join(m.name for m in metrics), lambda ch: max(m.advance(ch) for m in metrics))
+
+# -------------------------
+# Hyphenation
+# -------------------------
+_VOWELS = set("aeiouyáéíóúüàèìòùâêîôûäëïö")
+# consonant pairs that start a syllable together in English and Spanish
+_ONSETS = {"bl", "br", "cl", "cr", "dr", "fl", "fr", "gl", "gr", "pl", "pr", "tr",
+           "ch", "ll", "rr", "qu", "th", "sh", "ph", "wh"}
+_WORD = re.compile(r"^(\W*)(\w+)(\W*)$")
+
+@functools.lru_cache(maxsize=8192)
+def hyphen_points(word: str):
+    """Offsets where `word` may be split with a hyphen.
+
+    Soft hyphens, then existing hyphens and slashes win; otherwise a syllable heuristic
+    (break before a single consonant between vowels, between two consonants
+    unless they form an onset like 'tr' or 'ch').
+    """
+    if SOFT_HYPHEN in word:
+        points, i = [], 0
+        for part in word.split(SOFT_HYPHEN)[:-1]:
+            i += len(part) + 1  # offsets in `word`, soft hyphens included
+            points.append(i)
+        return tuple(points)
+    if any(ch in BREAK_AFTER for ch in word[1:-1]):
+        return tuple(i + 1 for i, ch in enumerate(word[:-1]) if ch in BREAK_AFTER and i > 0)
+    m = _WORD.match(word)
+    if not m or len(m.group(2)) < MIN_HYPHENATE or any(ch.isdigit() for ch in m.group(2)):
+        return ()
+    lead, letters = len(m.group(1)), m.group(2).lower()
+    vowel = [ch in _VOWELS for ch in letters]
+    points = []
+    i = 0
+    n = len(letters)
+    while i < n:
+        if not vowel[i]:
+            i += 1
+            continue
+        j = i + 1
+        while j < n and not vowel[j]:
+            j += 1
+        if j >= n:
+            break
+        run = j - i - 1          # consonants between two vowels
+        if run == 1:
+            cut = i + 1
+        elif run >= 2:
+            cut = j - 2 if letters[j - 2:j] in _ONSETS else j - 1
+        else:
+            cut = None           # adjacent vowels: keep together
+        if cut is not None and MIN_PREFIX <= cut <= n - MIN_SUFFIX:
+            points.append(lead + cut)
+        i = j
+    return tuple(points)
+
+# -------------------------
+# Line breaking
+# -------------------------
+@functools.lru_cache(maxsize=16384)
+def wrap(paragraph: str, width: float, metrics: FontMetrics, hyphenate: bool = True):
+    """Break one paragraph (no newlines) into Lines no wider than `width` em."""
+    words = paragraph.split()
+    if not words:
+        return (Line((), 0.0, True),)
+    space = metrics.advance(" ")
+    hyphen = metrics.advance("-")
+    lines, current, x = [], [], 0.0
+    for word in words:
+        w = metrics.width(word.replace(SOFT_HYPHEN, ""))
+        gap = space if current else 0.0
+        if x + gap + w <= width:
+            current.append(word.replace(SOFT_HYPHEN, ""))
+            x += gap + w
+            continue
+        room = width - x - gap
+        if hyphenate and room > width * HYPHEN_MIN_ROOM:
+            # longest prefix + '-' that still fits on the current line
+            for cut in reversed(hyphen_points(word)):
+                head = word[:cut].replace(SOFT_HYPHEN, "")
+                dash = "" if head[-1:] in BREAK_AFTER else "-"
+                hw = metrics.width(head) + (hyphen if dash else 0.0)
+                if hw <= room:
+                    current.append(head + dash)
+                    x += gap + hw
+                    word = word[cut:]
+                    w = metrics.width(word.replace(SOFT_HYPHEN, ""))
+                    break
+        if current:
+            lines.append(Line(tuple(current), x, False))
+            current, x = [], 0.0
+        while w > width and len(word.replace(SOFT_HYPHEN, "")) > 1:
+            # a single word wider than the box: split at its own break points if one
+            # fits, else hard-split it
+            for cut in reversed(hyphen_points(word) if hyphenate else ()):
+                head = word[:cut].replace(SOFT_HYPHEN, "")
+                head += "" if head[-1:] in BREAK_AFTER else "-"
+                hw = metrics.width(head)
+                if hw <= width:
+                    break
+            else:
+                word = word.replace(SOFT_HYPHEN, "")
+                cut = len(word) - 1
+                while cut > 1 and metrics.width(word[:cut]) + hyphen > width:
+                    cut -= 1
+                head, hw = word[:cut] + "-", metrics.width(word[:cut]) + hyphen
+            lines.append(Line((head,), hw, False))
+            word = word[cut:]
+            w = metrics.width(word.replace(SOFT_HYPHEN, ""))
+        word = word.replace(SOFT_HYPHEN, "")
+        current, x = [word], w
+    lines.append(Line(tuple(current), x, True))
+    return tuple(lines)
+
+def wrap_text(text: str, width: float, metrics: FontMetrics, hyphenate: bool = True):
+    """Lines for multi-paragraph text; a blank input line yields an empty Line."""
+    lines = []
+    for para in text.split("\n"):
+        lines.extend(wrap(para, width, metrics, hyphenate))
+    return lines
+
+def place(line: Line, width: float, metrics: FontMetrics, justify: bool = False):
+    """(x in em, word) for each word; justified lines stretch their spaces to `width`."""
+    space = metrics.advance(" ")
+    if justify and not line.last and len(line.words) > 1:
+        space += (width - line.width) / (len(line.words) - 1)
+    out, x = [], 0.0
+    for word in line.words:
+        out.append((x, word))
+        x += metrics.width(word) + space
+    return out
+
+# -------------------------
+# Renderers
+# -------------------------
+def draw_lines(draw, lines, xy, font, metrics: FontMetrics, width_px: float, line_height: float,
+               justify: bool = False, fill="black", center: bool = False):
+    """Draw laid-out lines with Pillow from (x, y); returns the y below the last line.
+
+    center=True centres each line in width_px (like SVG text-anchor="middle").
+    """
+    x0, y = xy
+    size = font.size
+    for line in lines:
+        if justify and not line.last and len(line.words) > 1:
+            for x, word in place(line, width_px / size, metrics, justify=True):
+                draw.text((x0 + x * size, y), word, fill=fill, font=font)
+        elif line.words and center:
+            draw.text((x0 + width_px / 2, y), " ".join(line.words), fill=fill, font=font, anchor="ma")
+        elif line.words:
+            draw.text((x0, y), " ".join(line.words), fill=fill, font=font)
+        y += line_height
+    return y
+
+def pdf_lines(pdf, lines, metrics: FontMetrics, line_height: float, width: float = None,
+              justify: bool = False, encode=None):
+    """Write laid-out lines at the current FPDF position, honouring automatic page breaks.
+
+    The current font must match `metrics`; `width` defaults to the text area.
+    """
+    encode = encode or (lambda s: s)
+    width = width or (pdf.w - pdf.r_margin - pdf.x)
+    size = pdf.font_size
+    x0 = pdf.x
+    for line in lines:
+        if pdf.y + line_height > pdf.page_break_trigger and pdf.auto_page_break and pdf.accept_page_break():
+            pdf.add_page()
+        y = pdf.y
+        if justify and not line.last and len(line.words) > 1:
+            for x, word in place(line, width / size, metrics, justify=True):
+                pdf.set_xy(x0 + x * size, y)
+                pdf.cell(0, line_height, encode(word))
+        elif line.words:
+            pdf.set_xy(x0, y)
+            pdf.cell(0, line_height, encode(" ".join(line.words)))
+        pdf.set_xy(x0, y + line_height)
+
+# -------------------------
+# Regression cases
+# -------------------------
+# (text, width in em, expected lines) with the FPDF Arial metrics
+CASES = [
+    # each break after a soft hyphen lands at that hyphen, not one letter early per earlier one
+    ("xx wa\u00adter\u00adproof\u00adness", 4, ["xx wa-", "terproof-", "ness"]),
+    ("xx wa\u00adter\u00adproof\u00adness", 8, ["xx waterproof-", "ness"]),
+    ("filter/sieve water-proof", 3, ["filter/", "sieve", "water-", "proof"]),
+]
+
+def check() -> list:
+    """Failures as (text, width, expected, got); empty when every case breaks as expected."""
+    metrics = pdf_metrics()
+    failures = []
+    for text, width, expected in CASES:
+        got = [" ".join(line.words) for line in wrap_text(text, width, metrics)]
+        if got != expected:
+            failures.append((text, width, expected, got))
+    return failures
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["check"]:
+        sys.exit("usage: python text_layout.py check")
+    failed = check()
+    for text, width, expected, got in failed:
+        print(f"{text!r} at {width} em: expected {expected}, got {got}")
+    print(f"{len(CASES)} cases: " + (f"{len(failed)} failed" if failed else "all pass"))
+    sys.exit(1 if failed else 0)
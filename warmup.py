@@ -0,0 +1,286 @@
+# warmup.py
+# Pre-renders every download the apps offer (A5 PDFs, QR codes, schematics,
+# printed cards, guides and bundle contents, for all filters x languages) into the
+# shared artifact store in a background thread at process start, so the first
+# visitor after a deploy doesn't pay for imports, fonts or renders.
+#
+# Progress is kept in memory (status()), written to
+# .aquashield_cache/warmup/status.json, and -- when AQUASHIELD_READY_PORT is set --
+# served over HTTP: GET /ready answers 200 once warm and 503 before, for the
+# orchestrator's readiness probe. AQUASHIELD_WARMUP=0 disables the thread.
+# With AQUASHIELD_RENDER_QUEUE set, start() also attaches the render worker
+# queue, so the warm-up (and every later render) is queued for render_worker.py.
+# It also starts field_aggregates' background updater for the dashboard rollups.
+#
+# `python warmup.py serve` is the production entry point: it calls start() and
+# then runs Streamlit in the same process, so warming (and /ready) begin when
+# the container starts rather than on the first visit. The app script calls
+# start() too; it does nothing when the process already started it.
+#
+#   python warmup.py serve [streamlit options]   # warm up + streamlit run aquashield_app.py
+#   python warmup.py run                 # warm the on-disk store ahead of time
+#   python warmup.py status --wait 300   # exit 0 once the running app is warm
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import artifact_store
+import aquashield_render as render
+import field_aggregates
+import i18n_catalog
+import render_worker
+import search_index
+from aquashield_filters import FILTER_KEYS, FILTER_URLS, OFFLINE_QR_PAYLOADS, QR_LINK_TARGETS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("AQUASHIELD_CACHE_DIR", os.path.join(BASE_DIR, ".aquashield_cache"))
+STATUS_PATH = os.path.join(CACHE_DIR, "warmup", "status.json")
+ENABLED = os.environ.get("AQUASHIELD_WARMUP", "1") != "0"
+READY_PORT = os.environ.get("AQUASHIELD_READY_PORT")
+STATUS_INTERVAL = 0.5  # seconds between status.json writes
+APP_SCRIPT = os.path.join(BASE_DIR, "aquashield_app.py")
+
+def process_identity(pid: int):
+    """'<boot id>:<start time>' for a live process, or None where /proc is unavailable.
+
+    A bare pid is not enough to tell whether the process that wrote status.json is
+    still running: in a restarted container the new app is often pid 1 again.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            boot = f.read().strip()
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            # the command name may contain spaces; fields after it are fixed
+            start = f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+    return f"{boot}:{start}"
+
+# -------------------------
+# What to render
+# -------------------------
+def warmup_tasks(locales=None):
+    """(name, parts, builder) for every artifact the apps serve, most-clicked first."""
+    locales = locales or i18n_catalog.available_locales()
+    tasks = []
+    for loc in locales:
+        for key in FILTER_KEYS:
+            for kind, missing in (("short", "ui.short_unavailable"), ("full", "ui.full_unavailable"), ("card", "ui.short_unavailable")):
+                text = i18n_catalog.filter_text(key, kind, loc, i18n_catalog.t(missing, loc))
+                tasks.append((f"pdf {kind} {loc} {key}", *render.a5_pdf_artifact(text)))
+    for loc in locales:
+        for key in FILTER_KEYS:
+            card = i18n_catalog.filter_text(key, "card", loc, i18n_catalog.t("ui.short_unavailable", loc))
+            tasks.append((f"qr offline {loc} {key}", *render.qr_png_artifact(card.strip())))
+    for key in FILTER_KEYS:
+        tasks.append((f"qr online {key}", *render.qr_png_artifact(FILTER_URLS.get(key, "https://example.org/AquaShield/"))))
+        tasks.append((f"schematic {key}", *render.schematic_png_artifact(key, size=(900, 600))))
+    for loc in locales:
+        for key in FILTER_KEYS:
+            guide = render.guide_pdf_artifact(key, loc)
+            if guide:
+                tasks.append((f"guide {loc} {key}", *guide))
+    for loc in locales:
+        for key in FILTER_KEYS:
+            tasks.append((f"card {loc} {key}", *render.printed_card_artifact(key, i18n_catalog.filter_text(key, "card", loc))))
+    for name, payload in {**QR_LINK_TARGETS, **OFFLINE_QR_PAYLOADS}.items():
+        tasks.append((f"qr card png {name}", *render.segno_qr_artifact(payload, "png", scale=10)))
+        tasks.append((f"qr card svg {name}", *render.segno_qr_artifact(payload, "svg", scale=4)))
+    tasks.append(("bundle visuals", *render.visuals_zip_artifact("screen")))
+    return tasks
+
+# -------------------------
+# Background run + progress
+# -------------------------
+class Warmup:
+    def __init__(self, locales=None, status_path: str = STATUS_PATH):
+        self.locales = locales
+        self.status_path = status_path
+        self._lock = threading.Lock()
+        self._state = {"state": "idle", "done": 0, "total": 0, "built": 0, "failed": 0,
+                       "current": None, "errors": [], "started": None, "finished": None}
+        self._last_write = 0.0
+
+    def _update(self, force: bool = False, **changes):
+        with self._lock:
+            self._state.update(changes)
+        now = time.monotonic()
+        if force or now - self._last_write >= STATUS_INTERVAL:
+            self._last_write = now
+            self._write_status()
+
+    def _write_status(self):
+        try:
+            os.makedirs(os.path.dirname(self.status_path), exist_ok=True)
+            tmp = f"{self.status_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.status(), f)
+            os.replace(tmp, self.status_path)
+        except OSError:
+            pass  # a read-only cache must not stop the warm-up itself
+
+    def status(self) -> dict:
+        with self._lock:
+            s = dict(self._state, errors=list(self._state["errors"]))
+        s["pid"] = os.getpid()
+        s["process"] = _PROCESS
+        s["ready"] = s["state"] in ("ready", "disabled")
+        s["eta_s"] = None
+        if s["state"] == "running" and s["done"] and s["started"]:
+            elapsed = time.time() - s["started"]
+            s["eta_s"] = round(elapsed / s["done"] * (s["total"] - s["done"]), 1)
+        return s
+
+    def run(self, progress=None):
+        """Render everything not already in the store; returns the final status."""
+        self._update(force=True, state="running", started=time.time(), current="loading catalog")
+        try:
+            search_index.load_index()
+            tasks = warmup_tasks(self.locales)
+        except Exception as e:
+            # the apps still render on demand; report the failure but don't hold traffic back
+            with self._lock:
+                self._state["errors"].append(f"catalog: {e}")
+            tasks = []
+        self._update(force=True, total=len(tasks))
+        artifact_store.prefetch([parts for _, parts, _ in tasks])
+        for i, (name, parts, builder) in enumerate(tasks):
+            self._update(current=name)
+            key = artifact_store.artifact_key(*parts)
+            try:
+                if artifact_store.STORE.lookup(key) is None:
+                    artifact_store.digest_for_parts(parts, builder)
+                    with self._lock:
+                        self._state["built"] += 1
+            except Exception as e:
+                # one broken renderer must not keep the process from becoming ready
+                with self._lock:
+                    self._state["failed"] += 1
+                    if len(self._state["errors"]) < 20:
+                        self._state["errors"].append(f"{name}: {e}")
+            self._update(done=i + 1)
+            if progress:
+                progress(self.status())
+        self._update(force=True, state="ready", current=None, finished=time.time())
+        return self.status()
+
+_PROCESS = process_identity(os.getpid())
+WARMUP = Warmup()
+_start_lock = threading.Lock()
+_started = False
+
+def start():
+    """Start the warm-up once per process; cheap to call on every script rerun."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        render_worker.attach()
+        if ENABLED:
+            threading.Thread(target=WARMUP.run, name="aquashield-warmup", daemon=True).start()
+            field_aggregates.start_updater()  # the dashboard's rollups; it only reads the saved state
+        else:
+            WARMUP._update(force=True, state="disabled")
+        if READY_PORT:
+            serve_readiness(int(READY_PORT))
+
+def status() -> dict:
+    return WARMUP.status()
+
+def is_ready() -> bool:
+    return WARMUP.status()["ready"]
+
+# -------------------------
+# Readiness endpoint
+# -------------------------
+class ReadinessHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        s = status()
+        if self.path.split("?")[0] == "/ready":
+            code = 200 if s["ready"] else 503
+        elif self.path.split("?")[0] == "/status":
+            code = 200
+        else:
+            code, s = 404, {"error": "not found"}
+        body = json.dumps(s).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve_readiness(port: int, host: str = "0.0.0.0"):
+    """Serve /ready and /status on `port` from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="aquashield-readiness", daemon=True).start()
+    return server
+
+def read_status(path: str = STATUS_PATH):
+    """Status written by a running app process, or None if absent or that process has exited."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            s = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if s.get("process") and "pid" in s:
+        current = process_identity(s["pid"])
+        if current is not None or os.path.exists("/proc/self/stat"):
+            # same pid but another start time (or boot): a different process
+            return s if current == s["process"] else None
+    try:
+        os.kill(s["pid"], 0)
+    except ProcessLookupError:
+        return None
+    except (PermissionError, KeyError):
+        pass
+    return s
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render AquaShield downloads or report warm-up readiness.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="render everything into the on-disk artifact store now")
+    p_run.add_argument("--locales", nargs="+", help="default: every locale in locales/")
+    sub.add_parser("serve", help="start the warm-up, then run the app with Streamlit in this process; "
+                                 "other options go to `streamlit run`, e.g. --server.port 8501")
+    p_status = sub.add_parser("status", help="print the running app's warm-up status; exit 0 when ready")
+    p_status.add_argument("--wait", type=float, default=0, help="poll up to this many seconds for readiness")
+    args, streamlit_args = parser.parse_known_args()
+    if streamlit_args and args.cmd != "serve":
+        parser.error(f"unrecognized arguments: {' '.join(streamlit_args)}")
+
+    if args.cmd == "serve":
+        # through the importable module: the app script's `import warmup` must see this start()
+        import warmup
+        warmup.start()
+        from streamlit.web import cli as streamlit_cli
+        sys.argv = ["streamlit", "run", APP_SCRIPT, *streamlit_args]
+        sys.exit(streamlit_cli.main())
+    if args.cmd == "run":
+        t0 = time.perf_counter()
+
+        def show(s):
+            print(f"\r{s['done']}/{s['total']} {(s['current'] or '')[:60]:<60}", end="", file=sys.stderr)
+        final = Warmup(args.locales).run(progress=show)
+        print(file=sys.stderr)
+        print(f"{final['total']} artifacts ({final['built']} built, {final['failed']} failed) "
+              f"in {time.perf_counter() - t0:.1f}s -> {artifact_store.ARTIFACT_DIR}")
+        for e in final["errors"]:
+            print(f"  {e}")
+        sys.exit(1 if final["failed"] else 0)
+    deadline = time.monotonic() + args.wait
+    while True:
+        s = read_status()
+        if (s and s["ready"]) or time.monotonic() >= deadline:
+            break
+        time.sleep(1)
+    print(json.dumps(s) if s else "no running warm-up found")
+    sys.exit(0 if s and s["ready"] else 1)